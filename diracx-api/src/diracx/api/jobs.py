@@ -1,62 +1,297 @@
 from __future__ import annotations
 
-__all__ = ("create_sandbox", "download_sandbox")
+__all__ = ("SandboxCache", "create_sandbox", "download_sandbox")
 
+import asyncio
 import hashlib
+import io
 import logging
 import os
+import re
 import tarfile
 import tempfile
+from contextlib import ExitStack, contextmanager
 from pathlib import Path
-from typing import Literal
+from typing import IO, Iterator, Literal
 
 import httpx
 
 from diracx.client.aio import AsyncDiracClient
 from diracx.client.models import SandboxInfo
+from diracx.core.preferences import get_diracx_preferences
 
 from .utils import with_client
 
 logger = logging.getLogger(__name__)
 
 SANDBOX_CHECKSUM_ALGORITHM = "sha256"
-SANDBOX_COMPRESSION: Literal["bz2"] = "bz2"
-SANDBOX_OPEN_MODE: Literal["w|bz2"] = "w|bz2"
+SandboxCompression = Literal["bz2", "zst"]
+SANDBOX_COMPRESSION: SandboxCompression = "bz2"
+# The zstd compression, which requires zstandard, uses all the available cores
+SANDBOX_ZSTD_LEVEL = 3
+SANDBOX_ZSTD_THREADS = -1
+# Sandboxes are kept in memory up to this size before being written to disk
+SANDBOX_SPOOL_MAX_SIZE = 32 * 1024 * 1024
+SANDBOX_CACHE_MAX_SIZE = 1024 * 1024 * 1024
+
+# The name of a sandbox in its PFN: <checksum_algorithm>:<checksum>.<format>
+SANDBOX_NAME_REGEX = re.compile(
+    r"/(?P<algorithm>[a-z0-9]{3,10}):(?P<checksum>[0-9a-f]{64})\.(?P<format>[a-z0-9\.]+)$"
+)
+
+
+class SandboxCache:
+    """On-disk cache of the downloaded sandboxes, keyed by their checksum.
+
+    The compressed sandboxes are stored in ``path``. When their total size
+    exceeds ``max_size`` the least recently used ones are evicted, a sandbox
+    being marked as used by updating its modification time.
+    """
+
+    def __init__(self, path: Path, max_size: int = SANDBOX_CACHE_MAX_SIZE):
+        self.path = path
+        self.max_size = max_size
+
+    def get(self, key: str) -> Path | None:
+        """Get the path of a cached sandbox, None if it is not cached."""
+        path = self.path / key
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    @contextmanager
+    def add(self, key: str) -> Iterator[IO[bytes]]:
+        """Give a file to write a sandbox to, which is cached on success."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        # Hidden temporary files are ignored by the eviction
+        fd, tmp_name = tempfile.mkstemp(dir=self.path, prefix=".", suffix=".part")
+        try:
+            with open(fd, "wb") as fh:
+                yield fh
+            os.replace(tmp_name, self.path / key)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used sandboxes until the cache fits in max_size."""
+        entries = []
+        for path in self.path.iterdir():
+            if path.name.startswith("."):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            logger.debug("Evicting %s from the sandbox cache", path.name)
+            path.unlink(missing_ok=True)
+            total_size -= size
+
+    @classmethod
+    def from_preferences(cls) -> SandboxCache | None:
+        """The cache configured in the preferences, None if it is disabled."""
+        preferences = get_diracx_preferences()
+        if preferences.sandbox_cache_path is None:
+            return None
+        return cls(preferences.sandbox_cache_path, preferences.sandbox_cache_max_size)
+
+
+class _HashingSpool:
+    """Write-only file object computing the checksum and size of the sandbox.
+
+    The data is kept in memory until it exceeds ``max_size`` bytes, after which
+    it is moved to a temporary file. Once written, the data can be read from
+    ``file``.
+    """
+
+    def __init__(self, max_size: int = SANDBOX_SPOOL_MAX_SIZE):
+        self._hasher = hashlib.new(SANDBOX_CHECKSUM_ALGORITHM)
+        self._max_size = max_size
+        self.size = 0
+        self.file: IO[bytes] = io.BytesIO()
+
+    def __enter__(self) -> _HashingSpool:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.file.close()
+
+    @property
+    def checksum(self) -> str:
+        return self._hasher.hexdigest()
+
+    def write(self, data) -> int:
+        self._hasher.update(data)
+        self.size += len(data)
+        if self.size > self._max_size and isinstance(self.file, io.BytesIO):
+            spilled = tempfile.TemporaryFile(mode="w+b")
+            spilled.write(self.file.getvalue())
+            self.file = spilled
+        return self.file.write(data)
+
+    def flush(self):
+        pass
+
+
+def _write_sandbox(paths: list[Path], fileobj, compression: SandboxCompression):
+    """Write the compressed tarball of the paths to ``fileobj`` in a single pass."""
+    if compression == "zst":
+        import zstandard
+
+        compressor = zstandard.ZstdCompressor(
+            level=SANDBOX_ZSTD_LEVEL, threads=SANDBOX_ZSTD_THREADS
+        )
+        with compressor.stream_writer(fileobj, closefd=False) as zst_fh:
+            with tarfile.open(fileobj=zst_fh, mode="w|") as tf:
+                _add_paths(tf, paths)
+    else:
+        with tarfile.open(fileobj=fileobj, mode="w|bz2") as tf:
+            _add_paths(tf, paths)
+
+
+def _add_paths(tf: tarfile.TarFile, paths: list[Path]):
+    for path in paths:
+        logger.debug("Adding %s to sandbox as %s", path.resolve(), path.name)
+        tf.add(path.resolve(), path.name, recursive=True)
+
+
+class _ChunkReader(io.RawIOBase):
+    """Readable file object over the chunks of a download.
+
+    The chunks are also given to ``hasher`` and written to ``copy_to`` when
+    they are set.
+    """
+
+    def __init__(self, chunks: Iterator[bytes], hasher=None, copy_to=None):
+        self._chunks = chunks
+        self._hasher = hasher
+        self._copy_to = copy_to
+        self._buffer = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._consume(chunk)
+            self._buffer = memoryview(chunk)
+        size = min(len(buffer), len(self._buffer))
+        memoryview(buffer)[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def drain(self):
+        """Consume the chunks which have not been read."""
+        self._buffer = memoryview(b"")
+        for chunk in self._chunks:
+            self._consume(chunk)
+
+    def _consume(self, chunk: bytes):
+        if self._hasher is not None:
+            self._hasher.update(chunk)
+        if self._copy_to is not None:
+            self._copy_to.write(chunk)
+
+
+def _extract_sandbox(fileobj, destination: Path, compression: str | None = None):
+    """Extract a sandbox, the compression being detected if not given.
+
+    The sandbox is read sequentially such that ``fileobj`` can be a stream.
+    """
+    if compression == "zst":
+        import zstandard
+
+        decompressor = zstandard.ZstdDecompressor()
+        with decompressor.stream_reader(fileobj, closefd=False) as zst_fh:
+            with tarfile.open(fileobj=zst_fh, mode="r|") as tf:
+                tf.extractall(path=destination, filter="data")
+    else:
+        with tarfile.open(fileobj=fileobj, mode="r|*") as tf:
+            tf.extractall(path=destination, filter="data")
+
+
+def _stream_sandbox(
+    url: str,
+    destination: Path,
+    compression: str | None,
+    checksum: tuple[str, str] | None,
+    copy_to: IO[bytes] | None,
+):
+    """Extract a sandbox while it is downloaded, then verify its checksum.
+
+    The sandbox is extracted in a temporary directory within ``destination``
+    and its files are only moved into place once the checksum is verified.
+    """
+    hasher = hashlib.new(checksum[0]) if checksum else None
+    destination.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=destination, prefix=".sandbox-") as tmp:
+        staging = Path(tmp)
+        with httpx.stream("GET", url) as response:
+            # TODO: Handle this error better
+            response.raise_for_status()
+            reader = _ChunkReader(response.iter_bytes(), hasher, copy_to)
+            _extract_sandbox(reader, staging, compression)
+            # The end of the archive is not necessarily read by tarfile
+            reader.drain()
+        if hasher is not None and checksum and hasher.hexdigest() != checksum[1]:
+            raise ValueError(f"Checksum mismatch for the sandbox downloaded from {url}")
+        _move_tree(staging, destination)
+
+
+def _move_tree(source: Path, destination: Path):
+    """Move the content of ``source`` into ``destination``, merging directories."""
+    for root, dirs, files in os.walk(source):
+        target = destination / Path(root).relative_to(source)
+        for name in dirs:
+            (target / name).mkdir(exist_ok=True)
+        for name in files:
+            os.replace(Path(root) / name, target / name)
 
 
 @with_client
-async def create_sandbox(paths: list[Path], *, client: AsyncDiracClient) -> str:
+async def create_sandbox(
+    paths: list[Path],
+    *,
+    compression: SandboxCompression = SANDBOX_COMPRESSION,
+    client: AsyncDiracClient,
+) -> str:
     """Create a sandbox from the given paths and upload it to the storage backend.
 
     Any paths that are directories will be added recursively.
     The returned value is the PFN of the sandbox in the storage backend and can
     be used to submit jobs.
+
+    The sandbox is hashed while being compressed, the zstd compression being
+    faster than bz2 but requiring the zstandard package.
     """
-    with tempfile.TemporaryFile(mode="w+b") as tar_fh:
-        with tarfile.open(fileobj=tar_fh, mode=SANDBOX_OPEN_MODE) as tf:
-            for path in paths:
-                logger.debug("Adding %s to sandbox as %s", path.resolve(), path.name)
-                tf.add(path.resolve(), path.name, recursive=True)
-        tar_fh.seek(0)
-
-        hasher = getattr(hashlib, SANDBOX_CHECKSUM_ALGORITHM)()
-        while data := tar_fh.read(512 * 1024):
-            hasher.update(data)
-        checksum = hasher.hexdigest()
-        tar_fh.seek(0)
-        logger.debug("Sandbox checksum is %s", checksum)
+    with _HashingSpool() as spool:
+        await asyncio.to_thread(_write_sandbox, paths, spool, compression)
+        logger.debug("Sandbox checksum is %s", spool.checksum)
 
         sandbox_info = SandboxInfo(
             checksum_algorithm=SANDBOX_CHECKSUM_ALGORITHM,
-            checksum=checksum,
-            size=os.stat(tar_fh.fileno()).st_size,
-            format=f"tar.{SANDBOX_COMPRESSION}",
+            checksum=spool.checksum,
+            size=spool.size,
+            format=f"tar.{compression}",
         )
 
         res = await client.jobs.initiate_sandbox_upload(sandbox_info)
         if res.url:
             logger.debug("Uploading sandbox for %s", res.pfn)
-            files = {"file": ("file", tar_fh)}
+            # The sandbox is streamed from the spool into the body of the request
+            spool.file.seek(0)
+            files = {"file": ("file", spool.file)}
             async with httpx.AsyncClient() as httpx_client:
                 response = await httpx_client.post(
                     res.url, data=res.fields, files=files
@@ -75,20 +310,44 @@ async def create_sandbox(paths: list[Path], *, client: AsyncDiracClient) -> str:
 
 
 @with_client
-async def download_sandbox(pfn: str, destination: Path, *, client: AsyncDiracClient):
-    """Download a sandbox from the storage backend to the given destination."""
-    res = await client.jobs.get_sandbox_file(pfn=pfn)
-    logger.debug("Downloading sandbox for %s", pfn)
-    with tempfile.TemporaryFile(mode="w+b") as fh:
-        async with httpx.AsyncClient() as http_client:
-            response = await http_client.get(res.url)
-            # TODO: Handle this error better
-            response.raise_for_status()
-            async for chunk in response.aiter_bytes():
-                fh.write(chunk)
-        fh.seek(0)
-        logger.debug("Sandbox downloaded for %s", pfn)
+async def download_sandbox(
+    pfn: str,
+    destination: Path,
+    *,
+    cache: SandboxCache | None = None,
+    client: AsyncDiracClient,
+):
+    """Download a sandbox from the storage backend to the given destination.
 
-        with tarfile.open(fileobj=fh) as tf:
-            tf.extractall(path=destination, filter="data")
-        logger.debug("Extracted %s to %s", pfn, destination)
+    The sandbox is extracted while it is downloaded. If a cache is given, or
+    configured with ``DIRACX_SANDBOX_CACHE_PATH``, the sandbox is stored in it
+    and later downloads of the same sandbox are extracted from the cache. The
+    access to the sandbox is always checked by the server, only the download
+    from the storage backend being skipped when it is cached.
+
+    A ValueError is raised if the checksum of the downloaded sandbox does not
+    match its PFN, in which case it is neither extracted nor cached.
+    """
+    if cache is None:
+        cache = SandboxCache.from_preferences()
+    compression = "zst" if pfn.endswith(".tar.zst") else None
+    checksum = key = None
+    if match := SANDBOX_NAME_REGEX.search(pfn):
+        checksum = (match["algorithm"], match["checksum"])
+        key = f"{match['algorithm']}-{match['checksum']}.{match['format']}"
+
+    # The cached sandboxes may be shared by several users so the access to
+    # the sandbox is checked even if it is cached
+    res = await client.jobs.get_sandbox_file(pfn=pfn)
+    if cache and key and (cached := cache.get(key)):
+        logger.debug("Extracting %s from the sandbox cache", pfn)
+        with cached.open("rb") as fh:
+            await asyncio.to_thread(_extract_sandbox, fh, destination, compression)
+    else:
+        logger.debug("Downloading sandbox for %s", pfn)
+        with ExitStack() as stack:
+            copy_to = stack.enter_context(cache.add(key)) if cache and key else None
+            await asyncio.to_thread(
+                _stream_sandbox, res.url, destination, compression, checksum, copy_to
+            )
+    logger.debug("Extracted %s to %s", pfn, destination)
@@ -1,12 +1,48 @@
 from __future__ import annotations
 
+import hashlib
 import logging
+import os
 import secrets
+from unittest.mock import AsyncMock, MagicMock
 
-from diracx.api.jobs import create_sandbox, download_sandbox
+import pytest
+from pytest_httpx import IteratorStream
 
+from diracx.api.jobs import (
+    SandboxCache,
+    _extract_sandbox,
+    _HashingSpool,
+    _write_sandbox,
+    create_sandbox,
+    download_sandbox,
+)
 
-async def test_upload_download_sandbox(tmp_path, with_cli_login, caplog):
+
+@pytest.mark.parametrize("compression", ["bz2", "zst"])
+@pytest.mark.parametrize("max_size", [0, 1024 * 1024])
+def test_write_extract_sandbox(tmp_path, compression, max_size):
+    """The sandbox is hashed while compressed, in memory or spilled to disk."""
+    input_file = tmp_path / "input" / "input.dat"
+    input_file.parent.mkdir()
+    input_file.write_bytes(secrets.token_bytes(64 * 1024))
+
+    with _HashingSpool(max_size) as spool:
+        _write_sandbox([input_file.parent], spool, compression)
+        spool.file.seek(0)
+        data = spool.file.read()
+        assert spool.size == len(data)
+        assert spool.checksum == hashlib.sha256(data).hexdigest()
+
+        spool.file.seek(0)
+        _extract_sandbox(spool.file, tmp_path / "output", compression)
+    assert (tmp_path / "output" / "input" / "input.dat").read_bytes() == (
+        input_file.read_bytes()
+    )
+
+
+@pytest.mark.parametrize("compression", ["bz2", "zst"])
+async def test_upload_download_sandbox(tmp_path, with_cli_login, caplog, compression):
     caplog.set_level(logging.DEBUG)
 
     input_directory = tmp_path / "input"
@@ -24,12 +60,12 @@ async def test_upload_download_sandbox(tmp_path, with_cli_login, caplog):
 
     # Upload the sandbox
     caplog.clear()
-    pfn = await create_sandbox(input_files)
+    pfn = await create_sandbox(input_files, compression=compression)
     assert has_record(caplog.records, "diracx.api.jobs", "Uploading sandbox for")
 
     # Uploading the same sandbox again should return the same PFN
     caplog.clear()
-    pfn2 = await create_sandbox(input_files)
+    pfn2 = await create_sandbox(input_files, compression=compression)
     assert pfn == pfn2
     assert has_record(caplog.records, "diracx.api.jobs", "already exists in storage")
 
@@ -45,3 +81,79 @@ def has_record(records: list[logging.LogRecord], logger_name: str, message: str)
         if record.name == logger_name and message in record.message:
             return True
     return False
+
+
+def test_sandbox_cache(tmp_path):
+    cache = SandboxCache(tmp_path / "cache", max_size=250)
+    assert cache.get("a") is None
+
+    for key in "abc":
+        with cache.add(key) as fh:
+            fh.write(b"x" * 100)
+        os.utime(cache.path / key, (0, ord(key)))
+    # The least recently used sandbox has been evicted
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    os.utime(cache.path / "b", (0, 0))
+
+    with cache.add("d") as fh:
+        fh.write(b"x" * 100)
+    assert sorted(path.name for path in cache.path.iterdir()) == ["c", "d"]
+
+    # The sandbox is not cached if it fails to be written
+    with pytest.raises(ValueError), cache.add("e") as fh:
+        fh.write(b"x")
+        raise ValueError()
+    assert sorted(path.name for path in cache.path.iterdir()) == ["c", "d"]
+
+
+@pytest.mark.parametrize("compression", ["bz2", "zst"])
+async def test_download_sandbox_cache(tmp_path, httpx_mock, compression):
+    """The sandbox is extracted while downloaded then taken from the cache."""
+    input_file = tmp_path / "input.dat"
+    input_file.write_bytes(secrets.token_bytes(64 * 1024))
+    with _HashingSpool() as spool:
+        _write_sandbox([input_file], spool, compression)
+        spool.file.seek(0)
+        data = spool.file.read()
+    pfn = f"/S3/bucket/vo/group/user/sha256:{spool.checksum}.tar.{compression}"
+
+    url = "https://s3.invalid/sandbox"
+    httpx_mock.add_response(url=url, stream=IteratorStream(chunks(data, 1000)))
+    client = MagicMock()
+    client.jobs.get_sandbox_file = AsyncMock(return_value=MagicMock(url=url))
+    cache = SandboxCache(tmp_path / "cache")
+
+    await download_sandbox(pfn, tmp_path / "output1", cache=cache, client=client)
+    await download_sandbox(pfn, tmp_path / "output2", cache=cache, client=client)
+    for output in ["output1", "output2"]:
+        content = (tmp_path / output / "input.dat").read_bytes()
+        assert content == input_file.read_bytes()
+    # The sandbox has only been downloaded once but the access to it has been
+    # checked by the server every time
+    assert len(httpx_mock.get_requests()) == 1
+    assert client.jobs.get_sandbox_file.await_count == 2
+    assert len(list(cache.path.iterdir())) == 1
+
+    # The cached sandbox is not extracted if the access is refused
+    client.jobs.get_sandbox_file.side_effect = PermissionError()
+    with pytest.raises(PermissionError):
+        await download_sandbox(pfn, tmp_path / "output3", cache=cache, client=client)
+    assert not (tmp_path / "output3").exists()
+    client.jobs.get_sandbox_file.side_effect = None
+
+    # A corrupted download is neither extracted nor cached
+    httpx_mock.add_response(url=url, stream=IteratorStream(chunks(data, 1000)))
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        await download_sandbox(
+            pfn.replace(spool.checksum, "0" * 64),
+            tmp_path / "output4",
+            cache=cache,
+            client=client,
+        )
+    assert list((tmp_path / "output4").iterdir()) == []
+    assert len(list(cache.path.iterdir())) == 1
+
+
+def chunks(data: bytes, size: int):
+    return [data[i : i + size] for i in range(0, len(data), size)]
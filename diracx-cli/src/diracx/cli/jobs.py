@@ -6,6 +6,7 @@ __all__ = ("app",)
 
 import json
 import re
+import sys
 from typing import Annotated, cast
 
 from rich.console import Console
@@ -13,7 +14,13 @@ from rich.table import Table
 from typer import FileText, Option
 
 from diracx.client.aio import AsyncDiracClient
-from diracx.core.models import ScalarSearchOperator, SearchSpec, VectorSearchOperator
+from diracx.core.models import (
+    ScalarSearchOperator,
+    SearchCountMode,
+    SearchExportFormat,
+    SearchSpec,
+    VectorSearchOperator,
+)
 from diracx.core.preferences import OutputFormats, get_diracx_preferences
 
 from .utils import AsyncTyper
@@ -64,21 +71,75 @@ async def search(
     all: bool = False,
     page: int = 1,
     per_page: int = 10,
+    cursor: Annotated[
+        str | None,
+        Option(
+            help='Use cursor pagination instead of pages. Pass "" to get the '
+            "first page, then the cursor printed by the previous call."
+        ),
+    ] = None,
+    count: Annotated[
+        SearchCountMode,
+        Option(help="How to compute the total number of matching jobs."),
+    ] = SearchCountMode.EXACT,
 ):
     search_specs = [parse_condition(cond) for cond in condition]
     async with AsyncDiracClient() as api:
-        jobs, content_range = await api.jobs.search(
+        jobs, content_range, next_cursor = await api.jobs.search(
             parameters=None if all else parameter,
             search=search_specs if search_specs else None,
             page=page,
             per_page=per_page,
+            cursor=cursor,
+            count=count,
             cls=lambda _, jobs, headers: (
                 jobs,
                 ContentRange(headers.get("Content-Range", "jobs")),
+                headers.get("Next-Cursor"),
             ),
         )
 
     display(jobs, cast(ContentRange, content_range))
+    if next_cursor:
+        print(
+            f"More jobs are available, use --cursor {next_cursor} to get them",
+            file=sys.stderr,
+        )
+
+
+@app.async_command()
+async def export(
+    parameter: list[str] = [
+        "JobID",
+        "Status",
+        "MinorStatus",
+        "ApplicationStatus",
+        "JobGroup",
+        "Site",
+        "JobName",
+        "Owner",
+        "LastUpdateTime",
+    ],
+    condition: Annotated[
+        list[str], Option(help=f'Example: "JobID eq 1000". {available_operators}')
+    ] = [],
+    all: bool = False,
+    format: Annotated[
+        SearchExportFormat,
+        Option(help="Output format, written to stdout as it is received."),
+    ] = SearchExportFormat.NDJSON,
+):
+    """Export all the matching jobs, without pagination."""
+    search_specs = [parse_condition(cond) for cond in condition]
+    async with AsyncDiracClient() as api:
+        chunks = await api.jobs.export_search(
+            parameters=None if all else parameter,
+            search=search_specs if search_specs else None,
+            format=format,
+        )
+        async for chunk in chunks:
+            sys.stdout.buffer.write(chunk)
+    sys.stdout.buffer.flush()
 
 
 class ContentRange:
@@ -86,11 +147,14 @@ class ContentRange:
     start: int | None = None
     end: int | None = None
     total: int | None = None
+    approximate: bool = False
 
     def __init__(self, header: str):
-        if match := re.fullmatch(r"(\w+) (\d+-\d+|\*)/(\d+|\*)", header):
+        if match := re.fullmatch(r"(\w+) (\d+-\d+|\*)/(~?\d+|\*)", header):
             self.unit, range, total = match.groups()
-            self.total = int(total)
+            if total != "*":
+                self.approximate = total.startswith("~")
+                self.total = int(total.lstrip("~"))
             if range != "*":
                 self.start, self.end = map(int, range.split("-"))
         elif match := re.fullmatch(r"\w+", header):
@@ -104,7 +168,7 @@ class ContentRange:
             range_str = (
                 f"{self.start if self.start is not None else 'unknown'}-"
                 f"{self.end if self.end is not None else 'unknown'} "
-                f"of {self.total or 'unknown'}"
+                f"of {'~' if self.approximate else ''}{self.total or 'unknown'}"
             )
         return f"Showing {range_str} {self.unit}"
 
@@ -88,6 +88,20 @@ async def test_search(with_cli_login, jdl_file, capfd):
     assert cap.err == ""
     assert "[]" == cap.out.strip()
 
+    # Use cursor pagination: the next cursor is printed on stderr
+    await cli.jobs.search(per_page=5, cursor="")
+    cap = capfd.readouterr()
+    jobs = json.loads(cap.out)
+    assert len(jobs) == 5
+    assert "--cursor" in cap.err
+    next_cursor = cap.err.split("--cursor ")[1].split()[0]
+
+    await cli.jobs.search(per_page=5, cursor=next_cursor)
+    cap = capfd.readouterr()
+    assert {job["JobID"] for job in json.loads(cap.out)}.isdisjoint(
+        job["JobID"] for job in jobs
+    )
+
     # Switch to RICH output
     get_diracx_preferences.cache_clear()
     os.environ["DIRACX_OUTPUT_FORMAT"] = "RICH"
@@ -120,3 +134,18 @@ async def test_search(with_cli_login, jdl_file, capfd):
     cap = capfd.readouterr()
     assert cap.err == ""
     assert "No jobs found" in cap.out
+
+
+async def test_export(with_cli_login, jdl_file, capfdbinary):
+    """Test exporting all the jobs as NDJSON."""
+    with open(jdl_file, "r") as x:
+        what_we_submit = x.read()
+    await cli.jobs.submit([StringIO(what_we_submit) for _ in range(5)])
+    capfdbinary.readouterr()
+
+    await cli.jobs.export(parameter=["JobID", "Status"])
+    cap = capfdbinary.readouterr()
+    assert cap.err == b""
+    jobs = [json.loads(line) for line in cap.out.splitlines()]
+    assert len(jobs) >= 5
+    assert all(job.keys() == {"JobID", "Status"} for job in jobs)
@@ -51,6 +51,8 @@ from ._enums import (  # type: ignore
     SandboxFormat,
     SandboxType,
     ScalarSearchOperator,
+    SearchCountMode,
+    SearchExportFormat,
     SortDirection,
     VectorSearchOperator,
 )
@@ -95,6 +97,8 @@ __all__ = [
     "SandboxFormat",
     "SandboxType",
     "ScalarSearchOperator",
+    "SearchCountMode",
+    "SearchExportFormat",
     "SortDirection",
     "VectorSearchOperator",
 ]
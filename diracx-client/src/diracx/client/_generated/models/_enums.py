@@ -38,6 +38,7 @@ class SandboxFormat(str, Enum, metaclass=CaseInsensitiveEnumMeta):
     """SandboxFormat."""
 
     TAR_BZ2 = "tar.bz2"
+    TAR_ZST = "tar.zst"
 
 
 class SandboxType(str, Enum, metaclass=CaseInsensitiveEnumMeta):
@@ -57,6 +58,21 @@ class ScalarSearchOperator(str, Enum, metaclass=CaseInsensitiveEnumMeta):
     LIKE = "like"
 
 
+class SearchCountMode(str, Enum, metaclass=CaseInsensitiveEnumMeta):
+    """How the total number of results of a search is obtained."""
+
+    EXACT = "exact"
+    ESTIMATE = "estimate"
+    NONE = "none"
+
+
+class SearchExportFormat(str, Enum, metaclass=CaseInsensitiveEnumMeta):
+    """Serialisation format used when exporting search results."""
+
+    NDJSON = "ndjson"
+    ARROW = "arrow"
+
+
 class SortDirection(str, Enum, metaclass=CaseInsensitiveEnumMeta):
     """SortDirection."""
 
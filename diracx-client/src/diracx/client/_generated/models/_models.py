@@ -369,13 +369,23 @@ class JobSearchParams(_serialization.Model):
     :vartype sort: list[~_generated.models.SortSpec]
     :ivar distinct: Distinct.
     :vartype distinct: bool
+    :ivar logging_info_last: Logging Info Last.
+    :vartype logging_info_last: int
+    :ivar logging_info_major_only: Logging Info Major Only.
+    :vartype logging_info_major_only: bool
     """
 
+    _validation = {
+        "logging_info_last": {"minimum": 1},
+    }
+
     _attribute_map = {
         "parameters": {"key": "parameters", "type": "[str]"},
         "search": {"key": "search", "type": "[JobSearchParamsSearchItem]"},
         "sort": {"key": "sort", "type": "[SortSpec]"},
         "distinct": {"key": "distinct", "type": "bool"},
+        "logging_info_last": {"key": "logging_info_last", "type": "int"},
+        "logging_info_major_only": {"key": "logging_info_major_only", "type": "bool"},
     }
 
     def __init__(
@@ -385,6 +395,8 @@ class JobSearchParams(_serialization.Model):
         search: List["_models.JobSearchParamsSearchItem"] = [],
         sort: List["_models.SortSpec"] = [],
         distinct: bool = False,
+        logging_info_last: Optional[int] = None,
+        logging_info_major_only: bool = False,
         **kwargs: Any
     ) -> None:
         """
@@ -396,12 +408,18 @@ class JobSearchParams(_serialization.Model):
         :paramtype sort: list[~_generated.models.SortSpec]
         :keyword distinct: Distinct.
         :paramtype distinct: bool
+        :keyword logging_info_last: Logging Info Last.
+        :paramtype logging_info_last: int
+        :keyword logging_info_major_only: Logging Info Major Only.
+        :paramtype logging_info_major_only: bool
         """
         super().__init__(**kwargs)
         self.parameters = parameters
         self.search = search
         self.sort = sort
         self.distinct = distinct
+        self.logging_info_last = logging_info_last
+        self.logging_info_major_only = logging_info_major_only
 
 
 class JobSearchParamsSearchItem(_serialization.Model):
@@ -699,7 +717,7 @@ class SandboxInfo(_serialization.Model):
     :vartype checksum: str
     :ivar size: Size. Required.
     :vartype size: int
-    :ivar format: SandboxFormat. Required. "tar.bz2"
+    :ivar format: SandboxFormat. Required. Known values are: "tar.bz2" and "tar.zst".
     :vartype format: str or ~_generated.models.SandboxFormat
     """
 
@@ -733,7 +751,7 @@ class SandboxInfo(_serialization.Model):
         :paramtype checksum: str
         :keyword size: Size. Required.
         :paramtype size: int
-        :keyword format: SandboxFormat. Required. "tar.bz2"
+        :keyword format: SandboxFormat. Required. Known values are: "tar.bz2" and "tar.zst".
         :paramtype format: str or ~_generated.models.SandboxFormat
         """
         super().__init__(**kwargs)
@@ -11,12 +11,19 @@ __all__ = [
     "JobsOperations",
 ]
 
-from typing import Any, Unpack
+from typing import Any, AsyncIterator, Unpack
 
 from azure.core.tracing.decorator_async import distributed_trace_async
 
 from ..._generated.aio.operations._operations import JobsOperations as _JobsOperations
-from .common import make_search_body, make_summary_body, SearchKwargs, SummaryKwargs
+from .common import (
+    make_export_body,
+    make_search_body,
+    make_summary_body,
+    ExportKwargs,
+    SearchKwargs,
+    SummaryKwargs,
+)
 
 # We're intentionally ignoring overrides here because we want to change the interface.
 # mypy: disable-error-code=override
@@ -28,6 +35,13 @@ class JobsOperations(_JobsOperations):
         """TODO"""
         return await super().search(**make_search_body(**kwargs))
 
+    @distributed_trace_async
+    async def export_search(
+        self, **kwargs: Unpack[ExportKwargs]
+    ) -> AsyncIterator[bytes]:
+        """Stream all the jobs matching the search, see ``search`` for the arguments."""
+        return await super().export_search(**make_export_body(**kwargs))
+
     @distributed_trace_async
     async def summary(self, **kwargs: Unpack[SummaryKwargs]) -> list[dict[str, Any]]:
         """TODO"""
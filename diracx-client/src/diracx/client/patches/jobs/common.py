@@ -5,6 +5,8 @@ from __future__ import annotations
 __all__ = [
     "make_search_body",
     "SearchKwargs",
+    "make_export_body",
+    "ExportKwargs",
     "make_summary_body",
     "SummaryKwargs",
 ]
@@ -13,7 +15,7 @@ import json
 from io import BytesIO
 from typing import Any, IO, TypedDict, Unpack, cast, Literal
 
-from diracx.core.models import SearchSpec
+from diracx.core.models import SearchCountMode, SearchExportFormat, SearchSpec
 
 
 class ResponseExtra(TypedDict, total=False):
@@ -32,6 +34,8 @@ class SearchBody(TypedDict, total=False):
 class SearchExtra(ResponseExtra, total=False):
     page: int
     per_page: int
+    cursor: str | None
+    count: SearchCountMode
 
 
 class SearchKwargs(SearchBody, SearchExtra): ...
@@ -57,6 +61,33 @@ def make_search_body(**kwargs: Unpack[SearchKwargs]) -> UnderlyingSearchArgs:
     return result
 
 
+class ExportExtra(ResponseExtra, total=False):
+    format: SearchExportFormat
+
+
+class ExportKwargs(SearchBody, ExportExtra): ...
+
+
+class UnderlyingExportArgs(ResponseExtra, total=False):
+    # FIXME: The autorest-generated has a bug that it expected IO[bytes] despite
+    # the code being generated to support IO[bytes] | bytes.
+    body: IO[bytes]
+
+
+def make_export_body(**kwargs: Unpack[ExportKwargs]) -> UnderlyingExportArgs:
+    body: SearchBody = {}
+    for key in SearchBody.__optional_keys__:
+        if key not in kwargs:
+            continue
+        key = cast(Literal["parameters", "search", "sort"], key)
+        value = kwargs.pop(key)
+        if value is not None:
+            body[key] = value
+    result: UnderlyingExportArgs = {"body": BytesIO(json.dumps(body).encode("utf-8"))}
+    result.update(cast(ExportExtra, kwargs))
+    return result
+
+
 class SummaryBody(TypedDict, total=False):
     grouping: list[str]
     search: list[str]
@@ -11,12 +11,19 @@ __all__ = [
     "JobsOperations",
 ]
 
-from typing import Any, Unpack
+from typing import Any, Iterator, Unpack
 
 from azure.core.tracing.decorator import distributed_trace
 
 from ..._generated.operations._operations import JobsOperations as _JobsOperations
-from .common import make_search_body, make_summary_body, SearchKwargs, SummaryKwargs
+from .common import (
+    make_export_body,
+    make_search_body,
+    make_summary_body,
+    ExportKwargs,
+    SearchKwargs,
+    SummaryKwargs,
+)
 
 # We're intentionally ignoring overrides here because we want to change the interface.
 # mypy: disable-error-code=override
@@ -28,6 +35,11 @@ class JobsOperations(_JobsOperations):
         """TODO"""
         return super().search(**make_search_body(**kwargs))
 
+    @distributed_trace
+    def export_search(self, **kwargs: Unpack[ExportKwargs]) -> Iterator[bytes]:
+        """Stream all the jobs matching the search, see ``search`` for the arguments."""
+        return super().export_search(**make_export_body(**kwargs))
+
     @distributed_trace
     def summary(self, **kwargs: Unpack[SummaryKwargs]) -> list[dict[str, Any]]:
         """TODO"""
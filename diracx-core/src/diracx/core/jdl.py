@@ -0,0 +1,133 @@
+"""Native parser for the Job Description Language (JDL).
+
+The JDLs are parsed in the same way as by DIRAC's ``ClassAdLight``: a JDL is a
+``[ ... ]`` enclosure of ``Name = expression;`` attributes, an expression
+being kept as a string. The result is immutable so that the parsed JDLs can be
+shared through ``parse_jdl_cached``, which avoids parsing again the identical
+JDLs of bulk submissions.
+"""
+
+from __future__ import annotations
+
+__all__ = ["JDL", "parse_jdl", "parse_jdl_cached"]
+
+import re
+from collections.abc import Iterator, Mapping
+from functools import lru_cache
+from types import MappingProxyType
+
+# The name of an attribute and its expression up to the end of the attribute or
+# the start of a nested JDL
+_ATTRIBUTE_RE = re.compile(r"([^=]*)=([^;\[]*)(;|\[|\Z)")
+_BRACKET_RE = re.compile(r"[\[\]]")
+
+
+class JDL(Mapping[str, str]):
+    """A parsed JDL, mapping the names of the attributes to their expressions.
+
+    The accessors interpret the expressions like the ``ClassAd`` methods of
+    the same name.
+    """
+
+    __slots__ = ("_expressions",)
+
+    def __init__(self, expressions: Mapping[str, str]):
+        self._expressions = MappingProxyType(dict(expressions))
+
+    def __getitem__(self, name: str) -> str:
+        return self._expressions[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._expressions)
+
+    def __len__(self) -> int:
+        return len(self._expressions)
+
+    def __repr__(self) -> str:
+        return f"JDL({dict(self._expressions)!r})"
+
+    def get_string(self, name: str) -> str:
+        """Get the value of a string attribute, empty if it is not set."""
+        return self._expressions.get(name, "").replace('"', "")
+
+    def get_int(self, name: str) -> int | None:
+        """Get the value of an integer attribute, None if it is not set or invalid."""
+        if name not in self._expressions:
+            return None
+        try:
+            return int(self.get_string(name))
+        except ValueError:
+            return None
+
+    def is_list(self, name: str) -> bool:
+        """Whether the attribute is a list."""
+        return self._expressions.get(name, "").strip().startswith("{")
+
+    def get_list(self, name: str) -> tuple[str, ...]:
+        """Get the items of a list attribute, a scalar being split on commas."""
+        expression = self._expressions.get(name, "").strip()
+        list_mode = expression.startswith("{")
+        if list_mode:
+            expression = expression[1:-1]
+        expression = expression.replace(" ", "").replace("\n", "")
+
+        if not list_mode and "{" not in expression:
+            expression = expression.replace('"', "")
+            return tuple(expression.split(",")) if expression else ()
+
+        items = []
+        while expression:
+            if expression.startswith("{"):
+                end = expression.find("}") + 1
+                items.append(expression[:end])
+            elif expression.startswith('"'):
+                end = max(expression.find('"', 1), 0)
+                items.append(expression[1:end])
+                end += 1
+            else:
+                end = expression.find(",")
+                if end < 0:
+                    items.append(expression.replace('"', ""))
+                    break
+                items.append(expression[:end].replace('"', ""))
+            expression = expression[end:]
+            if expression.startswith(","):
+                expression = expression[1:]
+        return tuple(items)
+
+
+def parse_jdl(jdl: str) -> JDL:
+    """Parse a JDL, an invalid one giving an empty JDL."""
+    jdl = jdl.strip()
+    if not (jdl.startswith("[") and jdl.endswith("]")):
+        return JDL({})
+
+    body = jdl[1:-1]
+    expressions = {}
+    index = 0
+    while match := _ATTRIBUTE_RE.match(body, index):
+        name, value, end = match.groups()
+        index = match.end()
+        if end == "[":
+            # The value is the nested JDL, up to the matching bracket
+            start = index - 1
+            depth = 1
+            for bracket in _BRACKET_RE.finditer(body, index):
+                depth += 1 if bracket.group() == "[" else -1
+                if depth == 0:
+                    index = bracket.end()
+                    break
+            else:
+                return JDL({})
+            value = body[start:index]
+            if body.startswith(";", index):
+                index += 1
+        elif end == ";" and not value:
+            # An attribute without value
+            return JDL({})
+        expressions[name.strip()] = value.strip().replace("\n", "")
+    return JDL(expressions)
+
+
+# The JDLs of bulk submissions are usually identical
+parse_jdl_cached = lru_cache(maxsize=1024)(parse_jdl)
@@ -65,11 +65,33 @@ class JobSummaryParams(BaseModel):
     # TODO: Add more validation
 
 
+class SearchCountMode(StrEnum):
+    """How the total number of results of a search is obtained."""
+
+    EXACT = "exact"
+    # Use the table statistics or a recently computed count if available
+    ESTIMATE = "estimate"
+    NONE = "none"
+
+
+class SearchExportFormat(StrEnum):
+    """Serialisation format used when exporting search results."""
+
+    # One JSON object per line
+    NDJSON = "ndjson"
+    # Apache Arrow IPC stream, one record batch per chunk of rows
+    ARROW = "arrow"
+
+
 class JobSearchParams(BaseModel):
     parameters: list[str] | None = None
     search: list[SearchSpec] = []
     sort: list[SortSpec] = []
     distinct: bool = False
+    # Only return the last N LoggingInfo records of each job
+    logging_info_last: int | None = Field(default=None, ge=1)
+    # Only return the LoggingInfo records which change the status of the job
+    logging_info_major_only: bool = False
     # TODO: Add more validation
 
 
@@ -152,6 +174,7 @@ class ChecksumAlgorithm(StrEnum):
 
 class SandboxFormat(StrEnum):
     TAR_BZ2 = "tar.bz2"
+    TAR_ZST = "tar.zst"
 
 
 class SandboxInfo(BaseModel):
@@ -43,6 +43,8 @@ class DiracxPreferences(BaseSettings):
     credentials_path: Path = Field(
         default_factory=lambda: Path.home() / ".cache" / "diracx" / "credentials.json"
     )
+    sandbox_cache_path: Path | None = None
+    sandbox_cache_max_size: int = 1024 * 1024 * 1024
 
     @classmethod
     def from_env(cls):
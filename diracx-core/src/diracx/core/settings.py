@@ -6,6 +6,7 @@ import json
 
 from diracx.core.properties import SecurityProperty
 from diracx.core.s3 import s3_bucket_exists
+from diracx.core.utils import CoalescingBuffer
 
 __all__ = (
     "SqlalchemyDsn",
@@ -13,10 +14,14 @@ __all__ = (
     "ServiceSettingsBase",
 )
 
+import asyncio
 import contextlib
+import logging
+import multiprocessing
 from collections.abc import AsyncIterator
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import TYPE_CHECKING, Annotated, Any, Self, TypeVar, cast
+from typing import TYPE_CHECKING, Annotated, Any, Literal, Self, TypeVar, cast
 
 from aiobotocore.session import get_session
 from botocore.config import Config
@@ -38,6 +43,8 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 if TYPE_CHECKING:
     from types_aiobotocore_s3.client import S3Client
 
+logger = logging.getLogger(__name__)
+
 T = TypeVar("T")
 
 
@@ -169,6 +176,104 @@ class AuthSettings(ServiceSettingsBase):
     )
 
 
+class JobsSettings(ServiceSettingsBase):
+    """Settings for the jobs service."""
+
+    model_config = SettingsConfigDict(env_prefix="DIRACX_SERVICE_JOBS_")
+
+    # Heartbeats are coalesced per job for up to this many seconds before being
+    # written to the databases, 0 writes them synchronously. Buffered heartbeats
+    # are lost if the service crashes so this must stay well below the time
+    # after which jobs are considered stalled.
+    heartbeat_buffer_seconds: float = Field(default=0, ge=0, le=300)
+    # Number of jobs after which the buffered heartbeats are written immediately
+    heartbeat_buffer_max_jobs: int = Field(default=10_000, gt=0)
+    # Maximum number of jobs which can be submitted at once, including the
+    # jobs generated from a parametric JDL
+    max_parametric_jobs: int = Field(default=20, gt=0)
+    # Where the JDLs are parsed, checked and compressed: "inline" blocks the
+    # event loop, "thread" keeps it responsive and "process" also spreads the
+    # work of large submissions over several cores. The number of workers
+    # bounds how many chunks of JDLs are processed concurrently.
+    jdl_executor_type: Literal["inline", "thread", "process"] = "thread"
+    jdl_executor_workers: int = Field(default=4, gt=0)
+    # Whether the job summaries are computed from the JobsSummary counters
+    # rather than from the Jobs table. The counters are only maintained by
+    # DiracX: they must be filled with `python -m diracx.db rebuild-job-summary`
+    # before enabling this, which must stay disabled as long as legacy DIRAC
+    # services also write to the JobDB.
+    summary_from_counters: bool = False
+    _heartbeat_buffer: CoalescingBuffer[int] | None = PrivateAttr(None)
+    _jdl_executor: Executor | None = PrivateAttr(None)
+
+    @classmethod
+    def create(cls) -> Self:
+        return cls()
+
+    @contextlib.asynccontextmanager
+    async def lifetime_function(self) -> AsyncIterator[None]:
+        flush_task = None
+        if self.heartbeat_buffer_seconds:
+            self._heartbeat_buffer = CoalescingBuffer(
+                self.heartbeat_buffer_seconds, self.heartbeat_buffer_max_jobs
+            )
+            flush_task = asyncio.create_task(
+                _flush_periodically(self._heartbeat_buffer)
+            )
+        if self.jdl_executor_type == "thread":
+            self._jdl_executor = ThreadPoolExecutor(
+                self.jdl_executor_workers, thread_name_prefix="diracx-jdl"
+            )
+        elif self.jdl_executor_type == "process":
+            # Forking a process which runs an event loop and threads is unsafe
+            self._jdl_executor = ProcessPoolExecutor(
+                self.jdl_executor_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        try:
+            yield
+        finally:
+            if self._jdl_executor:
+                self._jdl_executor.shutdown(cancel_futures=True)
+                self._jdl_executor = None
+            if flush_task:
+                flush_task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await flush_task
+            buffer, self._heartbeat_buffer = self._heartbeat_buffer, None
+            if buffer and buffer.flusher:
+                await buffer.flusher()
+            if buffer:
+                logger.warning(
+                    "Discarding the buffered heartbeats of %d jobs", len(buffer)
+                )
+
+    @property
+    def heartbeat_buffer(self) -> CoalescingBuffer[int] | None:
+        """The buffer for heartbeats, if enabled."""
+        return self._heartbeat_buffer
+
+    @property
+    def jdl_executor(self) -> Executor | None:
+        """The executor in which to process JDLs, None to do it inline."""
+        return self._jdl_executor
+
+
+async def _flush_periodically(buffer: CoalescingBuffer) -> None:
+    """Flush ``buffer`` whenever it is due, until cancelled."""
+    while True:
+        await buffer.wait_due()
+        if buffer.flusher is None:
+            # Nothing knows how to write the values yet
+            await asyncio.sleep(buffer.max_age)
+            continue
+        try:
+            await buffer.flusher()
+        except Exception:
+            logger.exception("Failed to flush the buffer")
+            await asyncio.sleep(buffer.max_age)
+
+
 class SandboxStoreSettings(ServiceSettingsBase):
     """Settings for the sandbox store."""
 
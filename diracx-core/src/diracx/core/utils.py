@@ -6,20 +6,24 @@ __all__ = [
     "read_credentials",
     "write_credentials",
     "TwoLevelCache",
+    "CoalescingBuffer",
     "batched_async",
 ]
 
+import asyncio
+import contextlib
 import fcntl
 import json
 import os
 import re
 import threading
 from collections import defaultdict
-from collections.abc import Callable
+from collections.abc import Awaitable, Callable
 from concurrent.futures import Future, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, AsyncIterable, TypeVar
+from time import monotonic
+from typing import Any, AsyncIterable, Generic, TypeVar
 
 from cachetools import Cache, TTLCache
 
@@ -29,6 +33,7 @@ from diracx.core.models import TokenResponse
 EXPIRES_GRACE_SECONDS = 15
 
 T = TypeVar("T")
+K = TypeVar("K")
 
 
 def dotenv_files_from_environment(prefix: str) -> list[str]:
@@ -232,6 +237,80 @@ class TwoLevelCache:
         self.locks.clear()
 
 
+class CoalescingBuffer(Generic[K]):
+    """Accumulate the latest values given for each key until they are taken.
+
+    This is used to implement write-behind buffers: values are added with
+    ``add`` and merged with the ones already buffered for the same key, the
+    most recent value of each field being kept. Once ``due`` the owner of the
+    buffer should ``take`` the values and write them. If the write fails the
+    values can be put back with ``restore`` without overwriting anything
+    added in the meantime.
+
+    The code adding the values can also set ``flusher`` to a coroutine
+    function which writes them, allowing the buffer to be flushed in the
+    background once ``wait_due`` returns and when shutting down.
+
+    Args:
+        max_age (float): Number of seconds after which the oldest buffered
+                         value makes the buffer due.
+        max_items (int): Number of keys after which the buffer is due.
+
+    """
+
+    def __init__(self, max_age: float, max_items: int):
+        self.max_age = max_age
+        self.max_items = max_items
+        self._items: dict[K, dict[str, Any]] = {}
+        self._oldest: float | None = None
+        self._added = asyncio.Event()
+        self.flusher: Callable[[], Awaitable[None]] | None = None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def due(self) -> bool:
+        """Whether the buffered values should be written."""
+        if len(self._items) >= self.max_items:
+            return True
+        return self._oldest is not None and monotonic() - self._oldest >= self.max_age
+
+    def add(self, key: K, values: dict[str, Any]) -> None:
+        """Buffer ``values`` for ``key``, replacing any older value."""
+        if self._oldest is None:
+            self._oldest = monotonic()
+        self._items.setdefault(key, {}).update(values)
+        self._added.set()
+
+    def take(self) -> dict[K, dict[str, Any]]:
+        """Remove and return all the buffered values."""
+        items, self._items = self._items, {}
+        self._oldest = None
+        return items
+
+    def restore(self, items: dict[K, dict[str, Any]]) -> None:
+        """Put back values previously taken, keeping the newer buffered ones."""
+        if not items:
+            return
+        if self._oldest is None:
+            self._oldest = monotonic()
+        for key, values in items.items():
+            self._items[key] = values | self._items.get(key, {})
+        self._added.set()
+
+    async def wait_due(self) -> None:
+        """Wait until the buffered values should be written."""
+        while not self.due:
+            self._added.clear()
+            if self._oldest is None:
+                await self._added.wait()
+            else:
+                timeout = self._oldest + self.max_age - monotonic()
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._added.wait(), timeout)
+
+
 async def batched_async(
     iterable: AsyncIterable[T], n: int, *, strict: bool = False
 ) -> AsyncIterable[tuple[T, ...]]:
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import asyncio
+
+from diracx.core.settings import JobsSettings
+
+
+async def test_jobs_settings_flush_heartbeats():
+    """The heartbeat buffer is flushed in the background and at shutdown."""
+    settings = JobsSettings(heartbeat_buffer_seconds=0.1, jdl_executor_type="inline")
+    flushed = []
+
+    async with settings.lifetime_function():
+        buffer = settings.heartbeat_buffer
+        assert buffer is not None
+
+        async def flusher():
+            flushed.append(buffer.take())
+
+        buffer.flusher = flusher
+        buffer.add(1, {"a": 1})
+        await asyncio.sleep(0.3)
+        assert flushed == [{1: {"a": 1}}]
+
+        buffer.add(2, {"a": 2})
+    assert flushed == [{1: {"a": 1}}, {2: {"a": 2}}]
+    assert settings.heartbeat_buffer is None
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import fcntl
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
@@ -8,6 +9,7 @@ import pytest
 
 from diracx.core.models import TokenResponse
 from diracx.core.utils import (
+    CoalescingBuffer,
     dotenv_files_from_environment,
     read_credentials,
     serialize_credentials,
@@ -168,3 +170,57 @@ def test_read_credentials_valid_file(tmp_path):
     assert credentials.expires_in < token_response.expires_in
     assert credentials.token_type == token_response.token_type
     assert credentials.refresh_token == token_response.refresh_token
+
+
+def test_coalescing_buffer(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr("diracx.core.utils.monotonic", lambda: now)
+    buffer: CoalescingBuffer[int] = CoalescingBuffer(max_age=10, max_items=3)
+    assert not buffer.due
+
+    # The latest value of each field is kept
+    buffer.add(1, {"a": 1, "b": 1})
+    buffer.add(1, {"b": 2})
+    buffer.add(2, {"a": 3})
+    assert len(buffer) == 2
+    assert not buffer.due
+    now += 10
+    assert buffer.due
+
+    items = buffer.take()
+    assert items == {1: {"a": 1, "b": 2}, 2: {"a": 3}}
+    assert len(buffer) == 0
+    assert not buffer.due
+
+    # Restored values don't overwrite the ones added in the meantime
+    buffer.add(1, {"b": 3})
+    buffer.restore(items)
+    assert buffer.take() == {1: {"a": 1, "b": 3}, 2: {"a": 3}}
+
+    # The buffer is due once there are enough keys
+    for key in range(3):
+        buffer.add(key, {})
+    assert buffer.due
+
+
+async def test_coalescing_buffer_wait_due():
+    buffer: CoalescingBuffer[int] = CoalescingBuffer(max_age=0.1, max_items=3)
+
+    # Nothing is due as long as the buffer is empty
+    with pytest.raises(TimeoutError):
+        await asyncio.wait_for(buffer.wait_due(), 0.2)
+
+    # The oldest value makes the buffer due once it is old enough
+    waiter = asyncio.create_task(buffer.wait_due())
+    await asyncio.sleep(0)
+    buffer.add(1, {"a": 1})
+    await asyncio.sleep(0.05)
+    assert not waiter.done()
+    await asyncio.wait_for(waiter, 1)
+    buffer.take()
+
+    # Reaching the maximum number of keys makes it due immediately
+    waiter = asyncio.create_task(buffer.wait_due())
+    for key in range(3):
+        buffer.add(key, {})
+    await asyncio.wait_for(waiter, 0.05)
@@ -21,9 +21,46 @@ def parse_args():
     )
     init_os_parser.set_defaults(func=init_os)
 
+    rebuild_job_summary_parser = subparsers.add_parser(
+        "rebuild-job-summary",
+        help=(
+            "Recompute the number of jobs per status, site, owner, etc. in JobDB, "
+            "which must be done before enabling summary_from_counters"
+        ),
+    )
+    rebuild_job_summary_parser.set_defaults(func=rebuild_job_summary)
+
+    rebuild_logging_timeline_parser = subparsers.add_parser(
+        "rebuild-logging-timeline",
+        help=(
+            "Recompute the time of the latest status changes in JobLoggingDB, "
+            "which must be done once after creating the LoggingTimeline table"
+        ),
+    )
+    rebuild_logging_timeline_parser.set_defaults(func=rebuild_logging_timeline)
+
+    compact_heartbeats_parser = subparsers.add_parser(
+        "compact-heartbeat-data",
+        help="Downsample the old heartbeat data of the jobs in JobDB",
+    )
+    compact_heartbeats_parser.add_argument(
+        "--older-than-days",
+        type=float,
+        default=7,
+        help="Only compact the data recorded more than this many days ago",
+    )
+    compact_heartbeats_parser.add_argument(
+        "--resolution",
+        choices=["MINUTE", "HOUR", "DAY"],
+        default="HOUR",
+        help="Keep one value per job and field for each interval of this length",
+    )
+    compact_heartbeats_parser.set_defaults(func=compact_heartbeat_data)
+
     args = parser.parse_args()
     logger.setLevel(logging.INFO)
-    asyncio.run(args.func())
+    kwargs = {k: v for k, v in vars(args).items() if k != "func"}
+    asyncio.run(args.func(**kwargs))
 
 
 async def init_sql():
@@ -52,5 +89,41 @@ async def init_os():
             await db.create_index_template()
 
 
+async def rebuild_job_summary():
+    logger.info("Rebuilding the job summary")
+    from diracx.db.sql.utils import BaseSQLDB
+
+    db_url = BaseSQLDB.available_urls()["JobDB"]
+    db = BaseSQLDB.available_implementations("JobDB")[0](db_url)
+    async with db.engine_context():
+        async with db:
+            await db.rebuild_summary()
+
+
+async def rebuild_logging_timeline():
+    logger.info("Rebuilding the logging timeline")
+    from diracx.db.sql.utils import BaseSQLDB
+
+    db_url = BaseSQLDB.available_urls()["JobLoggingDB"]
+    db = BaseSQLDB.available_implementations("JobLoggingDB")[0](db_url)
+    async with db.engine_context():
+        async with db:
+            await db.rebuild_timeline()
+
+
+async def compact_heartbeat_data(older_than_days, resolution):
+    logger.info("Compacting the heartbeat data older than %s days", older_than_days)
+    from diracx.db.sql.utils import BaseSQLDB, substract_date
+
+    db_url = BaseSQLDB.available_urls()["JobDB"]
+    db = BaseSQLDB.available_implementations("JobDB")[0](db_url)
+    async with db.engine_context():
+        async with db:
+            deleted = await db.compact_heartbeat_data(
+                substract_date(days=older_than_days), resolution
+            )
+    logger.info("Deleted %d heartbeat records", deleted)
+
+
 if __name__ == "__main__":
     parse_args()
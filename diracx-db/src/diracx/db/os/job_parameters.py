@@ -41,3 +41,11 @@ class JobParametersDB(BaseOSDB):
             **document,
         }
         return super().upsert(vo, doc_id, document)
+
+    def bulk_upsert(self, vo, documents):
+        timestamp = int(datetime.now(tz=UTC).timestamp() * 1000)
+        documents = {
+            doc_id: {"JobID": doc_id, "timestamp": timestamp, **document}
+            for doc_id, document in documents.items()
+        }
+        return super().bulk_upsert(vo, documents)
@@ -2,12 +2,14 @@ from __future__ import annotations
 
 __all__ = ("BaseOSDB",)
 
+import asyncio
 import contextlib
 import json
 import logging
 import os
 from abc import ABCMeta, abstractmethod
-from collections.abc import AsyncIterator
+from collections import defaultdict
+from collections.abc import AsyncIterator, Iterator
 from contextvars import ContextVar
 from datetime import datetime
 from typing import Any, Self
@@ -76,6 +78,13 @@ class BaseOSDB(metaclass=ABCMeta):
     fields: dict
     index_prefix: str
 
+    # Maximum size of the body of a single _bulk request
+    bulk_max_bytes: int = 5 * 1024 * 1024
+    # Number of times the items rejected by OpenSearch with a transient error
+    # (e.g. because of a full write queue) are resent
+    bulk_max_retries: int = 3
+    bulk_retry_delay: float = 0.5
+
     @abstractmethod
     def index_name(self, vo: str, doc_id: int) -> str: ...
 
@@ -197,6 +206,77 @@ class BaseOSDB(metaclass=ABCMeta):
             response,
         )
 
+    async def bulk_upsert(self, vo: str, documents: dict[int, Any]) -> None:
+        """Upsert many documents using the ``_bulk`` API.
+
+        The documents are grouped by index and sent in requests of at most
+        ``bulk_max_bytes``. Items which fail with a transient error are retried
+        with an exponential backoff, other failures raise ``OpenSearchDBError``
+        once all the documents have been processed.
+        """
+        pending = dict(documents)
+        errors: dict[int, Any] = {}
+        for attempt in range(self.bulk_max_retries + 1):
+            if attempt:
+                await asyncio.sleep(self.bulk_retry_delay * 2 ** (attempt - 1))
+            retry: dict[int, Any] = {}
+            for index_name, body, doc_ids in self._bulk_upsert_requests(vo, pending):
+                response = await self.client.bulk(body=body, index=index_name)
+                logger.debug(
+                    "Bulk upserted %s documents in index %s in %sms",
+                    len(doc_ids),
+                    index_name,
+                    response["took"],
+                )
+                if not response["errors"]:
+                    continue
+                for doc_id, item in zip(doc_ids, response["items"], strict=True):
+                    result = item["update"]
+                    if result["status"] < 300:
+                        continue
+                    if result["status"] in _BULK_RETRYABLE_STATUSES:
+                        retry[doc_id] = pending[doc_id]
+                    else:
+                        errors[doc_id] = result.get("error")
+            pending = retry
+            if not pending:
+                break
+        else:
+            errors |= {doc_id: "Too many retries" for doc_id in pending}
+        if errors:
+            raise OpenSearchDBError(
+                f"Failed to upsert {len(errors)} documents in {self.index_prefix}: "
+                f"{errors}"
+            )
+
+    def _bulk_upsert_requests(
+        self, vo: str, documents: dict[int, Any]
+    ) -> Iterator[tuple[str, str, list[int]]]:
+        """Build the ``_bulk`` bodies for upserting ``documents``.
+
+        Yields tuples of (index name, NDJSON body, document IDs in the body).
+        """
+        by_index: defaultdict[str, list[int]] = defaultdict(list)
+        for doc_id in documents:
+            by_index[self.index_name(vo, doc_id)].append(doc_id)
+
+        dumps = self.client.transport.serializer.dumps
+        for index_name, doc_ids in by_index.items():
+            lines: list[str] = []
+            size = 0
+            chunk_ids: list[int] = []
+            for doc_id in doc_ids:
+                action = dumps({"update": {"_id": doc_id, "retry_on_conflict": 10}})
+                source = dumps({"doc": documents[doc_id], "doc_as_upsert": True})
+                item_size = len(action) + len(source) + 2
+                if chunk_ids and size + item_size > self.bulk_max_bytes:
+                    yield index_name, "\n".join(lines) + "\n", chunk_ids
+                    lines, size, chunk_ids = [], 0, []
+                lines += [action, source]
+                size += item_size
+                chunk_ids.append(doc_id)
+            yield index_name, "\n".join(lines) + "\n", chunk_ids
+
     async def search(
         self, parameters, search, sorts, *, per_page: int = 100, page: int | None = None
     ) -> list[dict[str, Any]]:
@@ -239,6 +319,11 @@ class BaseOSDB(metaclass=ABCMeta):
         return hits
 
 
+# Bulk item statuses which are worth retrying: version conflicts which remain
+# after retry_on_conflict, rejections from a full write queue and node failures
+_BULK_RETRYABLE_STATUSES = frozenset([409, 429, 502, 503, 504])
+
+
 def require_type(operator, field_name, field_type, allowed_types):
     if field_type not in allowed_types:
         raise InvalidQueryError(
@@ -2,19 +2,53 @@ from __future__ import annotations
 
 __all__ = ["JobDB"]
 
+from collections import Counter, defaultdict
 from datetime import datetime, timezone
-from typing import TYPE_CHECKING, Any, Iterable
-
-from sqlalchemy import bindparam, case, delete, func, insert, select, update
+from typing import TYPE_CHECKING, Any, AsyncIterator, Iterable, Literal
+from uuid import uuid4
+
+from cachetools import Cache, TTLCache
+from sqlalchemy import Column as RawColumn
+from sqlalchemy import (
+    Integer,
+    MetaData,
+    Table,
+    TypeDecorator,
+    bindparam,
+    case,
+    cast,
+    column,
+    delete,
+    func,
+    insert,
+    literal,
+    select,
+    table,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 if TYPE_CHECKING:
-    from sqlalchemy.sql.elements import BindParameter
+    from sqlalchemy import Insert
+    from sqlalchemy.sql.elements import BindParameter, ColumnElement
+    from sqlalchemy.types import TypeEngine
 
 from diracx.core.exceptions import InvalidQueryError
 from diracx.core.models import JobCommand, SearchSpec, SortSpec
 
-from ..utils import BaseSQLDB, apply_search_filters, apply_sort_constraints
-from ..utils.functions import utcnow
+from ..utils import (
+    BaseSQLDB,
+    add_sort_tiebreaker,
+    apply_keyset_constraints,
+    apply_search_filters,
+    apply_sort_constraints,
+    decode_cursor,
+    encode_cursor,
+)
+from ..utils.functions import date_trunc, utcnow
 from .schema import (
     HeartBeatLoggingInfo,
     InputData,
@@ -22,9 +56,22 @@ from .schema import (
     JobDBBase,
     JobJDLs,
     Jobs,
+    JobsSummary,
 )
 
 
+def _storage_type(column: str) -> TypeEngine:
+    """Get the type in which the values of a Jobs column are stored.
+
+    ``JobDB._set_job_attributes_fix_value`` already converts the values to
+    their stored form, so they must not go through a ``TypeDecorator`` again.
+    """
+    column_type = Jobs.__table__.c[column].type
+    if isinstance(column_type, TypeDecorator):
+        return column_type.impl_instance
+    return column_type
+
+
 def _get_columns(table, parameters):
     columns = [x for x in table.columns]
     if parameters:
@@ -36,9 +83,18 @@ def _get_columns(table, parameters):
     return columns
 
 
+# How JobDB.set_job_attributes issues the updates
+BulkUpdateStrategy = Literal["case", "grouped", "staging"]
+
+
 class JobDB(BaseSQLDB):
     metadata = JobDBBase.metadata
 
+    # Number of jobs up to which set_job_attributes uses a single statement with
+    # CASE expressions, and from which it goes through a staging table
+    bulk_update_max_case_jobs = 10
+    bulk_update_min_staging_jobs = 1000
+
     # Field names which should be stored in the HeartBeatLoggingInfo table
     heartbeat_fields = {
         "LoadAverage",
@@ -54,12 +110,50 @@ class JobDB(BaseSQLDB):
     # to find a way to make it dynamic
     jdl_2_db_parameters = ["JobName", "JobType", "JobGroup"]
 
-    async def summary(self, group_by, search) -> list[dict[str, str | int]]:
-        """Get a summary of the jobs."""
-        columns = _get_columns(Jobs.__table__, group_by)
+    # Attributes for which the number of jobs is maintained in JobsSummary
+    summary_fields = tuple(
+        c.name for c in JobsSummary.__table__.columns if c.name != "Count"
+    )
+
+    # Maximum number and lifetime, in seconds, of the owners cached by
+    # get_job_owners
+    job_owners_cache_size = 100_000
+    job_owners_cache_ttl = 3600
+
+    def __init__(self, db_url: str) -> None:
+        super().__init__(db_url)
+        # JobID -> (Owner, VO), the owner of a job never changes
+        self._job_owners: Cache = TTLCache(
+            self.job_owners_cache_size, self.job_owners_cache_ttl
+        )
 
-        stmt = select(*columns, func.count(Jobs.job_id).label("count"))
-        stmt = apply_search_filters(Jobs.__table__.columns.__getitem__, stmt, search)
+    async def summary(
+        self, group_by, search, *, use_counters: bool = False
+    ) -> list[dict[str, str | int]]:
+        """Get a summary of the jobs.
+
+        With ``use_counters``, if the grouping and the search only involve the
+        ``summary_fields``, the result is obtained from the JobsSummary table,
+        whose size depends on the number of distinct groups rather than on the
+        number of jobs. The counters are only maintained by DiracX, they must be
+        filled with ``rebuild_summary`` beforehand.
+        """
+        if (
+            use_counters
+            and group_by
+            and set(group_by) <= set(self.summary_fields)
+            and all(spec["parameter"] in self.summary_fields for spec in search)
+        ):
+            table = JobsSummary.__table__
+            columns = _get_columns(table, group_by)
+            count: ColumnElement[int] = cast(func.sum(table.c.Count), Integer)
+        else:
+            table = Jobs.__table__
+            columns = _get_columns(table, group_by)
+            count = func.count(Jobs.job_id)
+
+        stmt = select(*columns, count.label("count"))
+        stmt = apply_search_filters(table.columns.__getitem__, stmt, search)
         stmt = stmt.group_by(*columns)
 
         # Execute the query
@@ -78,8 +172,14 @@ class JobDB(BaseSQLDB):
         distinct: bool = False,
         per_page: int = 100,
         page: int | None = None,
-    ) -> tuple[int, list[dict[Any, Any]]]:
-        """Search for jobs in the database."""
+        count: bool = True,
+    ) -> tuple[int | None, list[dict[Any, Any]]]:
+        """Search for jobs in the database.
+
+        :param count: whether to compute the total number of matching jobs,
+            which requires a separate query over all the matching rows.
+            If False, the returned total is None.
+        """
         # Find which columns to select
         columns = _get_columns(Jobs.__table__, parameters)
 
@@ -92,9 +192,11 @@ class JobDB(BaseSQLDB):
             stmt = stmt.distinct()
 
         # Calculate total count before applying pagination
-        total_count_subquery = stmt.alias()
-        total_count_stmt = select(func.count()).select_from(total_count_subquery)
-        total = (await self.conn.execute(total_count_stmt)).scalar_one()
+        total = None
+        if count:
+            total_count_subquery = stmt.alias()
+            total_count_stmt = select(func.count()).select_from(total_count_subquery)
+            total = (await self.conn.execute(total_count_stmt)).scalar_one()
 
         # Apply pagination
         if page is not None:
@@ -109,6 +211,190 @@ class JobDB(BaseSQLDB):
             dict(row._mapping) async for row in (await self.conn.stream(stmt))
         ]
 
+    def stream_search(
+        self,
+        parameters: list[str] | None,
+        search: list[SearchSpec],
+        sorts: list[SortSpec],
+        *,
+        distinct: bool = False,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        """Search for jobs in the database without loading all of them in memory.
+
+        The query is validated when this is called, but it is only executed when
+        the returned iterator is consumed. The rows are then fetched from a
+        server-side cursor and yielded in batches of at most ``batch_size``.
+        """
+        if batch_size < 1:
+            raise InvalidQueryError("Batch size must be a positive integer")
+
+        columns = _get_columns(Jobs.__table__, parameters)
+
+        stmt = select(*columns)
+        stmt = apply_search_filters(Jobs.__table__.columns.__getitem__, stmt, search)
+        stmt = apply_sort_constraints(Jobs.__table__.columns.__getitem__, stmt, sorts)
+
+        if distinct:
+            stmt = stmt.distinct()
+
+        return self._stream_batches(stmt.execution_options(yield_per=batch_size))
+
+    def search_column_types(self, parameters: list[str] | None) -> dict[str, type]:
+        """Get the Python types of the values of the columns returned by the searches.
+
+        The columns whose values are not all of the same type are given as object.
+        """
+        column_types = {}
+        for col in _get_columns(Jobs.__table__, parameters):
+            try:
+                column_types[col.name] = col.type.python_type
+            except NotImplementedError:
+                column_types[col.name] = object
+        return column_types
+
+    async def _stream_batches(self, stmt) -> AsyncIterator[list[dict[str, Any]]]:
+        result = await self.conn.stream(stmt)
+        async for partition in result.partitions():
+            yield [dict(row._mapping) for row in partition]
+
+    async def estimate_job_count(self) -> int | None:
+        """Get an estimate of the total number of jobs from the table statistics.
+
+        This is only available with MySQL, for which the statistics are
+        maintained by InnoDB and can be off by up to 50%. None is returned
+        if no estimate is available.
+        """
+        if self.conn.dialect.name != "mysql":
+            return None
+        tables = table(
+            "TABLES",
+            column("TABLE_SCHEMA"),
+            column("TABLE_NAME"),
+            column("TABLE_ROWS"),
+            schema="information_schema",
+        )
+        stmt = select(tables.c.TABLE_ROWS).where(
+            tables.c.TABLE_SCHEMA == func.database(),
+            tables.c.TABLE_NAME == Jobs.__tablename__,
+        )
+        return (await self.conn.execute(stmt)).scalar_one_or_none()
+
+    async def search_by_cursor(
+        self,
+        parameters: list[str] | None,
+        search: list[SearchSpec],
+        sorts: list[SortSpec],
+        *,
+        per_page: int = 100,
+        cursor: str | None = None,
+    ) -> tuple[list[dict[Any, Any]], str | None]:
+        """Search for jobs in the database using keyset pagination.
+
+        Instead of skipping the rows of the previous pages, the query starts
+        right after the last row returned by the previous call, as identified by
+        the opaque ``cursor`` it returned. The JobID is used as a tie-breaker so
+        the sort order is total. Unlike ``search``, no total count is computed.
+
+        :return: the jobs of the page and the cursor of the next page, which is
+            None if this is the last page
+        """
+        if per_page < 1:
+            raise InvalidQueryError("Per page must be a positive integer")
+
+        sorts = add_sort_tiebreaker(sorts, "JobID")
+
+        # The sort columns are needed to build the next cursor
+        columns = _get_columns(Jobs.__table__, parameters)
+        extra_names = {s["parameter"] for s in sorts} - {c.name for c in columns}
+        extra_columns = _get_columns(Jobs.__table__, extra_names) if extra_names else []
+
+        stmt = select(*columns, *extra_columns)
+        stmt = apply_search_filters(Jobs.__table__.columns.__getitem__, stmt, search)
+        if cursor:
+            stmt = apply_keyset_constraints(
+                Jobs.__table__.columns.__getitem__,
+                stmt,
+                sorts,
+                decode_cursor(sorts, cursor),
+            )
+        stmt = apply_sort_constraints(Jobs.__table__.columns.__getitem__, stmt, sorts)
+        # Fetch one extra row to know whether there is a next page
+        stmt = stmt.limit(per_page + 1)
+
+        jobs = [dict(row._mapping) async for row in (await self.conn.stream(stmt))]
+
+        next_cursor = None
+        if len(jobs) > per_page:
+            jobs = jobs[:per_page]
+            next_cursor = encode_cursor(sorts, jobs[-1])
+
+        if extra_columns:
+            for job in jobs:
+                for column in extra_columns:
+                    job.pop(column.name)
+        return jobs, next_cursor
+
+    async def _count_summary_groups(self, job_ids: Iterable[int]) -> Counter:
+        """Count the given jobs for each combination of the ``summary_fields``.
+
+        The rows are locked so that concurrent changes to the same jobs cannot
+        be missed by the JobsSummary table.
+        """
+        columns = [Jobs.__table__.c[name] for name in self.summary_fields]
+        stmt = (
+            select(*columns, func.count())
+            .where(Jobs.job_id.in_(job_ids))
+            .group_by(*columns)
+            .with_for_update()
+        )
+        return Counter(
+            {tuple(row[:-1]): row[-1] for row in await self.conn.execute(stmt)}
+        )
+
+    async def _update_summary(self, deltas: Counter):
+        """Add the given differences in the number of jobs to the JobsSummary table."""
+        values = [
+            dict(zip(self.summary_fields, group), Count=delta)
+            # Sorting makes concurrent transactions lock the rows in the same order
+            for group, delta in sorted(deltas.items())
+            if delta
+        ]
+        if not values:
+            return
+
+        table = JobsSummary.__table__
+        stmt: Insert
+        if self.conn.dialect.name == "mysql":
+            mysql_stmt = mysql_insert(table)
+            stmt = mysql_stmt.on_duplicate_key_update(
+                Count=table.c.Count + mysql_stmt.inserted.Count
+            )
+        elif self.conn.dialect.name == "sqlite":
+            sqlite_stmt = sqlite_insert(table)
+            stmt = sqlite_stmt.on_conflict_do_update(
+                index_elements=list(self.summary_fields),
+                set_={"Count": table.c.Count + sqlite_stmt.excluded.Count},
+            )
+        else:
+            raise NotImplementedError(self.conn.dialect.name)
+        await self.conn.execute(stmt, values)
+
+    async def rebuild_summary(self):
+        """Recompute the JobsSummary table from the Jobs table.
+
+        This is needed when the Jobs table is modified by other means than
+        this class, e.g. by legacy DIRAC services.
+        """
+        columns = [Jobs.__table__.c[name] for name in self.summary_fields]
+        await self.conn.execute(delete(JobsSummary))
+        await self.conn.execute(
+            insert(JobsSummary).from_select(
+                [*self.summary_fields, "Count"],
+                select(*columns, func.count()).group_by(*columns),
+            )
+        )
+
     async def create_job(self, compressed_original_jdl: str):
         """Used to insert a new job with original JDL. Returns inserted job id."""
         result = await self.conn.execute(
@@ -120,10 +406,84 @@ class JobDB(BaseSQLDB):
         )
         return result.lastrowid
 
+    async def create_jobs(self, compressed_original_jdls: list[str]) -> list[int]:
+        """Insert new jobs with their original JDLs. Returns the inserted job ids.
+
+        The ids are in the same order as the JDLs. They are allocated with a
+        single statement, unless the database can't guarantee which ids a
+        multi-row insert gets.
+        """
+        if not compressed_original_jdls:
+            return []
+        table = JobJDLs.__table__
+        values = [
+            {"JDL": "", "JobRequirements": "", "OriginalJDL": original_jdl}
+            for original_jdl in compressed_original_jdls
+        ]
+
+        if self.conn.dialect.insert_executemany_returning_sort_by_parameter_order:
+            result = await self.conn.execute(
+                table.insert().returning(table.c.JobID, sort_by_parameter_order=True),
+                values,
+            )
+            return list(result.scalars())
+
+        if self.conn.dialect.name == "mysql":
+            # With the "traditional" and "consecutive" lock modes InnoDB gives
+            # the rows of a multi-row insert consecutive ids, the first one
+            # being returned as the last inserted id
+            lock_mode, increment = (
+                await self.conn.execute(
+                    text(
+                        "SELECT @@innodb_autoinc_lock_mode, @@auto_increment_increment"
+                    )
+                )
+            ).one()
+            if int(lock_mode) < 2:
+                result = await self.conn.execute(table.insert().values(values))
+                first_id = result.lastrowid
+                return list(
+                    range(first_id, first_id + len(values) * increment, increment)
+                )
+
+        return [
+            await self.create_job(original_jdl)
+            for original_jdl in compressed_original_jdls
+        ]
+
     async def delete_jobs(self, job_ids: list[int]):
         """Delete jobs from the database."""
+        for job_id in job_ids:
+            self._job_owners.pop(job_id, None)
+        deltas: Counter = Counter()
+        deltas.subtract(await self._count_summary_groups(job_ids))
         stmt = delete(JobJDLs).where(JobJDLs.job_id.in_(job_ids))
         await self.conn.execute(stmt)
+        await self._update_summary(deltas)
+
+    async def get_job_owners(
+        self, job_ids: Iterable[int]
+    ) -> dict[int, tuple[str, str]]:
+        """Get the owner and the VO of jobs, the jobs which do not exist are omitted.
+
+        The owners are cached, only the jobs which are not in the cache are
+        looked up by primary key.
+        """
+        owners = {}
+        missing = []
+        for job_id in set(job_ids):
+            if (owner := self._job_owners.get(job_id)) is not None:
+                owners[job_id] = owner
+            else:
+                missing.append(job_id)
+
+        if missing:
+            stmt = select(Jobs.job_id, Jobs.owner, Jobs.vo).where(
+                Jobs.job_id.in_(missing)
+            )
+            for job_id, owner, vo in await self.conn.execute(stmt):
+                owners[job_id] = self._job_owners[job_id] = (owner, vo)
+        return owners
 
     async def insert_input_data(self, lfns: dict[int, list[str]]):
         """Insert input data for jobs."""
@@ -151,6 +511,7 @@ class JobDB(BaseSQLDB):
                 for job_id, attrs in jobs_to_update.items()
             ],
         )
+        await self._update_summary(await self._count_summary_groups(jobs_to_update))
 
     async def update_job_jdls(self, jdls_to_update: dict[int, str]):
         """Used to update the JDL, typically just after inserting the original JDL, or rescheduling, for example."""
@@ -185,14 +546,51 @@ class JobDB(BaseSQLDB):
             return value
         raise NotImplementedError(f"Unrecognized value for column {column}: {value}")
 
-    async def set_job_attributes(self, job_data):
-        """Update the parameters of the given jobs."""
+    async def set_job_attributes(
+        self, job_data, *, strategy: BulkUpdateStrategy | None = None
+    ):
+        """Update the parameters of the given jobs.
+
+        :param strategy: how the rows are updated, by default it depends on the
+            number of jobs (see ``bulk_update_max_case_jobs`` and
+            ``bulk_update_min_staging_jobs``)
+        """
         # TODO: add myDate and force parameters.
+        now = datetime.now(tz=timezone.utc)
         for job_id in job_data.keys():
             if "Status" in job_data[job_id]:
-                job_data[job_id].update(
-                    {"LastUpdateTime": datetime.now(tz=timezone.utc)}
-                )
+                job_data[job_id].update({"LastUpdateTime": now})
+
+        if strategy is None:
+            if len(job_data) <= self.bulk_update_max_case_jobs:
+                strategy = "case"
+            elif len(job_data) < self.bulk_update_min_staging_jobs:
+                strategy = "grouped"
+            else:
+                strategy = "staging"
+        update_jobs = {
+            "case": self._update_jobs_with_case,
+            "grouped": self._update_jobs_grouped,
+            "staging": self._update_jobs_with_staging,
+        }[strategy]
+
+        columns = set(key for attrs in job_data.values() for key in attrs.keys())
+        if columns.isdisjoint(self.summary_fields):
+            await update_jobs(job_data)
+            return
+
+        before = await self._count_summary_groups(job_data)
+        await update_jobs(job_data)
+        deltas = await self._count_summary_groups(job_data)
+        deltas.subtract(before)
+        await self._update_summary(deltas)
+
+    async def _update_jobs_with_case(self, job_data: dict[int, dict[str, Any]]) -> None:
+        """Update the jobs with a single statement using a CASE expression per column.
+
+        The size of the statement grows with the number of jobs times the
+        number of columns, so this is only suitable for small batches.
+        """
         columns = set(key for attrs in job_data.values() for key in attrs.keys())
         case_expressions = {
             column: case(
@@ -216,6 +614,108 @@ class JobDB(BaseSQLDB):
         )
         await self.conn.execute(stmt)
 
+    async def _update_jobs_grouped(self, job_data: dict[int, dict[str, Any]]) -> None:
+        """Update the jobs with one statement per distinct set of new values.
+
+        Jobs which get exactly the same values (e.g. when killing many jobs) are
+        updated together with ``JobID IN (...)``. The others are grouped by the
+        columns they update and updated with a single ``executemany``.
+        """
+        job_ids_by_payload: defaultdict[tuple, list[int]] = defaultdict(list)
+        for job_id, attrs in job_data.items():
+            payload = tuple(
+                sorted(
+                    (column, self._set_job_attributes_fix_value(column, value))
+                    for column, value in attrs.items()
+                )
+            )
+            job_ids_by_payload[payload].append(job_id)
+
+        params_by_columns: defaultdict[tuple, list[dict]] = defaultdict(list)
+        for payload, job_ids in job_ids_by_payload.items():
+            if len(job_ids) > 1:
+                stmt = (
+                    Jobs.__table__.update()
+                    .values(
+                        {
+                            column: literal(value, _storage_type(column))
+                            for column, value in payload
+                        }
+                    )
+                    .where(Jobs.__table__.c.JobID.in_(job_ids))
+                )
+                await self.conn.execute(stmt)
+            else:
+                params_by_columns[tuple(column for column, _ in payload)].append(
+                    {"b_JobID": job_ids[0]}
+                    | {f"b_{column}": value for column, value in payload}
+                )
+
+        for columns, params in params_by_columns.items():
+            stmt = (
+                Jobs.__table__.update()
+                .values(
+                    {
+                        column: bindparam(f"b_{column}", type_=_storage_type(column))
+                        for column in columns
+                    }
+                )
+                .where(Jobs.__table__.c.JobID == bindparam("b_JobID"))
+            )
+            await self.conn.execute(stmt, params)
+
+    async def _update_jobs_with_staging(
+        self, job_data: dict[int, dict[str, Any]]
+    ) -> None:
+        """Update the jobs by joining the Jobs table with a temporary table.
+
+        The new values are bulk inserted into the temporary table, such that
+        the update itself is a single statement whose size does not depend on
+        the number of jobs.
+        """
+        rows_by_columns: defaultdict[tuple, list[dict]] = defaultdict(list)
+        for job_id, attrs in job_data.items():
+            rows_by_columns[tuple(sorted(attrs))].append(
+                {"JobID": job_id}
+                | {
+                    column: self._set_job_attributes_fix_value(column, value)
+                    for column, value in attrs.items()
+                }
+            )
+
+        for columns, rows in rows_by_columns.items():
+            # The name is unique as concurrent updates can share the connection
+            staging = Table(
+                f"JobsUpdateStaging_{uuid4().hex[:12]}",
+                MetaData(),
+                RawColumn("JobID", Integer, primary_key=True),
+                *(
+                    RawColumn(column, _storage_type(column), nullable=True)
+                    for column in columns
+                ),
+                prefixes=["TEMPORARY"],
+            )
+            await self.conn.run_sync(staging.create)
+            try:
+                await self.conn.execute(staging.insert(), rows)
+                stmt = (
+                    Jobs.__table__.update()
+                    .values({column: staging.c[column] for column in columns})
+                    .where(Jobs.__table__.c.JobID == staging.c.JobID)
+                )
+                await self.conn.execute(stmt)
+            finally:
+                await self._drop_temporary_table(staging)
+
+    async def _drop_temporary_table(self, staging: Table) -> None:
+        if self.conn.dialect.name == "mysql":
+            # A plain DROP TABLE would implicitly commit the transaction
+            await self.conn.exec_driver_sql(
+                f"DROP TEMPORARY TABLE IF EXISTS `{staging.name}`"
+            )
+        else:
+            await self.conn.run_sync(staging.drop)
+
     async def get_job_jdls(self, job_ids, original: bool = False) -> dict[int, str]:
         """Get the JDLs for the given jobs."""
         if original:
@@ -275,38 +775,93 @@ class JobDB(BaseSQLDB):
             values["LastUpdateTime"] = datetime.now(tz=timezone.utc)
 
         stmt = update(Jobs).where(Jobs.job_id == bindparam("job_id")).values(**values)
+        if set(required_parameters).isdisjoint(self.summary_fields):
+            rows = await self.conn.execute(stmt, update_parameters)
+            return rows.rowcount
+
+        before = await self._count_summary_groups(properties)
         rows = await self.conn.execute(stmt, update_parameters)
+        deltas = await self._count_summary_groups(properties)
+        deltas.subtract(before)
+        await self._update_summary(deltas)
 
         return rows.rowcount
 
     async def add_heartbeat_data(
-        self, job_id: int, dynamic_data: dict[str, str]
+        self, heartbeat_data: dict[int, dict[str, Any]]
     ) -> None:
-        """Add the job's heartbeat data to the database.
+        """Add the heartbeat data of many jobs to the database.
+
+        All the rows are inserted with a single ``executemany``.
 
         NOTE: This does not update the HeartBeatTime column in the Jobs table.
         This is instead handled by the `diracx.logic.jobs.status.set_job_statuses`
         as it involves updating multiple databases.
 
-        :param job_id: the job id
-        :param dynamic_data: mapping of the dynamic data to store,
-            e.g. {"AvailableDiskSpace": 123}
+        :param heartbeat_data: mapping of job id to the dynamic data to store,
+            e.g. {123: {"AvailableDiskSpace": 123}}
         """
-        if extra_fields := set(dynamic_data) - self.heartbeat_fields:
-            raise InvalidQueryError(
-                f"Not allowed to store heartbeat data for: {extra_fields}. "
-                f"Allowed keys are: {self.heartbeat_fields}"
+        rows: list[dict[str, Any]] = []
+        for job_id, dynamic_data in heartbeat_data.items():
+            if extra_fields := set(dynamic_data) - self.heartbeat_fields:
+                raise InvalidQueryError(
+                    f"Not allowed to store heartbeat data for: {extra_fields}. "
+                    f"Allowed keys are: {self.heartbeat_fields}"
+                )
+            rows.extend(
+                {"JobID": job_id, "Name": key, "Value": value}
+                for key, value in dynamic_data.items()
             )
-        values = [
-            {
-                "JobID": job_id,
-                "Name": key,
-                "Value": value,
-                "HeartBeatTime": utcnow(),
-            }
-            for key, value in dynamic_data.items()
-        ]
-        await self.conn.execute(HeartBeatLoggingInfo.__table__.insert().values(values))
+        if not rows:
+            return
+        stmt = insert(HeartBeatLoggingInfo).values(HeartBeatTime=utcnow())
+        await self.conn.execute(stmt, rows)
+
+    async def compact_heartbeat_data(
+        self,
+        older_than: datetime,
+        resolution: Literal["MINUTE", "HOUR", "DAY"] = "HOUR",
+        *,
+        job_ids: Iterable[int] | None = None,
+    ) -> int:
+        """Downsample the heartbeat data recorded before ``older_than``.
+
+        For each job and field only the last value of each ``resolution``
+        interval is kept, the more recent data is left untouched.
+
+        :param older_than: only compact the data recorded before this time
+        :param resolution: interval for which one value is kept
+        :param job_ids: only compact the data of these jobs
+        :return: the number of deleted rows
+        """
+        bucket = date_trunc(
+            HeartBeatLoggingInfo.heart_beat_time, time_resolution=resolution
+        )
+        conditions = [HeartBeatLoggingInfo.heart_beat_time < older_than]
+        if job_ids is not None:
+            conditions.append(HeartBeatLoggingInfo.job_id.in_(job_ids))
+        key = (
+            HeartBeatLoggingInfo.job_id,
+            HeartBeatLoggingInfo.name,
+            HeartBeatLoggingInfo.heart_beat_time,
+        )
+        # The rows to keep are selected through a derived table as MySQL does
+        # not allow a subquery to read the table being deleted from
+        kept = (
+            select(
+                HeartBeatLoggingInfo.job_id,
+                HeartBeatLoggingInfo.name,
+                func.max(HeartBeatLoggingInfo.heart_beat_time),
+            )
+            .where(*conditions)
+            .group_by(HeartBeatLoggingInfo.job_id, HeartBeatLoggingInfo.name, bucket)
+            .subquery()
+        )
+        stmt = delete(HeartBeatLoggingInfo).where(
+            *conditions, tuple_(*key).not_in(select(kept))
+        )
+        result = await self.conn.execute(stmt)
+        return result.rowcount
 
     async def get_job_commands(self, job_ids: Iterable[int]) -> list[JobCommand]:
         """Get a command to be passed to the job together with the next heartbeat.
@@ -156,3 +156,20 @@ class JobCommands(JobDBBase):
     status = Column("Status", String(64), default="Received")
     reception_time = Column("ReceptionTime", DateTime, primary_key=True)
     execution_time = NullColumn("ExecutionTime", DateTime)
+
+
+class JobsSummary(JobDBBase):
+    """Number of jobs for each combination of the most commonly summarised attributes.
+
+    It is maintained by the JobDB whenever jobs are inserted, updated or deleted,
+    such that the summaries over these attributes do not need to scan the Jobs table.
+    """
+
+    __tablename__ = "JobsSummary"
+    status = Column("Status", String(32), primary_key=True)
+    minor_status = Column("MinorStatus", String(128), primary_key=True)
+    site = Column("Site", String(100), primary_key=True)
+    owner = Column("Owner", String(64), primary_key=True)
+    owner_group = Column("OwnerGroup", String(128), primary_key=True)
+    vo = Column("VO", String(32), primary_key=True)
+    count = Column("Count", Integer, default=0)
@@ -2,14 +2,14 @@ from __future__ import annotations
 
 from collections import defaultdict
 from datetime import datetime, timezone
-from typing import Iterable
+from typing import Any, AsyncIterator, Iterable
 
-from sqlalchemy import delete, func, select
+from sqlalchemy import Select, case, delete, func, insert, or_, select
 
 from diracx.core.models import JobLoggingRecord, JobStatusReturn
 
 from ..utils import BaseSQLDB
-from .schema import JobLoggingDBBase, LoggingInfo
+from .schema import JobLoggingDBBase, LoggingInfo, LoggingTimeline
 
 
 class JobLoggingDB(BaseSQLDB):
@@ -21,132 +21,229 @@ class JobLoggingDB(BaseSQLDB):
         self,
         records: list[JobLoggingRecord],
     ):
-        """Bulk insert entries to the JobLoggingDB table."""
-        # First, fetch the maximum SeqNums for the given job_ids
-        seqnum_stmt = (
-            select(
-                LoggingInfo.job_id, func.coalesce(func.max(LoggingInfo.seq_num) + 1, 1)
-            )
-            .where(LoggingInfo.job_id.in_([record.job_id for record in records]))
-            .group_by(LoggingInfo.job_id)
-        )
+        """Bulk insert entries to the JobLoggingDB table.
 
-        seqnums = {
-            jid: seqnum for jid, seqnum in (await self.conn.execute(seqnum_stmt))
-        }
-        # IF a seqnum is not found, then assume it does not exist and the first sequence number is 1.
+        The records are inserted with a single statement, their SeqNum is
+        allocated by the database in the order in which they are given and the
+        LoggingTimeline table is updated by a trigger.
+        """
         # https://docs.sqlalchemy.org/en/20/orm/queryguide/dml.html#orm-bulk-insert-statements
-        values = []
-        for record in records:
-            if record.job_id not in seqnums:
-                seqnums[record.job_id] = 1
-
-            values.append(
-                {
-                    "JobID": record.job_id,
-                    "SeqNum": seqnums[record.job_id],
-                    "Status": record.status,
-                    "MinorStatus": record.minor_status,
-                    "ApplicationStatus": record.application_status[:255],
-                    "StatusTime": record.date,
-                    "StatusTimeOrder": record.date,
-                    "StatusSource": record.source[:32],
-                }
-            )
-            seqnums[record.job_id] = seqnums[record.job_id] + 1
-
+        values = [
+            {
+                "JobID": record.job_id,
+                "Status": record.status,
+                "MinorStatus": record.minor_status,
+                "ApplicationStatus": record.application_status[:255],
+                "StatusTime": record.date,
+                "StatusTimeOrder": record.date,
+                "StatusSource": record.source[:32],
+            }
+            for record in records
+        ]
+        if values:
+            await self.conn.execute(LoggingInfo.__table__.insert(), values)
+
+    async def rebuild_timeline(self):
+        """Recompute the LoggingTimeline table from the LoggingInfo table.
+
+        This is needed to fill it when it is created for an existing
+        LoggingInfo table, afterwards the trigger keeps it up to date.
+        """
+        columns = [LoggingInfo.job_id, LoggingInfo.status]
+        await self.conn.execute(delete(LoggingTimeline))
         await self.conn.execute(
-            LoggingInfo.__table__.insert(),
-            values,
+            insert(LoggingTimeline).from_select(
+                ["JobID", "Status", "StatusTimeOrder"],
+                select(*columns, func.max(LoggingInfo.status_time_order)).group_by(
+                    *columns
+                ),
+            )
         )
 
-    async def get_records(self, job_ids: list[int]) -> dict[int, JobStatusReturn]:
+    async def get_records(
+        self,
+        job_ids: list[int],
+        *,
+        last: int | None = None,
+        major_only: bool = False,
+    ) -> dict[int, list[JobStatusReturn]]:
         """Returns a Status,MinorStatus,ApplicationStatus,StatusTime,Source tuple
         for each record found for job specified by its jobID in historical order.
-        """
-        # We could potentially use a group_by here, but we need to post-process the
-        # results later.
-        stmt = (
-            select(
-                LoggingInfo.job_id,
-                LoggingInfo.status,
-                LoggingInfo.minor_status,
-                LoggingInfo.application_status,
-                LoggingInfo.status_time,
-                LoggingInfo.source,
-            )
-            .where(LoggingInfo.job_id.in_(job_ids))
-            .order_by(LoggingInfo.status_time_order, LoggingInfo.status_time)
-        )
-        rows = await self.conn.execute(stmt)
-
-        values = defaultdict(list)
-        for (
-            job_id,
-            status,
-            minor_status,
-            application_status,
-            status_time,
-            status_source,
-        ) in rows:
-            values[job_id].append(
-                [
-                    status,
-                    minor_status,
-                    application_status,
-                    status_time.replace(tzinfo=timezone.utc),
-                    status_source,
-                ]
-            )
 
-        # If no value has been set for the application status in the first place,
-        # We put this status to unknown
+        See ``iter_records`` for the meaning of the arguments.
+        """
         res: dict = defaultdict(list)
-        for job_id, history in values.items():
-            if history[0][2] == "idem":
-                history[0][2] = "Unknown"
-
-            # We replace "idem" values by the value previously stated
-            for i in range(1, len(history)):
-                for j in range(3):
-                    if history[i][j] == "idem":
-                        history[i][j] = history[i - 1][j]
+        async for job_id, records in self.iter_records(
+            job_ids, last=last, major_only=major_only
+        ):
+            res[job_id] = [JobStatusReturn.model_construct(**r) for r in records]
+        return res
 
-            # And we replace arrays with tuples
+    async def iter_records(
+        self,
+        job_ids: Iterable[int],
+        *,
+        last: int | None = None,
+        major_only: bool = False,
+        batch_size: int = 10_000,
+    ) -> AsyncIterator[tuple[int, list[dict[str, Any]]]]:
+        """Stream the logging records of each job, in historical order.
+
+        The "idem" values, which mean that the value didn't change, are
+        replaced by the database with the previous value.
+
+        :param job_ids: the jobs to get the records of
+        :param last: only return the last ``last`` records of each job
+        :param major_only: only return the records which change the job status
+        :param batch_size: number of rows fetched from the database at once
+        :return: an iterator of (job_id, records) where each record is a dict
+            with the fields of ``JobStatusReturn``
+        """
+        stmt = _records_stmt(job_ids, last=last, major_only=major_only)
+        result = await self.conn.stream(stmt.execution_options(yield_per=batch_size))
+        job_id: int | None = None
+        records: list[dict[str, Any]] = []
+        async for rows in result.partitions():
             for (
+                row_job_id,
                 status,
                 minor_status,
                 application_status,
                 status_time,
-                status_source,
-            ) in history:
-                res[job_id].append(
-                    JobStatusReturn(
-                        Status=status,
-                        MinorStatus=minor_status,
-                        ApplicationStatus=application_status,
-                        StatusTime=status_time,
-                        Source=status_source,
-                    )
+                source,
+            ) in rows:
+                if row_job_id != job_id:
+                    if records:
+                        yield job_id, records  # type: ignore[misc]
+                    job_id, records = row_job_id, []
+                records.append(
+                    {
+                        "Status": status,
+                        "MinorStatus": minor_status,
+                        "ApplicationStatus": application_status,
+                        "StatusTime": status_time.replace(tzinfo=timezone.utc),
+                        "Source": source,
+                    }
                 )
-
-        return res
+        if records:
+            yield job_id, records  # type: ignore[misc]
 
     async def delete_records(self, job_ids: list[int]):
         """Delete logging records for given jobs."""
-        stmt = delete(LoggingInfo).where(LoggingInfo.job_id.in_(job_ids))
-        await self.conn.execute(stmt)
+        for table in (LoggingInfo, LoggingTimeline):
+            stmt = delete(table).where(table.job_id.in_(job_ids))
+            await self.conn.execute(stmt)
 
     async def get_wms_time_stamps(
         self, job_ids: Iterable[int]
     ) -> dict[int, dict[str, datetime]]:
         """Get TimeStamps for job MajorState transitions for multiple jobs at once
         return a {JobID: {State:timestamp}} dictionary.
+
+        The time stamps are read from the LoggingTimeline table, so the cost
+        does not depend on the length of the history of the jobs.
         """
         result: defaultdict[int, dict[str, datetime]] = defaultdict(dict)
         stmt = select(
-            LoggingInfo.job_id, LoggingInfo.status, LoggingInfo.status_time_order
-        ).where(LoggingInfo.job_id.in_(job_ids))
+            LoggingTimeline.job_id,
+            LoggingTimeline.status,
+            LoggingTimeline.status_time_order,
+        ).where(LoggingTimeline.job_id.in_(job_ids))
         for job_id, event, etime in await self.conn.execute(stmt):
             result[job_id][event] = etime
         return dict(result)
+
+
+# Columns in which "idem" means that the value didn't change
+_IDEM_COLUMNS = ("Status", "MinorStatus", "ApplicationStatus")
+
+
+def _records_stmt(
+    job_ids: Iterable[int], *, last: int | None, major_only: bool
+) -> Select:
+    """Build the query returning the logging records of the jobs with the
+    "idem" values resolved.
+
+    Each layer is a subquery using window functions over the records of each
+    job: a running count of the non-"idem" values splits the records in groups
+    which all share the value of the first record of the group.
+    """
+
+    def history(sq) -> dict[str, Any]:
+        return {
+            "partition_by": sq.c.JobID,
+            "order_by": (sq.c.StatusTimeOrder, sq.c.StatusTime, sq.c.SeqNum),
+        }
+
+    other_columns = ("JobID", "SeqNum", "StatusTime", "StatusTimeOrder", "StatusSource")
+    records = (
+        select(LoggingInfo.__table__)
+        .where(LoggingInfo.job_id.in_(job_ids))
+        .subquery("records")
+    )
+    grouped = select(
+        *records.c,
+        *(
+            func.sum(case((records.c[name] != "idem", 1), else_=0))
+            .over(**history(records))
+            .label(f"{name}Group")
+            for name in _IDEM_COLUMNS
+        ),
+    ).subquery("grouped")
+    resolved = select(
+        *(grouped.c[name] for name in other_columns),
+        *(
+            func.first_value(grouped.c[name])
+            .over(
+                partition_by=(grouped.c.JobID, grouped.c[f"{name}Group"]),
+                order_by=history(grouped)["order_by"],
+            )
+            .label(name)
+            for name in _IDEM_COLUMNS
+        ),
+    ).subquery("resolved")
+
+    if major_only:
+        with_previous = select(
+            *resolved.c,
+            func.lag(resolved.c.Status).over(**history(resolved)).label("Previous"),
+        ).subquery("with_previous")
+        resolved = (
+            select(*(with_previous.c[c.name] for c in resolved.c))
+            .where(
+                or_(
+                    with_previous.c.Previous.is_(None),
+                    with_previous.c.Status != with_previous.c.Previous,
+                )
+            )
+            .subquery("major")
+        )
+
+    if last is not None:
+        order_by = history(resolved)["order_by"]
+        ranked = select(
+            *resolved.c,
+            func.row_number()
+            .over(
+                partition_by=resolved.c.JobID,
+                order_by=[column.desc() for column in order_by],
+            )
+            .label("Rank"),
+        ).subquery("ranked")
+        resolved = (
+            select(*(ranked.c[c.name] for c in resolved.c))
+            .where(ranked.c.Rank <= last)
+            .subquery("latest")
+        )
+
+    # If no value has been set for the application status in the first place,
+    # we put this status to unknown
+    application_status = resolved.c.ApplicationStatus
+    return select(
+        resolved.c.JobID,
+        resolved.c.Status,
+        resolved.c.MinorStatus,
+        case((application_status == "idem", "Unknown"), else_=application_status),
+        resolved.c.StatusTime,
+        resolved.c.StatusSource,
+    ).order_by(resolved.c.JobID, *history(resolved)["order_by"])
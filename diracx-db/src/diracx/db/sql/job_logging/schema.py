@@ -2,7 +2,15 @@ from __future__ import annotations
 
 from datetime import UTC, datetime
 
-from sqlalchemy import Integer, Numeric, PrimaryKeyConstraint, String, TypeDecorator
+from sqlalchemy import (
+    DDL,
+    Integer,
+    Numeric,
+    PrimaryKeyConstraint,
+    String,
+    TypeDecorator,
+    event,
+)
 from sqlalchemy.orm import declarative_base
 
 from ..utils import Column, DateNowColumn
@@ -54,7 +62,7 @@ class MagicEpochDateTime(TypeDecorator):
 class LoggingInfo(JobLoggingDBBase):
     __tablename__ = "LoggingInfo"
     job_id = Column("JobID", Integer)
-    seq_num = Column("SeqNum", Integer)
+    seq_num = Column("SeqNum", Integer, default=0)
     status = Column("Status", String(32), default="")
     minor_status = Column("MinorStatus", String(128), default="")
     application_status = Column("ApplicationStatus", String(255), default="")
@@ -62,3 +70,72 @@ class LoggingInfo(JobLoggingDBBase):
     status_time_order = Column("StatusTimeOrder", MagicEpochDateTime, default=0)
     source = Column("StatusSource", String(32), default="Unknown")
     __table_args__ = (PrimaryKeyConstraint("JobID", "SeqNum"),)
+
+
+class LoggingTimeline(JobLoggingDBBase):
+    """Time of the latest record of each status for every job.
+
+    It is kept up to date by a trigger whenever records are inserted, whoever
+    inserts them, such that the time stamps of the status changes of a job do
+    not need to scan its whole history.
+    """
+
+    __tablename__ = "LoggingTimeline"
+    job_id = Column("JobID", Integer)
+    status = Column("Status", String(32))
+    status_time_order = Column("StatusTimeOrder", MagicEpochDateTime, default=0)
+    __table_args__ = (PrimaryKeyConstraint("JobID", "Status"),)
+
+
+# SeqNum is a sequential number within each JobID which is allocated by the
+# database when the records are inserted. The MySQL trigger is the one created
+# by DIRAC, SQLite does not allow a BEFORE trigger to modify the new row so the
+# number is set just after the row is inserted.
+event.listen(
+    LoggingInfo.__table__,
+    "after_create",
+    DDL(
+        "CREATE TRIGGER SeqNumGenerator BEFORE INSERT ON LoggingInfo "
+        "FOR EACH ROW SET NEW.SeqNum = "
+        "(SELECT IFNULL(MAX(SeqNum) + 1, 1) FROM LoggingInfo WHERE JobID = NEW.JobID)"
+    ).execute_if(dialect="mysql"),
+)
+event.listen(
+    LoggingInfo.__table__,
+    "after_create",
+    DDL(
+        "CREATE TRIGGER SeqNumGenerator AFTER INSERT ON LoggingInfo "
+        "FOR EACH ROW WHEN NEW.SeqNum = 0 BEGIN "
+        "UPDATE LoggingInfo SET SeqNum = "
+        "(SELECT IFNULL(MAX(SeqNum) + 1, 1) FROM LoggingInfo WHERE JobID = NEW.JobID) "
+        "WHERE JobID = NEW.JobID AND SeqNum = 0; END"
+    ).execute_if(dialect="sqlite"),
+)
+
+# LoggingTimeline keeps the latest StatusTimeOrder of each status, including for
+# the records inserted by legacy DIRAC services. The triggers are created with
+# the LoggingTimeline table so that both tables exist.
+event.listen(
+    LoggingTimeline.__table__,
+    "after_create",
+    DDL(
+        "CREATE TRIGGER LoggingTimelineUpdater AFTER INSERT ON LoggingInfo "
+        "FOR EACH ROW "
+        "INSERT INTO LoggingTimeline (JobID, Status, StatusTimeOrder) "
+        "VALUES (NEW.JobID, NEW.Status, NEW.StatusTimeOrder) "
+        "ON DUPLICATE KEY UPDATE "
+        "StatusTimeOrder = GREATEST(StatusTimeOrder, NEW.StatusTimeOrder)"
+    ).execute_if(dialect="mysql"),
+)
+event.listen(
+    LoggingTimeline.__table__,
+    "after_create",
+    DDL(
+        "CREATE TRIGGER LoggingTimelineUpdater AFTER INSERT ON LoggingInfo "
+        "FOR EACH ROW BEGIN "
+        "INSERT INTO LoggingTimeline (JobID, Status, StatusTimeOrder) "
+        "VALUES (NEW.JobID, NEW.Status, NEW.StatusTimeOrder) "
+        "ON CONFLICT (JobID, Status) DO UPDATE SET "
+        "StatusTimeOrder = MAX(StatusTimeOrder, excluded.StatusTimeOrder); END"
+    ).execute_if(dialect="sqlite"),
+)
@@ -5,6 +5,7 @@ from contextlib import asynccontextmanager
 from functools import partial
 from typing import Any, AsyncGenerator
 
+from cachetools import Cache, LRUCache
 from sqlalchemy import (
     BigInteger,
     Column,
@@ -15,7 +16,6 @@ from sqlalchemy import (
     delete,
     exists,
     insert,
-    literal,
     or_,
     select,
     update,
@@ -48,14 +48,29 @@ class SandboxMetadataDB(BaseSQLDB):
         prefixes=["TEMPORARY"],
     )
 
+    # Maximum number of owner ids cached by get_owner_id
+    owner_ids_cache_size = 10_000
+
+    def __init__(self, db_url: str) -> None:
+        super().__init__(db_url)
+        # (Owner, OwnerGroup, VO) -> OwnerID, the owners are never modified.
+        # The unknown owners are not cached as they can be inserted at any time.
+        self._owner_ids: Cache = LRUCache(self.owner_ids_cache_size)
+
     async def get_owner_id(self, user: UserInfo) -> int | None:
         """Get the id of the owner from the database."""
+        key = (user.preferred_username, user.dirac_group, user.vo)
+        if (owner_id := self._owner_ids.get(key)) is not None:
+            return owner_id
         stmt = select(SBOwners.OwnerID).where(
             SBOwners.Owner == user.preferred_username,
             SBOwners.OwnerGroup == user.dirac_group,
             SBOwners.VO == user.vo,
         )
-        return (await self.conn.execute(stmt)).scalar_one_or_none()
+        owner_id = (await self.conn.execute(stmt)).scalar_one_or_none()
+        if owner_id is not None:
+            self._owner_ids[key] = owner_id
+        return owner_id
 
     async def get_sandbox_owner_id(self, pfn: str, se_name: str) -> int | None:
         """Get the id of the owner of a sandbox."""
@@ -66,6 +81,19 @@ class SandboxMetadataDB(BaseSQLDB):
         )
         return (await self.conn.execute(stmt)).scalar_one_or_none()
 
+    async def get_sandbox_owner_ids(
+        self, pfns: list[str], se_name: str
+    ) -> dict[str, int]:
+        """Get the ids of the owners of sandboxes, the unknown ones are omitted."""
+        if not pfns:
+            return {}
+        stmt = select(SandBoxes.SEPFN, SBOwners.OwnerID).where(
+            SBOwners.OwnerID == SandBoxes.OwnerId,
+            SandBoxes.SEName == se_name,
+            SandBoxes.SEPFN.in_(pfns),
+        )
+        return {pfn: owner_id for pfn, owner_id in await self.conn.execute(stmt)}
+
     async def insert_owner(self, user: UserInfo) -> int:
         stmt = insert(SBOwners).values(
             Owner=user.preferred_username,
@@ -105,6 +133,25 @@ class SandboxMetadataDB(BaseSQLDB):
         except IntegrityError as e:
             raise SandboxAlreadyInsertedError(pfn, se_name) from e
 
+    async def insert_sandboxes(
+        self, owner_id: int, se_name: str, sizes: dict[str, int]
+    ) -> None:
+        """Add new sandboxes, given as {pfn: size}, in SandboxMetadataDB."""
+        if not sizes:
+            return
+        try:
+            await self.conn.execute(
+                insert(SandBoxes).values(
+                    OwnerId=owner_id,
+                    SEName=se_name,
+                    RegistrationTime=utcnow(),
+                    LastAccessTime=utcnow(),
+                ),
+                [{"SEPFN": pfn, "Bytes": size} for pfn, size in sizes.items()],
+            )
+        except IntegrityError as e:
+            raise SandboxAlreadyInsertedError(",".join(sizes), se_name) from e
+
     async def update_sandbox_last_access_time(self, se_name: str, pfn: str) -> None:
         stmt = (
             update(SandBoxes)
@@ -120,6 +167,19 @@ class SandboxMetadataDB(BaseSQLDB):
                 "More than one sandbox was updated. This should not happen."
             )
 
+    async def update_sandboxes_last_access_time(
+        self, se_name: str, pfns: list[str]
+    ) -> None:
+        """Update the last access time of sandboxes, the unknown ones are ignored."""
+        if not pfns:
+            return
+        stmt = (
+            update(SandBoxes)
+            .where(SandBoxes.SEName == se_name, SandBoxes.SEPFN.in_(pfns))
+            .values(LastAccessTime=utcnow())
+        )
+        await self.conn.execute(stmt)
+
     async def sandbox_is_assigned(self, pfn: str, se_name: str) -> bool | None:
         """Checks if a sandbox exists and has been assigned."""
         stmt: Executable = select(SandBoxes.Assigned).where(
@@ -133,6 +193,17 @@ class SandboxMetadataDB(BaseSQLDB):
 
         return is_assigned
 
+    async def get_sandboxes_assigned(
+        self, se_name: str, pfns: list[str]
+    ) -> dict[str, bool]:
+        """Get whether sandboxes are assigned, the unknown ones are omitted."""
+        if not pfns:
+            return {}
+        stmt = select(SandBoxes.SEPFN, SandBoxes.Assigned).where(
+            SandBoxes.SEName == se_name, SandBoxes.SEPFN.in_(pfns)
+        )
+        return {pfn: bool(assigned) for pfn, assigned in await self.conn.execute(stmt)}
+
     @staticmethod
     def jobid_to_entity_id(job_id: int) -> str:
         """Define the entity id as 'Entity:entity_id' due to the DB definition."""
@@ -161,65 +232,73 @@ class SandboxMetadataDB(BaseSQLDB):
         sb_type: SandboxType,
         se_name: str,
     ) -> None:
-        """Map sandbox and jobs."""
-        for job_id in jobs_ids:
-            # Define the entity id as 'Entity:entity_id' due to the DB definition:
-            entity_id = self.jobid_to_entity_id(job_id)
-            select_sb_id = select(
-                SandBoxes.SBId,
-                literal(entity_id).label("EntityId"),
-                literal(sb_type).label("Type"),
-            ).where(
-                SandBoxes.SEName == se_name,
-                SandBoxes.SEPFN == pfn,
-            )
-            stmt = insert(SBEntityMapping).from_select(
-                ["SBId", "EntityId", "Type"], select_sb_id
-            )
-            try:
-                await self.conn.execute(stmt)
-            except IntegrityError as e:
-                raise SandboxAlreadyAssignedError(pfn, se_name) from e
+        """Map sandbox and jobs.
 
-            stmt = update(SandBoxes).where(SandBoxes.SEPFN == pfn).values(Assigned=True)
-            result = await self.conn.execute(stmt)
-            if result.rowcount == 0:
-                # If the update didn't affect any row, the sandbox doesn't exist
-                # It means the previous insert didn't have any effect
-                raise SandboxNotFoundError(pfn, se_name)
+        The number of statements does not depend on the number of jobs.
+        """
+        if not jobs_ids:
+            return
 
-            assert result.rowcount == 1
+        stmt = select(SandBoxes.SBId).where(
+            SandBoxes.SEName == se_name, SandBoxes.SEPFN == pfn
+        )
+        sb_id = (await self.conn.execute(stmt)).scalar_one_or_none()
+        if sb_id is None:
+            raise SandboxNotFoundError(pfn, se_name)
 
-    async def unassign_sandboxes_to_jobs(self, jobs_ids: list[int]) -> None:
-        """Delete mapping between jobs and sandboxes."""
-        for job_id in jobs_ids:
-            entity_id = self.jobid_to_entity_id(job_id)
-            sb_sel_stmt = select(SandBoxes.SBId)
-            sb_sel_stmt = sb_sel_stmt.join(
-                SBEntityMapping, SBEntityMapping.SBId == SandBoxes.SBId
+        # Define the entity id as 'Entity:entity_id' due to the DB definition
+        try:
+            await self.conn.execute(
+                insert(SBEntityMapping),
+                [
+                    {
+                        "SBId": sb_id,
+                        "EntityId": self.jobid_to_entity_id(job_id),
+                        "Type": sb_type,
+                    }
+                    for job_id in jobs_ids
+                ],
             )
-            sb_sel_stmt = sb_sel_stmt.where(SBEntityMapping.EntityId == entity_id)
+        except IntegrityError as e:
+            raise SandboxAlreadyAssignedError(pfn, se_name) from e
 
-            result = await self.conn.execute(sb_sel_stmt)
-            sb_ids = [row.SBId for row in result]
+        stmt = update(SandBoxes).where(SandBoxes.SBId == sb_id).values(Assigned=True)
+        await self.conn.execute(stmt)
 
-            del_stmt = delete(SBEntityMapping).where(
-                SBEntityMapping.EntityId == entity_id
-            )
-            await self.conn.execute(del_stmt)
+    async def unassign_sandboxes_to_jobs(self, jobs_ids: list[int]) -> None:
+        """Delete mapping between jobs and sandboxes.
 
-            sb_entity_sel_stmt = select(SBEntityMapping.SBId).where(
-                SBEntityMapping.SBId.in_(sb_ids)
+        The sandboxes which are no longer mapped to any entity are marked as
+        unassigned. The number of statements does not depend on the number of
+        jobs.
+        """
+        if not jobs_ids:
+            return
+        entity_ids = [self.jobid_to_entity_id(job_id) for job_id in jobs_ids]
+
+        # The sandboxes of the jobs which are not mapped to other entities
+        other_mapping = SBEntityMapping.__table__.alias("other_mapping")
+        unassign_stmt = (
+            update(SandBoxes)
+            .where(
+                SandBoxes.SBId.in_(
+                    select(SBEntityMapping.SBId).where(
+                        SBEntityMapping.EntityId.in_(entity_ids)
+                    )
+                ),
+                ~exists().where(
+                    other_mapping.c.SBId == SandBoxes.SBId,
+                    other_mapping.c.EntityId.not_in(entity_ids),
+                ),
             )
-            result = await self.conn.execute(sb_entity_sel_stmt)
-            remaining_sb_ids = [row.SBId for row in result]
-            if not remaining_sb_ids:
-                unassign_stmt = (
-                    update(SandBoxes)
-                    .where(SandBoxes.SBId.in_(sb_ids))
-                    .values(Assigned=False)
-                )
-                await self.conn.execute(unassign_stmt)
+            .values(Assigned=False)
+        )
+        await self.conn.execute(unassign_stmt)
+
+        del_stmt = delete(SBEntityMapping).where(
+            SBEntityMapping.EntityId.in_(entity_ids)
+        )
+        await self.conn.execute(del_stmt)
 
     @asynccontextmanager
     async def delete_unused_sandboxes(
@@ -1,8 +1,16 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
-
-from sqlalchemy import delete, func, select, update
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import (
+    bindparam,
+    delete,
+    exists,
+    func,
+    literal,
+    select,
+    union_all,
+)
 
 if TYPE_CHECKING:
     pass
@@ -20,6 +28,16 @@ from .schema import (
     TaskQueues,
 )
 
+# The tables holding the lists of values of the task queues
+TQ_VALUE_TABLES = (
+    (SitesQueue, "Sites"),
+    (GridCEsQueue, "GridCEs"),
+    (BannedSitesQueue, "BannedSites"),
+    (PlatformsQueue, "Platforms"),
+    (JobTypesQueue, "JobTypes"),
+    (TagsQueue, "Tags"),
+)
+
 
 class TaskQueueDB(BaseSQLDB):
     metadata = TaskQueueDBBase.metadata
@@ -83,41 +101,69 @@ class TaskQueueDB(BaseSQLDB):
         stmt = delete(JobsQueue).where(JobsQueue.JobId.in_(job_ids))
         await self.conn.execute(stmt)
 
-    async def is_task_queue_empty(self, tq_id: int) -> bool:
-        """Check if a task queue is empty."""
+    async def get_empty_task_queues(self, tq_ids: list[int]) -> list[int]:
+        """Get the enabled task queues, among the given ones, without any job."""
+        if not tq_ids:
+            return []
         stmt = (
             select(TaskQueues.TQId)
+            .outerjoin(JobsQueue, TaskQueues.TQId == JobsQueue.TQId)
             .where(TaskQueues.Enabled >= 1)
-            .where(TaskQueues.TQId == tq_id)
-            .where(~TaskQueues.TQId.in_(select(JobsQueue.TQId)))
+            .where(TaskQueues.TQId.in_(tq_ids))
+            .where(JobsQueue.TQId.is_(None))
         )
-        rows = await self.conn.execute(stmt)
-        return not rows.rowcount
-
-    async def delete_task_queue(
-        self,
-        tq_id: int,
-    ):
-        """Delete a task queue."""
-        # Deleting the task queue (the other tables will be deleted in cascade)
-        stmt = delete(TaskQueues).where(TaskQueues.TQId == tq_id)
+        return list((await self.conn.execute(stmt)).scalars())
+
+    async def delete_task_queues(self, tq_ids: list[int]):
+        """Delete task queues."""
+        # Deleting the task queues (the other tables will be deleted in cascade)
+        stmt = delete(TaskQueues).where(TaskQueues.TQId.in_(tq_ids))
         await self.conn.execute(stmt)
 
-    async def set_priorities_for_entity(
-        self,
-        tq_ids: list[int],
-        priority: float,
-    ):
-        """Set the priority for a user/userGroup combo given a split share."""
-        update_stmt = (
-            update(TaskQueues)
-            .where(TaskQueues.TQId.in_(tq_ids))
-            .values(Priority=priority)
+    async def pop_job(self, tq_id: int) -> tuple[int | None, bool]:
+        """Remove the job with the highest priority from a task queue.
+
+        :return: the JobID, None if there is no job left that is not being
+            popped by another transaction, and whether the task queue is empty
+        """
+        stmt = (
+            select(JobsQueue.JobId)
+            .where(JobsQueue.TQId == tq_id)
+            .order_by(JobsQueue.RealPriority.desc(), JobsQueue.JobId)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job_id = (await self.conn.execute(stmt)).scalar_one_or_none()
+        if job_id is not None:
+            delete_stmt = delete(JobsQueue).where(
+                JobsQueue.TQId == tq_id, JobsQueue.JobId == job_id
+            )
+            if (await self.conn.execute(delete_stmt)).rowcount == 1:
+                return job_id, False
+        # The remaining jobs may only be locked by other transactions, which
+        # does not make the task queue empty: check without locking them
+        exists_stmt = select(exists().where(JobsQueue.TQId == tq_id))
+        return None, not (await self.conn.execute(exists_stmt)).scalar_one()
+
+    async def set_priorities(self, priorities: dict[int, float]):
+        """Set the priorities of task queues, given as {tq_id: priority}."""
+        if not priorities:
+            return
+        stmt = (
+            TaskQueues.__table__.update()
+            .where(TaskQueues.__table__.c.TQId == bindparam("b_TQId"))
+            .values(Priority=bindparam("b_Priority"))
+        )
+        await self.conn.execute(
+            stmt,
+            [
+                {"b_TQId": tq_id, "b_Priority": priority}
+                for tq_id, priority in priorities.items()
+            ],
         )
-        await self.conn.execute(update_stmt)
 
-    async def retrieve_task_queues(self, tq_id_list=None):
-        """Get all the task queues."""
+    async def retrieve_task_queues(self, tq_id_list=None, enabled_only=False):
+        """Get all the task queues, or the given ones, which have jobs."""
         if tq_id_list is not None and not tq_id_list:
             # Empty list => Fast-track no matches
             return {}
@@ -133,8 +179,6 @@ class TaskQueueDB(BaseSQLDB):
                 TaskQueues.CPUTime,
             )
             .join(JobsQueue, TaskQueues.TQId == JobsQueue.TQId)
-            .join(SitesQueue, TaskQueues.TQId == SitesQueue.TQId)
-            .join(GridCEsQueue, TaskQueues.TQId == GridCEsQueue.TQId)
             .group_by(
                 TaskQueues.TQId,
                 TaskQueues.Priority,
@@ -146,35 +190,28 @@ class TaskQueueDB(BaseSQLDB):
         )
         if tq_id_list is not None:
             stmt = stmt.where(TaskQueues.TQId.in_(tq_id_list))
-
-        tq_data: dict[int, dict[str, list[str]]] = dict(
-            dict(row._mapping) for row in await self.conn.execute(stmt)
-        )
-        # TODO: the line above should be equivalent to the following commented code, check this is the case
-        # for record in rows:
-        #     tqId = record[0]
-        #     tqData[tqId] = {
-        #         "Priority": record[1],
-        #         "Jobs": record[2],
-        #         "Owner": record[3],
-        #         "OwnerGroup": record[4],
-        #         "VO": record[5],
-        #         "CPUTime": record[6],
-        #     }
-
-        for tq_id in tq_data:
-            # TODO: maybe factorize this handy tuple list
-            for table, field in {
-                (SitesQueue, "Sites"),
-                (GridCEsQueue, "GridCEs"),
-                (BannedSitesQueue, "BannedSites"),
-                (PlatformsQueue, "Platforms"),
-                (JobTypesQueue, "JobTypes"),
-                (TagsQueue, "Tags"),
-            }:
-                stmt = select(table.Value).where(table.TQId == tq_id)
-                tq_data[tq_id][field] = list(
-                    row[0] for row in await self.conn.execute(stmt)
-                )
+        if enabled_only:
+            stmt = stmt.where(TaskQueues.Enabled >= 1)
+
+        tq_data: dict[int, dict[str, Any]] = {}
+        for row in await self.conn.execute(stmt):
+            tq_id, *_ = row
+            tq_data[tq_id] = dict(row._mapping)
+            del tq_data[tq_id]["TQId"]
+            for _, field in TQ_VALUE_TABLES:
+                tq_data[tq_id][field] = []
+        if not tq_data:
+            return tq_data
+
+        # The values of all the task queues are fetched with a single query
+        value_stmts = []
+        for table, field in TQ_VALUE_TABLES:
+            value_stmt = select(literal(field).label("Field"), table.TQId, table.Value)
+            if tq_id_list is not None:
+                value_stmt = value_stmt.where(table.TQId.in_(tq_id_list))
+            value_stmts.append(value_stmt)
+        for field, tq_id, value in await self.conn.execute(union_all(*value_stmts)):
+            if tq_id in tq_data:
+                tq_data[tq_id][field].append(value)
 
         return tq_data
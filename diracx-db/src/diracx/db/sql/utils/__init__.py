@@ -3,8 +3,12 @@ from __future__ import annotations
 from .base import (
     BaseSQLDB,
     SQLDBUnavailableError,
+    add_sort_tiebreaker,
+    apply_keyset_constraints,
     apply_search_filters,
     apply_sort_constraints,
+    decode_cursor,
+    encode_cursor,
 )
 from .functions import hash, substract_date, utcnow
 from .types import Column, DateNowColumn, EnumBackedBool, EnumColumn, NullColumn
@@ -19,6 +23,10 @@ __all__ = (
     "EnumColumn",
     "apply_search_filters",
     "apply_sort_constraints",
+    "add_sort_tiebreaker",
+    "apply_keyset_constraints",
+    "encode_cursor",
+    "decode_cursor",
     "substract_date",
     "hash",
     "SQLDBUnavailableError",
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import base64
 import contextlib
+import json
 import logging
 import os
 import re
@@ -8,16 +10,16 @@ from abc import ABCMeta
 from collections.abc import AsyncIterator
 from contextvars import ContextVar
 from datetime import datetime
-from typing import Self, cast
+from typing import Any, Self, cast
 
 from pydantic import TypeAdapter
-from sqlalchemy import DateTime, MetaData, select
+from sqlalchemy import DateTime, MetaData, and_, false, or_, select
 from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
 
 from diracx.core.exceptions import InvalidQueryError
 from diracx.core.extensions import select_from_extension
-from diracx.core.models import SortDirection
+from diracx.core.models import SortDirection, SortSpec
 from diracx.core.settings import SqlalchemyDsn
 from diracx.db.exceptions import DBUnavailableError
 
@@ -326,3 +328,77 @@ def apply_sort_constraints(column_mapping, stmt, sorts):
     if sort_columns:
         stmt = stmt.order_by(*sort_columns)
     return stmt
+
+
+def add_sort_tiebreaker(sorts: list[SortSpec], parameter: str) -> list[SortSpec]:
+    """Make the ordering given by ``sorts`` total by sorting on ``parameter`` last.
+
+    ``parameter`` must be a unique column. Any sort following it is dropped as
+    it can never have an effect.
+    """
+    result: list[SortSpec] = []
+    for sort in sorts or []:
+        result.append(sort)
+        if sort["parameter"] == parameter:
+            return result
+    result.append({"parameter": parameter, "direction": SortDirection.ASC})
+    return result
+
+
+def encode_cursor(sorts: list[SortSpec], row: dict[str, Any]) -> str:
+    """Build an opaque cursor pointing after ``row`` for the given sort order."""
+    payload = {
+        "sort": [[sort["parameter"], str(sort["direction"])] for sort in sorts],
+        "values": [row[sort["parameter"]] for sort in sorts],
+    }
+    raw = json.dumps(payload, default=datetime.isoformat)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(sorts: list[SortSpec], cursor: str) -> list[Any]:
+    """Extract the last seen sort key from a cursor made by ``encode_cursor``."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        cursor_sort = payload["sort"]
+        values = payload["values"]
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidQueryError(f"Invalid cursor {cursor!r}") from e
+    if cursor_sort != [[sort["parameter"], str(sort["direction"])] for sort in sorts]:
+        raise InvalidQueryError("The cursor does not match the requested sort order")
+    if not isinstance(values, list) or len(values) != len(sorts):
+        raise InvalidQueryError(f"Invalid cursor {cursor!r}")
+    return values
+
+
+def apply_keyset_constraints(column_mapping, stmt, sorts, values):
+    """Only select the rows which come strictly after ``values`` in the order of ``sorts``.
+
+    The condition is expanded to ``(a > x) OR (a = x AND b > y) OR ...`` rather
+    than using a row constructor comparison ``(a, b) > (x, y)`` as MySQL is only
+    able to use a range scan of the matching index with the former. NULL values
+    are considered to be smaller than any other value, as MySQL and SQLite do.
+    """
+    conditions = []
+    equalities = []
+    for sort, value in zip(sorts, values, strict=True):
+        try:
+            column = column_mapping(sort["parameter"])
+        except KeyError as e:
+            raise InvalidQueryError(
+                f"Cannot sort by {sort['parameter']}: unknown column"
+            ) from e
+        if isinstance(column.type, DateTime) and isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError as e:
+                raise InvalidQueryError(f"Invalid cursor value {value!r}") from e
+
+        if sort["direction"] == SortDirection.ASC:
+            after = column.is_not(None) if value is None else column > value
+        elif sort["direction"] == SortDirection.DESC:
+            after = false() if value is None else or_(column < value, column.is_(None))
+        else:
+            raise InvalidQueryError(f"Unknown sort {sort['direction']=}")
+        conditions.append(and_(*equalities, after))
+        equalities.append(column.is_(None) if value is None else column == value)
+    return stmt.where(or_(*conditions))
@@ -26,6 +26,10 @@ class EnumBackedBool(types.TypeDecorator):
     def __init__(self) -> None:
         super().__init__("True", "False")
 
+    @property
+    def python_type(self) -> type:
+        return bool
+
     def process_bind_param(self, value, dialect) -> str:
         if value is True:
             return "True"
@@ -0,0 +1,92 @@
+"""Compare the strategies of JobDB.set_job_attributes.
+
+This is not run as part of the tests. Example usage::
+
+    python diracx-db/tests/jobs/benchmark_set_job_attributes.py --jobs 100 1000 10000
+    python diracx-db/tests/jobs/benchmark_set_job_attributes.py --db-url "$DB_URL"
+
+When using MySQL the database must exist, the benchmark jobs are left in it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import get_args
+
+from diracx.db.sql.job.db import BulkUpdateStrategy, JobDB
+
+
+async def populate(job_db: JobDB, n_jobs: int) -> list[int]:
+    async with job_db as db:
+        job_ids = [await db.create_job(f"JDL{i}") for i in range(n_jobs)]
+        await db.insert_job_attributes(
+            {
+                job_id: {
+                    "Status": "Received",
+                    "Owner": "owner",
+                    "OwnerGroup": "group",
+                    "VO": "vo",
+                }
+                for job_id in job_ids
+            }
+        )
+    return job_ids
+
+
+def make_updates(job_ids: list[int], n_payloads: int) -> dict[int, dict]:
+    """Give the jobs ``n_payloads`` different sets of new values."""
+    return {
+        job_id: {"Status": "Checking", "MinorStatus": f"Minor{i % n_payloads}"}
+        for i, job_id in enumerate(job_ids)
+    }
+
+
+async def run(db_url: str, sizes: list[int], payloads: list[int], repeat: int):
+    job_db = JobDB(db_url)
+    async with job_db.engine_context():
+        async with job_db.engine.begin() as conn:
+            await conn.run_sync(job_db.metadata.create_all)
+
+        print(
+            f"{'jobs':>8} {'payloads':>8} "
+            + " ".join(f"{s:>10}" for s in get_args(BulkUpdateStrategy))
+        )
+        for n_jobs in sizes:
+            job_ids = await populate(job_db, n_jobs)
+            for n_payloads in payloads:
+                timings = []
+                for strategy in get_args(BulkUpdateStrategy):
+                    best = float("inf")
+                    for _ in range(repeat):
+                        updates = make_updates(job_ids, min(n_payloads, n_jobs))
+                        async with job_db as db:
+                            start = time.perf_counter()
+                            await db.set_job_attributes(updates, strategy=strategy)
+                            best = min(best, time.perf_counter() - start)
+                    timings.append(best)
+                print(
+                    f"{n_jobs:>8} {n_payloads:>8} "
+                    + " ".join(f"{t * 1000:>8.1f}ms" for t in timings)
+                )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", default="sqlite+aiosqlite:///:memory:")
+    parser.add_argument("--jobs", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument(
+        "--payloads",
+        type=int,
+        nargs="+",
+        default=[1, 10, 1_000_000],
+        help="Number of distinct sets of new values among the jobs",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(args.db_url, args.jobs, args.payloads, args.repeat))
+
+
+if __name__ == "__main__":
+    parse_args()
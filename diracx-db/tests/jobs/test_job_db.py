@@ -1,6 +1,11 @@
 from __future__ import annotations
 
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
 import pytest
+from sqlalchemy import insert, select, update
 from sqlalchemy.exc import IntegrityError
 
 from diracx.core.exceptions import InvalidQueryError
@@ -13,6 +18,7 @@ from diracx.core.models import (
     VectorSearchSpec,
 )
 from diracx.db.sql.job.db import JobDB
+from diracx.db.sql.job.schema import HeartBeatLoggingInfo, JobJDLs, Jobs
 
 
 @pytest.fixture
@@ -273,6 +279,14 @@ async def test_search_pagination(populated_job_db):
         assert total == 100
         assert not result
 
+        # Skip the total count
+        total, result = await job_db.search(
+            [], [], [], per_page=10, page=2, count=False
+        )
+        assert total is None
+        assert len(result) == 10
+        assert result[0]["JobID"] == 11
+
         # Invalid page number
         with pytest.raises(InvalidQueryError):
             result = await job_db.search([], [], [], per_page=10, page=0)
@@ -282,8 +296,397 @@ async def test_search_pagination(populated_job_db):
             result = await job_db.search([], [], [], per_page=0, page=1)
 
 
+async def test_search_by_cursor(populated_job_db):
+    """Test that we can iterate over the jobs using keyset pagination."""
+    async with populated_job_db as job_db:
+        sorts = [
+            SortSpec(parameter="OwnerGroup", direction=SortDirection.DESC),
+            SortSpec(parameter="LastUpdateTime", direction=SortDirection.ASC),
+        ]
+        _, expected = await job_db.search(
+            ["JobID"],
+            [],
+            sorts + [SortSpec(parameter="JobID", direction=SortDirection.ASC)],
+        )
+
+        # Iterate over all the pages
+        result = []
+        cursor = None
+        for _ in range(4):
+            jobs, cursor = await job_db.search_by_cursor(
+                ["JobID"], [], sorts, per_page=30, cursor=cursor
+            )
+            # The sort columns are only used to build the cursor
+            assert all(job.keys() == {"JobID"} for job in jobs)
+            result.extend(jobs)
+            if cursor is None:
+                break
+        assert len(jobs) == 10
+        assert cursor is None
+        assert result == expected
+
+        # An exact number of pages should not need an empty extra page
+        jobs, cursor = await job_db.search_by_cursor(["JobID"], [], [], per_page=50)
+        jobs, cursor = await job_db.search_by_cursor(
+            ["JobID"], [], [], per_page=50, cursor=cursor
+        )
+        assert len(jobs) == 50
+        assert cursor is None
+
+        # Search conditions still apply
+        condition = ScalarSearchSpec(
+            parameter="JobID", operator=ScalarSearchOperator.LESS_THAN, value=6
+        )
+        jobs, cursor = await job_db.search_by_cursor(None, [condition], [], per_page=3)
+        assert [job["JobID"] for job in jobs] == [1, 2, 3]
+        jobs, cursor = await job_db.search_by_cursor(
+            None, [condition], [], per_page=3, cursor=cursor
+        )
+        assert [job["JobID"] for job in jobs] == [4, 5]
+        assert cursor is None
+
+        # The cursor can only be used with the same sort order
+        _, cursor = await job_db.search_by_cursor(["JobID"], [], sorts, per_page=10)
+        with pytest.raises(InvalidQueryError):
+            await job_db.search_by_cursor(["JobID"], [], [], per_page=10, cursor=cursor)
+
+        # Invalid cursor
+        with pytest.raises(InvalidQueryError):
+            await job_db.search_by_cursor(["JobID"], [], [], cursor="not-a-cursor")
+
+        # Invalid per_page number
+        with pytest.raises(InvalidQueryError):
+            await job_db.search_by_cursor(["JobID"], [], [], per_page=0)
+
+
+async def test_stream_search(populated_job_db):
+    """Test that the search results can be streamed in batches."""
+    async with populated_job_db as job_db:
+        sorts = [SortSpec(parameter="JobID", direction=SortDirection.DESC)]
+        _, expected = await job_db.search(["JobID", "Owner"], [], sorts)
+
+        batches = [
+            batch
+            async for batch in job_db.stream_search(
+                ["JobID", "Owner"], [], sorts, batch_size=30
+            )
+        ]
+        assert [len(batch) for batch in batches] == [30, 30, 30, 10]
+        assert [job for batch in batches for job in batch] == expected
+
+        # Search conditions still apply
+        condition = ScalarSearchSpec(
+            parameter="JobID", operator=ScalarSearchOperator.LESS_THAN, value=6
+        )
+        batches = [
+            batch async for batch in job_db.stream_search(["JobID"], [condition], [])
+        ]
+        assert batches == [[{"JobID": i} for i in range(1, 6)]]
+
+    # Invalid queries are rejected before the iterator is consumed
+    with pytest.raises(InvalidQueryError):
+        job_db.stream_search(["NotAColumn"], [], [])
+    with pytest.raises(InvalidQueryError):
+        job_db.stream_search(["JobID"], [], [], batch_size=0)
+
+
+async def test_summary_counters(populated_job_db):
+    """Test that the summary counters follow the changes made to the jobs."""
+
+    async def summary(group_by, search=[], use_counters=True):
+        result = await job_db.summary(group_by, search, use_counters=use_counters)
+        return sorted(result, key=lambda x: [str(v) for v in x.values()])
+
+    async with populated_job_db as job_db:
+        assert await summary(["Status", "OwnerGroup"]) == [
+            {"Status": "New", "OwnerGroup": "owner_group1", "count": 50},
+            {"Status": "New", "OwnerGroup": "owner_group2", "count": 50},
+        ]
+
+        await job_db.set_job_attributes(
+            {1: {"Status": "Running"}, 2: {"Status": "Running"}, 60: {"Site": "A"}}
+        )
+        await job_db.set_properties({3: {"Status": "Done"}, 4: {"Status": "Done"}})
+        assert await summary(["Status"]) == [
+            {"Status": "Done", "count": 2},
+            {"Status": "New", "count": 96},
+            {"Status": "Running", "count": 2},
+        ]
+        assert await summary(
+            ["Site", "OwnerGroup"],
+            [{"parameter": "Status", "operator": "eq", "value": "New"}],
+        ) == [
+            {"Site": "A", "OwnerGroup": "owner_group2", "count": 1},
+            {"Site": "ANY", "OwnerGroup": "owner_group1", "count": 46},
+            {"Site": "ANY", "OwnerGroup": "owner_group2", "count": 49},
+        ]
+
+        await job_db.delete_jobs([1, 3])
+        expected = [
+            {"Status": "Done", "count": 1},
+            {"Status": "New", "count": 96},
+            {"Status": "Running", "count": 1},
+        ]
+        assert await summary(["Status"]) == expected
+
+        # Other groupings and searches use the Jobs table
+        assert await summary(["JobType"]) == [{"JobType": "user", "count": 98}]
+        assert await summary(
+            ["Status"], [{"parameter": "JobID", "operator": "in", "values": [2, 4]}]
+        ) == [{"Status": "Done", "count": 1}, {"Status": "Running", "count": 1}]
+
+        # Rebuilding the summary gives the same result
+        await job_db.rebuild_summary()
+        assert await summary(["Status"]) == expected
+
+        # The changes made by other services are not counted, the Jobs table
+        # is used by default
+        await job_db.conn.execute(
+            update(Jobs).where(Jobs.job_id == 2).values(Status="Done")
+        )
+        assert await summary(["Status"]) == expected
+        assert await summary(["Status"], use_counters=False) == [
+            {"Status": "Done", "count": 2},
+            {"Status": "New", "count": 96},
+        ]
+
+
+@pytest.fixture(params=["sqlite", "mysql"])
+def job_db_url(request):
+    """The URL of an empty database of each type, MySQL being optional."""
+    if request.param == "sqlite":
+        return "sqlite+aiosqlite:///:memory:"
+    if not (db_url := os.environ.get("DIRACX_TEST_MYSQL_URL")):
+        pytest.skip("Requires DIRACX_TEST_MYSQL_URL to be set")
+    return db_url
+
+
+@pytest.fixture
+async def any_job_db(job_db_url):
+    job_db = JobDB(job_db_url)
+    async with job_db.engine_context():
+        async with job_db.engine.begin() as conn:
+            await conn.run_sync(job_db.metadata.create_all)
+        yield job_db
+        async with job_db.engine.begin() as conn:
+            await conn.run_sync(job_db.metadata.drop_all)
+
+
+async def test_set_job_attributes_staging_rollback(any_job_db):
+    """The update through the staging table is undone by a rollback."""
+    job_db = any_job_db
+    async with job_db:
+        job_ids = [await job_db.create_job(f"JDL{i}") for i in range(5)]
+        await job_db.insert_job_attributes(
+            {
+                job_id: {"Status": "New", "Owner": "owner", "VO": "vo"}
+                for job_id in job_ids
+            }
+        )
+
+    with pytest.raises(RuntimeError, match="Rollback"):
+        async with job_db:
+            await job_db.set_job_attributes(
+                {job_id: {"Status": "Done"} for job_id in job_ids},
+                strategy="staging",
+            )
+            _, jobs = await job_db.search(["Status"], [], [])
+            assert {job["Status"] for job in jobs} == {"Done"}
+            raise RuntimeError("Rollback")
+
+    async with job_db:
+        _, jobs = await job_db.search(["Status"], [], [])
+        assert {job["Status"] for job in jobs} == {"New"}
+        result = await job_db.summary(["Status"], [], use_counters=True)
+        assert result == [{"Status": "New", "count": 5}]
+
+
+async def test_set_job_attributes_staging_concurrent(any_job_db):
+    """Concurrent updates through staging tables on one connection don't collide."""
+    job_db = any_job_db
+    async with job_db:
+        job_ids = [await job_db.create_job(f"JDL{i}") for i in range(4)]
+        await job_db.insert_job_attributes(
+            {
+                job_id: {"Status": "New", "Owner": "owner", "VO": "vo"}
+                for job_id in job_ids
+            }
+        )
+
+    async with job_db:
+        await asyncio.gather(
+            job_db.set_job_attributes(
+                {job_id: {"Status": "Done"} for job_id in job_ids[:2]},
+                strategy="staging",
+            ),
+            job_db.set_job_attributes(
+                {job_id: {"Site": "A"} for job_id in job_ids[2:]},
+                strategy="staging",
+            ),
+        )
+
+    async with job_db:
+        _, jobs = await job_db.search(["JobID", "Status", "Site"], [], [])
+        assert sorted(jobs, key=lambda job: job["JobID"]) == [
+            {"JobID": job_ids[0], "Status": "Done", "Site": "ANY"},
+            {"JobID": job_ids[1], "Status": "Done", "Site": "ANY"},
+            {"JobID": job_ids[2], "Status": "New", "Site": "A"},
+            {"JobID": job_ids[3], "Status": "New", "Site": "A"},
+        ]
+
+
+@pytest.mark.parametrize("strategy", [None, "case", "grouped", "staging"])
+async def test_set_job_attributes_strategies(populated_job_db, strategy):
+    """Test that all the bulk update strategies give the same result."""
+    async with populated_job_db as job_db:
+        updates = {
+            # Identical payloads
+            **{job_id: {"Status": "Killed"} for job_id in range(1, 40)},
+            # Different payloads for the same columns
+            **{
+                job_id: {"Status": "Done", "MinorStatus": f"Minor{job_id}"}
+                for job_id in range(40, 60)
+            },
+            # Columns which need their values to be converted
+            60: {"VerifiedFlag": False, "AccountedFlag": "Failed"},
+            61: {"AccountedFlag": True, "Site": "A"},
+        }
+        await job_db.set_job_attributes(updates, strategy=strategy)
+
+        _, jobs = await job_db.search(
+            ["JobID", "Status", "MinorStatus", "Site", "LastUpdateTime"]
+            + ["VerifiedFlag", "AccountedFlag"],
+            [],
+            [SortSpec(parameter="JobID", direction=SortDirection.ASC)],
+        )
+        jobs = {job.pop("JobID"): job for job in jobs}
+        assert {
+            job_id for job_id, job in jobs.items() if job["Status"] == "Killed"
+        } == set(range(1, 40))
+        assert all(
+            jobs[job_id]["MinorStatus"] == f"Minor{job_id}" for job_id in range(40, 60)
+        )
+        assert jobs[60]["VerifiedFlag"] is False
+        assert jobs[60]["AccountedFlag"] == "Failed"
+        assert jobs[61]["AccountedFlag"] is True
+        assert jobs[61]["Site"] == "A"
+        # Other attributes and jobs are untouched
+        assert jobs[60]["Status"] == jobs[62]["Status"] == "New"
+        assert jobs[62]["Site"] == "ANY"
+        assert jobs[62]["LastUpdateTime"] is None
+        assert jobs[1]["LastUpdateTime"] is not None
+
+        # The summary counters are maintained
+        result = await job_db.summary(["Status"], [], use_counters=True)
+        assert sorted(result, key=lambda x: x["Status"]) == [
+            {"Status": "Done", "count": 20},
+            {"Status": "Killed", "count": 39},
+            {"Status": "New", "count": 41},
+        ]
+
+
+async def test_create_jobs(populated_job_db):
+    """The ids of the jobs created at once follow the order of the JDLs."""
+    async with populated_job_db as job_db:
+        assert await job_db.create_jobs([]) == []
+        job_ids = await job_db.create_jobs([f"BulkJDL{i}" for i in range(5)])
+        assert job_ids == list(range(101, 106))
+        stmt = select(JobJDLs.job_id, JobJDLs.original_jdl).where(
+            JobJDLs.job_id.in_(job_ids)
+        )
+        assert dict((await job_db.conn.execute(stmt)).all()) == {
+            job_id: f"BulkJDL{i}" for i, job_id in enumerate(job_ids)
+        }
+
+
+async def test_get_job_owners(populated_job_db):
+    async with populated_job_db as job_db:
+        assert await job_db.get_job_owners([1, 2, 2, 1000]) == {
+            1: ("owner0", "lhcb"),
+            2: ("owner1", "lhcb"),
+        }
+
+        # The owners are then taken from the cache
+        await job_db.conn.execute(update(Jobs).values(Owner="changed"))
+        assert await job_db.get_job_owners([1, 3]) == {
+            1: ("owner0", "lhcb"),
+            3: ("changed", "lhcb"),
+        }
+
+        # The deleted jobs are removed from the cache
+        await job_db.delete_jobs([1])
+        assert await job_db.get_job_owners([1, 2]) == {2: ("owner1", "lhcb")}
+
+
 async def test_set_job_commands_invalid_job_id(job_db: JobDB):
     """Test that setting a command for a non-existent job raises JobNotFound."""
     async with job_db as job_db:
         with pytest.raises(IntegrityError):
             await job_db.set_job_commands([(123456, "test_command", "")])
+
+
+async def test_add_heartbeat_data(populated_job_db):
+    async with populated_job_db as job_db:
+        await job_db.add_heartbeat_data(
+            {1: {"Vsize": 1, "MemoryUsed": 2}, 2: {"Vsize": 3}, 3: {}}
+        )
+        rows = await job_db.conn.execute(
+            select(
+                HeartBeatLoggingInfo.job_id,
+                HeartBeatLoggingInfo.name,
+                HeartBeatLoggingInfo.value,
+            ).order_by(HeartBeatLoggingInfo.job_id, HeartBeatLoggingInfo.name)
+        )
+        assert rows.all() == [
+            (1, "MemoryUsed", "2"),
+            (1, "Vsize", "1"),
+            (2, "Vsize", "3"),
+        ]
+
+        # Nothing is inserted if any of the fields is not allowed
+        with pytest.raises(InvalidQueryError, match="NotAField"):
+            await job_db.add_heartbeat_data({4: {"Vsize": 1}, 5: {"NotAField": 1}})
+        rows = await job_db.conn.execute(
+            select(HeartBeatLoggingInfo.job_id).where(HeartBeatLoggingInfo.job_id > 3)
+        )
+        assert rows.all() == []
+
+
+async def test_compact_heartbeat_data(populated_job_db):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    async with populated_job_db as job_db:
+        # Jobs 1 and 2 report every 20 minutes for 3 hours
+        await job_db.conn.execute(
+            insert(HeartBeatLoggingInfo),
+            [
+                {
+                    "JobID": job_id,
+                    "Name": "Vsize",
+                    "Value": str(i),
+                    "HeartBeatTime": start + timedelta(minutes=20 * i),
+                }
+                for job_id in [1, 2]
+                for i in range(9)
+            ],
+        )
+
+        async def values(job_id):
+            rows = await job_db.conn.execute(
+                select(HeartBeatLoggingInfo.value)
+                .where(HeartBeatLoggingInfo.job_id == job_id)
+                .order_by(HeartBeatLoggingInfo.heart_beat_time)
+            )
+            return [int(x) for x in rows.scalars()]
+
+        # Only the last value of each hour before the cutoff is kept
+        deleted = await job_db.compact_heartbeat_data(
+            start + timedelta(hours=2), job_ids=[1]
+        )
+        assert deleted == 4
+        assert await values(1) == [2, 5, 6, 7, 8]
+        assert await values(2) == list(range(9))
+
+        deleted = await job_db.compact_heartbeat_data(start + timedelta(hours=4), "DAY")
+        assert deleted == 4 + 8
+        assert await values(1) == [8]
+        assert await values(2) == [8]
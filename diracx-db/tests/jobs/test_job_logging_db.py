@@ -3,9 +3,11 @@ from __future__ import annotations
 from datetime import datetime, timedelta, timezone
 
 import pytest
+from sqlalchemy import insert, select
 
 from diracx.core.models import JobLoggingRecord, JobStatus
 from diracx.db.sql import JobLoggingDB
+from diracx.db.sql.job_logging.schema import LoggingInfo
 
 
 @pytest.fixture
@@ -94,3 +96,193 @@ async def test_insert_records(job_logging_db: JobLoggingDB):
         assert abs(res[1]["Received"] - date_1) < timedelta(microseconds=1000)
         assert abs(res[1]["Submitting"] - date_2) < timedelta(microseconds=1000)
         assert abs(res[1]["Running"] - date_3) < timedelta(microseconds=1000)
+
+
+async def test_insert_records_seq_num(job_logging_db: JobLoggingDB):
+    """The sequence numbers are allocated per job in insertion order."""
+
+    def make_record(job_id: int, minor_status: str) -> JobLoggingRecord:
+        return JobLoggingRecord(
+            job_id=job_id,
+            status=JobStatus.RECEIVED,
+            minor_status=minor_status,
+            application_status="idem",
+            date=datetime.now(timezone.utc),
+            source="pytest",
+        )
+
+    async with job_logging_db as db:
+        await db.insert_records([make_record(1, "a"), make_record(1, "b")])
+    async with job_logging_db as db:
+        await db.insert_records(
+            [make_record(2, "c"), make_record(1, "d"), make_record(2, "e")]
+        )
+        await db.insert_records([])
+
+    async with job_logging_db as db:
+        rows = await db.conn.execute(
+            select(
+                LoggingInfo.job_id, LoggingInfo.seq_num, LoggingInfo.minor_status
+            ).order_by(LoggingInfo.job_id, LoggingInfo.seq_num)
+        )
+        assert rows.all() == [
+            (1, 1, "a"),
+            (1, 2, "b"),
+            (1, 3, "d"),
+            (2, 1, "c"),
+            (2, 2, "e"),
+        ]
+
+
+async def test_get_records_idem(job_logging_db: JobLoggingDB):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    history = [
+        ("Received", "Job accepted", "idem"),
+        ("idem", "idem", "idem"),
+        ("Running", "idem", "Setup"),
+        ("idem", "Application", "idem"),
+        ("idem", "idem", "Done"),
+        ("Done", "Execution Complete", "idem"),
+    ]
+    async with job_logging_db as db:
+        await db.insert_records(
+            [
+                JobLoggingRecord(
+                    job_id=job_id,
+                    status=status,
+                    minor_status=minor_status,
+                    application_status=application_status,
+                    date=start + timedelta(minutes=i),
+                    source="pytest",
+                )
+                for job_id in [1, 2]
+                for i, (status, minor_status, application_status) in enumerate(history)
+            ]
+        )
+
+    expected = [
+        ("Received", "Job accepted", "Unknown"),
+        ("Received", "Job accepted", "Unknown"),
+        ("Running", "Job accepted", "Setup"),
+        ("Running", "Application", "Setup"),
+        ("Running", "Application", "Done"),
+        ("Done", "Execution Complete", "Done"),
+    ]
+
+    def summarise(records):
+        return [(r.Status, r.MinorStatus, r.ApplicationStatus) for r in records]
+
+    async with job_logging_db as db:
+        res = await db.get_records([1, 2, 3])
+        assert list(res) == [1, 2]
+        assert summarise(res[1]) == expected
+        assert summarise(res[2]) == expected
+        assert [r.StatusTime for r in res[1]] == [
+            start + timedelta(minutes=i) for i in range(6)
+        ]
+
+        res = await db.get_records([1], last=2)
+        assert summarise(res[1]) == expected[-2:]
+
+        res = await db.get_records([1], major_only=True)
+        assert summarise(res[1]) == [expected[0], expected[2], expected[5]]
+
+        res = await db.get_records([1, 2], last=2, major_only=True)
+        assert summarise(res[1]) == [expected[2], expected[5]]
+        assert summarise(res[2]) == [expected[2], expected[5]]
+
+        # The records are streamed job by job
+        streamed = [
+            (job_id, len(records))
+            async for job_id, records in db.iter_records([1, 2], batch_size=4)
+        ]
+        assert streamed == [(1, 6), (2, 6)]
+
+
+async def test_wms_time_stamps_timeline(job_logging_db: JobLoggingDB):
+    """The latest time of each status is kept up to date in LoggingTimeline."""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def make_record(job_id: int, status: str, minutes: int) -> JobLoggingRecord:
+        return JobLoggingRecord(
+            job_id=job_id,
+            status=status,
+            minor_status="idem",
+            application_status="idem",
+            date=start + timedelta(minutes=minutes),
+            source="pytest",
+        )
+
+    async with job_logging_db as db:
+        await db.insert_records(
+            [
+                make_record(1, "Received", 0),
+                make_record(1, "Received", 2),
+                make_record(1, "Running", 1),
+                make_record(2, "Received", 0),
+            ]
+        )
+    async with job_logging_db as db:
+        # Older records do not move the time stamps back
+        await db.insert_records(
+            [make_record(1, "Received", 1), make_record(1, "Done", 3)]
+        )
+        expected = {
+            1: {
+                "Received": start + timedelta(minutes=2),
+                "Running": start + timedelta(minutes=1),
+                "Done": start + timedelta(minutes=3),
+            },
+            2: {"Received": start},
+        }
+        assert await db.get_wms_time_stamps([1, 2, 3]) == expected
+
+        # The timeline can be recomputed from the full history
+        await db.rebuild_timeline()
+        assert await db.get_wms_time_stamps([1, 2, 3]) == expected
+
+        await db.delete_records([1])
+        assert await db.get_wms_time_stamps([1, 2]) == {2: expected[2]}
+        await db.rebuild_timeline()
+        assert await db.get_wms_time_stamps([1, 2]) == {2: expected[2]}
+
+
+async def test_wms_time_stamps_legacy_records(job_logging_db: JobLoggingDB):
+    """Records inserted without JobLoggingDB, e.g. by DIRAC, update the timeline."""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    async with job_logging_db as db:
+        await db.insert_records(
+            [
+                JobLoggingRecord(
+                    job_id=1,
+                    status=status,
+                    minor_status="idem",
+                    application_status="idem",
+                    date=start + timedelta(minutes=minutes),
+                    source="pytest",
+                )
+                for status, minutes in [("Received", 0), ("Running", 2)]
+            ]
+        )
+        await db.conn.execute(
+            insert(LoggingInfo),
+            [
+                {
+                    "JobID": 1,
+                    "Status": status,
+                    "StatusTime": start + timedelta(minutes=minutes),
+                    "StatusTimeOrder": start + timedelta(minutes=minutes),
+                }
+                for status, minutes in [("Running", 1), ("Running", 3), ("Done", 4)]
+            ],
+        )
+        expected = {
+            1: {
+                "Received": start,
+                "Running": start + timedelta(minutes=3),
+                "Done": start + timedelta(minutes=4),
+            }
+        }
+        assert await db.get_wms_time_stamps([1]) == expected
+        await db.rebuild_timeline()
+        assert await db.get_wms_time_stamps([1]) == expected
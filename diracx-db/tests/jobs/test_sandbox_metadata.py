@@ -10,7 +10,11 @@ import sqlalchemy
 from diracx.core.exceptions import SandboxAlreadyInsertedError, SandboxNotFoundError
 from diracx.core.models import SandboxInfo, UserInfo
 from diracx.db.sql.sandbox_metadata.db import SandboxMetadataDB
-from diracx.db.sql.sandbox_metadata.schema import SandBoxes, SBEntityMapping
+from diracx.db.sql.sandbox_metadata.schema import (
+    SandBoxes,
+    SBEntityMapping,
+    SBOwners,
+)
 
 
 @pytest.fixture
@@ -188,6 +192,57 @@ async def test_assign_and_unsassign_sandbox_to_jobs(
     assert sb_id_1 not in res_sb_id
 
 
+@pytest.mark.parametrize("n_jobs", [1, 50])
+async def test_assign_and_unassign_sandbox_to_many_jobs(
+    sandbox_metadata_db: SandboxMetadataDB, n_jobs: int
+):
+    user_info = UserInfo(
+        sub="vo:sub", preferred_username="user1", dirac_group="group1", vo="vo"
+    )
+    sandbox_se = "SandboxSE"
+    pfns = [secrets.token_hex() for _ in range(2)]
+    job_ids = list(range(1, n_jobs + 1))
+    async with sandbox_metadata_db:
+        owner_id = await sandbox_metadata_db.insert_owner(user_info)
+        for pfn in pfns:
+            await sandbox_metadata_db.insert_sandbox(owner_id, sandbox_se, pfn, 100)
+
+    statements = []
+
+    def count_statements(*args):
+        statements.append(args)
+
+    engine = sandbox_metadata_db.engine.sync_engine
+    sqlalchemy.event.listen(engine, "before_cursor_execute", count_statements)
+    try:
+        async with sandbox_metadata_db:
+            # The first sandbox is shared by all the jobs and an extra one
+            await sandbox_metadata_db.assign_sandbox_to_jobs(
+                job_ids + [1000], pfns[0], "Input", sandbox_se
+            )
+            await sandbox_metadata_db.assign_sandbox_to_jobs(
+                job_ids, pfns[1], "Output", sandbox_se
+            )
+            await sandbox_metadata_db.unassign_sandboxes_to_jobs(job_ids)
+    finally:
+        sqlalchemy.event.remove(engine, "before_cursor_execute", count_statements)
+    # The number of statements does not depend on the number of jobs
+    assert len(statements) == 8
+
+    async with sandbox_metadata_db:
+        assert await sandbox_metadata_db.sandbox_is_assigned(pfns[0], sandbox_se)
+        assert not await sandbox_metadata_db.sandbox_is_assigned(pfns[1], sandbox_se)
+        stmt = sqlalchemy.select(SBEntityMapping.EntityId)
+        assert (await sandbox_metadata_db.conn.execute(stmt)).scalars().all() == [
+            "Job:1000"
+        ]
+
+        with pytest.raises(SandboxNotFoundError):
+            await sandbox_metadata_db.assign_sandbox_to_jobs(
+                [1], "unknown", "Input", sandbox_se
+            )
+
+
 async def test_get_sandbox_owner_id(sandbox_metadata_db: SandboxMetadataDB):
     user_info = UserInfo(
         sub="vo:sub", preferred_username="user1", dirac_group="group1", vo="vo"
@@ -210,3 +265,24 @@ async def test_get_sandbox_owner_id(sandbox_metadata_db: SandboxMetadataDB):
             "not_found", sandbox_se
         )
     assert sb_owner_id is None
+
+    async with sandbox_metadata_db:
+        sb_owner_ids = await sandbox_metadata_db.get_sandbox_owner_ids(
+            [pfn, "not_found"], sandbox_se
+        )
+    assert sb_owner_ids == {pfn: owner_id}
+
+
+async def test_get_owner_id_cache(sandbox_metadata_db: SandboxMetadataDB):
+    user_info = UserInfo(
+        sub="vo:sub", preferred_username="user1", dirac_group="group1", vo="vo"
+    )
+    async with sandbox_metadata_db:
+        # The unknown owners are not cached
+        assert await sandbox_metadata_db.get_owner_id(user_info) is None
+        owner_id = await sandbox_metadata_db.insert_owner(user_info)
+        assert await sandbox_metadata_db.get_owner_id(user_info) == owner_id
+
+        # The known owners are then taken from the cache
+        await sandbox_metadata_db.conn.execute(sqlalchemy.delete(SBOwners))
+        assert await sandbox_metadata_db.get_owner_id(user_info) == owner_id
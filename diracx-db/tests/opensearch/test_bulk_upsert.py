@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from opensearchpy.serializer import JSONSerializer
+
+from diracx.db.os.utils import OpenSearchDBError
+from diracx.testing.mock_osdb import MockOSDBMixin
+from diracx.testing.osdb import DummyOSDB
+
+from .test_search import resolve_fixtures_hack
+
+
+def make_doc(i: int) -> dict:
+    return {
+        "DateField": datetime.now(tz=timezone.utc),
+        "IntField": i,
+        "KeywordField0": f"keyword{i % 3}",
+        "TextField": f"text {i}",
+    }
+
+
+@pytest.fixture(params=["dummy_opensearch_db", "sql_opensearch_db"])
+async def db(request):
+    async with resolve_fixtures_hack(request, request.param) as db:
+        yield db
+
+
+async def test_bulk_upsert(db: DummyOSDB):
+    # Spread the documents over several indices
+    documents = {i * 500_000 + 1: make_doc(i) for i in range(5)}
+    await db.bulk_upsert("dummyvo", documents)
+    # Upserting again only updates the given fields
+    await db.bulk_upsert(
+        "dummyvo", {doc_id: {"IntField": -1} for doc_id in list(documents)[:2]}
+    )
+
+    if not isinstance(db, MockOSDBMixin):
+        await db.client.indices.refresh(index=f"{db.index_prefix}*")
+    results = await db.search(["IntField", "TextField"], [], [])
+    assert sorted(results, key=lambda x: x["TextField"]) == [
+        {"IntField": -1, "TextField": "text 0"},
+        {"IntField": -1, "TextField": "text 1"},
+        {"IntField": 2, "TextField": "text 2"},
+        {"IntField": 3, "TextField": "text 3"},
+        {"IntField": 4, "TextField": "text 4"},
+    ]
+
+
+class FakeBulkClient:
+    """Record the _bulk requests and fail some of the items."""
+
+    def __init__(self, failures: dict[int, list[int]]):
+        # doc_id -> statuses to return for the successive attempts
+        self.failures = failures
+        self.requests: list[tuple[str, list[int]]] = []
+        self.transport = SimpleNamespace(serializer=JSONSerializer())
+
+    async def bulk(self, *, body, index):
+        lines = body.splitlines()
+        doc_ids = [json.loads(action)["update"]["_id"] for action in lines[::2]]
+        self.requests.append((index, doc_ids))
+        items = []
+        for doc_id in doc_ids:
+            statuses = self.failures.get(doc_id, [])
+            status = statuses.pop(0) if statuses else 200
+            items.append({"update": {"_id": doc_id, "status": status}})
+        return {
+            "took": 1,
+            "errors": any(i["update"]["status"] >= 300 for i in items),
+            "items": items,
+        }
+
+
+@pytest.fixture
+def fake_db():
+    db = DummyOSDB({})
+    db.bulk_retry_delay = 0
+    return db
+
+
+async def test_bulk_upsert_chunks(fake_db: DummyOSDB):
+    fake_db._client = client = FakeBulkClient({})  # type: ignore[assignment]
+    # Roughly two documents per request
+    fake_db.bulk_max_bytes = 2 * len(
+        client.transport.serializer.dumps({"doc": make_doc(0)})
+    )
+
+    await fake_db.bulk_upsert("dummyvo", {i: make_doc(i) for i in range(5)})
+    await fake_db.bulk_upsert("dummyvo", {1: make_doc(1), 1_000_001: make_doc(2)})
+
+    index = fake_db.index_name("dummyvo", 0)
+    assert client.requests == [
+        (index, [0]),
+        (index, [1]),
+        (index, [2]),
+        (index, [3]),
+        (index, [4]),
+        # Requests are grouped by index
+        (index, [1]),
+        (fake_db.index_name("dummyvo", 1_000_001), [1_000_001]),
+    ]
+
+    client.requests.clear()
+    fake_db.bulk_max_bytes = 10_000
+    await fake_db.bulk_upsert("dummyvo", {i: make_doc(i) for i in range(5)})
+    assert client.requests == [(index, [0, 1, 2, 3, 4])]
+
+
+async def test_bulk_upsert_retries(fake_db: DummyOSDB):
+    fake_db._client = client = FakeBulkClient(  # type: ignore[assignment]
+        {1: [429], 3: [503, 409]}
+    )
+    await fake_db.bulk_upsert("dummyvo", {i: make_doc(i) for i in range(5)})
+    index = fake_db.index_name("dummyvo", 0)
+    # Only the failed items are resent
+    assert client.requests == [
+        (index, [0, 1, 2, 3, 4]),
+        (index, [1, 3]),
+        (index, [3]),
+    ]
+
+
+async def test_bulk_upsert_errors(fake_db: DummyOSDB):
+    fake_db._client = client = FakeBulkClient(  # type: ignore[assignment]
+        {1: [400], 2: [429] * 10}
+    )
+    with pytest.raises(OpenSearchDBError, match="Failed to upsert 2 documents"):
+        await fake_db.bulk_upsert("dummyvo", {i: make_doc(i) for i in range(3)})
+    # Permanent errors are not retried, transient ones until the limit
+    index = fake_db.index_name("dummyvo", 0)
+    assert client.requests == [(index, [0, 1, 2])] + [(index, [2])] * 3
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import event, insert
+
+from diracx.db.sql.task_queue.db import TaskQueueDB
+from diracx.db.sql.task_queue.schema import (
+    GridCEsQueue,
+    JobsQueue,
+    SitesQueue,
+    TagsQueue,
+    TaskQueues,
+)
+
+
+async def test_delete_empty_task_queues(task_queue_db: TaskQueueDB):
+    async with task_queue_db as task_queue_db:
+        await task_queue_db.conn.execute(
+            insert(TaskQueues),
+            [
+                {
+                    "TQId": tq_id,
+                    "Owner": f"owner{tq_id % 2}",
+                    "OwnerGroup": "group",
+                    "VO": "vo",
+                    "CPUTime": 3600,
+                    "Priority": 1.0,
+                    "Enabled": tq_id != 4,
+                }
+                for tq_id in range(1, 5)
+            ],
+        )
+        # Task queues 1 and 2 have two jobs each, 3 and 4 have none
+        await task_queue_db.conn.execute(
+            insert(JobsQueue),
+            [
+                {"TQId": tq_id, "JobId": job_id, "Priority": 1, "RealPriority": 1.0}
+                for job_id, tq_id in enumerate([1, 1, 2, 2], start=1)
+            ],
+        )
+
+        assert await task_queue_db.get_tq_infos_for_jobs([1, 3]) == {
+            (1, "owner1", "group", "vo"),
+            (2, "owner0", "group", "vo"),
+        }
+
+        await task_queue_db.remove_jobs([1, 3, 4])
+        assert sorted(await task_queue_db.get_empty_task_queues([1, 2, 3, 4])) == [
+            2,
+            3,
+        ]
+        assert await task_queue_db.get_empty_task_queues([1]) == []
+        assert await task_queue_db.get_empty_task_queues([]) == []
+
+        await task_queue_db.set_priorities({1: 2.5, 2: 0.5})
+        tq_data = await task_queue_db.retrieve_task_queues()
+        assert {tq_id: data["Priority"] for tq_id, data in tq_data.items()} == {1: 2.5}
+
+        await task_queue_db.delete_task_queues([2, 3])
+        assert await task_queue_db.get_task_queue_owners_by_group("group") == {
+            "owner0": 1,
+            "owner1": 1,
+        }
+
+
+async def test_pop_job(task_queue_db: TaskQueueDB):
+    async with task_queue_db as task_queue_db:
+        await _fill_task_queues(task_queue_db, 2)
+        await task_queue_db.conn.execute(
+            insert(JobsQueue),
+            [{"TQId": 1, "JobId": 3, "Priority": 1, "RealPriority": 2.0}],
+        )
+        # The jobs are popped by priority, then the task queue is reported empty
+        assert await task_queue_db.pop_job(1) == (3, False)
+        assert await task_queue_db.pop_job(1) == (1, False)
+        assert await task_queue_db.pop_job(1) == (None, True)
+        assert await task_queue_db.get_empty_task_queues([1, 2]) == [1]
+
+
+async def _fill_task_queues(task_queue_db: TaskQueueDB, n_tqs: int):
+    await task_queue_db.conn.execute(
+        insert(TaskQueues),
+        [
+            {
+                "TQId": tq_id,
+                "Owner": "owner",
+                "OwnerGroup": "group",
+                "VO": "vo",
+                "CPUTime": 3600,
+                "Priority": 1.0,
+                "Enabled": True,
+            }
+            for tq_id in range(1, n_tqs + 1)
+        ],
+    )
+    await task_queue_db.conn.execute(
+        insert(JobsQueue),
+        [
+            {"TQId": tq_id, "JobId": tq_id, "Priority": 1, "RealPriority": 1.0}
+            for tq_id in range(1, n_tqs + 1)
+        ],
+    )
+    for table in (SitesQueue, GridCEsQueue, TagsQueue):
+        await task_queue_db.conn.execute(
+            insert(table),
+            [
+                {"TQId": tq_id, "Value": f"{table.__tablename__}{i}"}
+                for tq_id in range(1, n_tqs + 1)
+                for i in range(2)
+            ],
+        )
+
+
+@pytest.mark.parametrize("n_tqs", [1, 10, 100])
+async def test_retrieve_task_queues(task_queue_db: TaskQueueDB, n_tqs: int):
+    async with task_queue_db as task_queue_db:
+        await _fill_task_queues(task_queue_db, n_tqs)
+        # The jobs are counted once whatever the number of values of the task queue
+        await task_queue_db.conn.execute(
+            insert(JobsQueue),
+            [
+                {"TQId": 1, "JobId": job_id, "Priority": 1, "RealPriority": 1.0}
+                for job_id in range(n_tqs + 1, n_tqs + 3)
+            ],
+        )
+
+        statements = []
+
+        def count_statements(*args):
+            statements.append(args)
+
+        engine = task_queue_db.engine.sync_engine
+        event.listen(engine, "before_cursor_execute", count_statements)
+        try:
+            tq_data = await task_queue_db.retrieve_task_queues(
+                list(range(1, n_tqs + 1))
+            )
+            all_tq_data = await task_queue_db.retrieve_task_queues()
+        finally:
+            event.remove(engine, "before_cursor_execute", count_statements)
+
+    # The number of queries does not depend on the number of task queues
+    assert len(statements) == 4
+    assert tq_data == all_tq_data
+    assert len(tq_data) == n_tqs
+    assert tq_data[1] == {
+        "Priority": 1.0,
+        "Jobs": 3,
+        "Owner": "owner",
+        "OwnerGroup": "group",
+        "VO": "vo",
+        "CPUTime": 3600,
+        "Sites": ["tq_TQToSites0", "tq_TQToSites1"],
+        "GridCEs": ["tq_TQToGridCEs0", "tq_TQToGridCEs1"],
+        "BannedSites": [],
+        "Platforms": [],
+        "JobTypes": [],
+        "Tags": ["tq_TQToTags0", "tq_TQToTags1"],
+    }
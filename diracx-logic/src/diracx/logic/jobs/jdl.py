@@ -0,0 +1,236 @@
+"""CPU-bound processing of the JDLs of jobs.
+
+Parsing, checking and compressing JDLs can take a significant time for large
+submissions. The functions of this module only take and return plain data so
+that they can be run by ``map_jdls`` in the executor configured with
+``JobsSettings.jdl_executor_type``, possibly in other processes, without
+blocking the event loop.
+
+The JDLs are parsed with the native parser of ``diracx.core.jdl``, the
+``ClassAd`` objects needed by the DIRAC utilities being built from its result.
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    "PreparedJob",
+    "make_class_ad",
+    "map_jdls",
+    "check_submitted_jdl",
+    "prepare_new_job",
+    "prepare_rescheduled_job",
+]
+
+import asyncio
+from concurrent.futures import Executor
+from datetime import datetime
+from typing import Any, Callable, NamedTuple, Sequence, TypeVar
+
+from DIRAC.Core.Utilities.ClassAd.ClassAdLight import ClassAd
+from DIRAC.Core.Utilities.ReturnValues import returnValueOrRaise
+from DIRAC.WorkloadManagementSystem.Client.JobState.JobManifest import JobManifest
+from DIRAC.WorkloadManagementSystem.DB.JobDBUtils import (
+    checkAndAddOwner,
+    checkAndPrepareJob,
+    compressJDL,
+    createJDLWithInitialStatus,
+    extractJDL,
+)
+
+from diracx.core.jdl import JDL, parse_jdl, parse_jdl_cached
+
+T = TypeVar("T")
+
+# Number of jobs processed by each call to the executor, such that the cost of
+# sending the JDLs to another process is amortised
+JDL_CHUNK_SIZE = 50
+
+
+class PreparedJob(NamedTuple):
+    """The result of preparing the JDL of a job."""
+
+    job_attrs: dict[str, Any]
+    # The compressed JDL to store in the JobDB
+    compressed_jdl: str = ""
+    # The JDL before replacing the %j placeholder
+    jdl: str = ""
+    input_data: list[str] = []
+    # The DIRAC error returned by checkAndPrepareJob, in which case job_attrs
+    # holds the attributes to set and the other fields are empty
+    error: dict[str, Any] | None = None
+
+
+async def map_jdls(
+    executor: Executor | None,
+    func: Callable[..., T],
+    args: Sequence[tuple],
+    chunk_size: int = JDL_CHUNK_SIZE,
+) -> list[T]:
+    """Call ``func`` with each tuple of ``args`` and return the results in order.
+
+    The calls are grouped in chunks which are processed concurrently by the
+    workers of the executor, or in the event loop if there is no executor.
+    """
+    if executor is None:
+        return [func(*a) for a in args]
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(
+        *(
+            loop.run_in_executor(executor, _apply_chunk, func, args[i : i + chunk_size])
+            for i in range(0, len(args), chunk_size)
+        )
+    )
+    return [result for chunk in results for result in chunk]
+
+
+def _apply_chunk(func: Callable[..., T], chunk: Sequence[tuple]) -> list[T]:
+    return [func(*a) for a in chunk]
+
+
+def make_class_ad(jdl: JDL) -> ClassAd:
+    """Build a ClassAd from a parsed JDL without parsing it again.
+
+    The ClassAd gets its own copy of the attributes, it can then be modified.
+    """
+    class_ad = ClassAd("[]")
+    class_ad.contents = dict(jdl)
+    return class_ad
+
+
+def check_submitted_jdl(jdl: str, owner: str, owner_group: str) -> tuple[str, str]:
+    """Check the JDL of a job submitted by a user.
+
+    :return: the compressed JDL to store as the original one and the job
+        manifest, in CFG format, to give to ``prepare_new_job``
+    """
+    job_manifest = returnValueOrRaise(checkAndAddOwner(jdl, owner, owner_group))
+
+    # Fix possible lack of brackets
+    if jdl.strip()[0] != "[":
+        jdl = f"[{jdl}]"
+
+    return compressJDL(jdl), job_manifest.dumpAsCFG()
+
+
+def prepare_new_job(
+    job_id: int,
+    original_jdl: str,
+    manifest: str,
+    owner: str,
+    owner_group: str,
+    vo: str,
+    initial_status: str,
+    initial_minor_status: str,
+    jdl_2_db_parameters: list[str],
+    submission_time: datetime,
+) -> PreparedJob:
+    """Build the JDL and the attributes of a job once its JobID is known."""
+    job_attrs = {
+        "JobID": job_id,
+        "LastUpdateTime": submission_time,
+        "SubmissionTime": submission_time,
+        "Owner": owner,
+        "OwnerGroup": owner_group,
+        "VO": vo,
+    }
+
+    job_manifest = JobManifest()
+    returnValueOrRaise(job_manifest.loadCFG(manifest))
+    job_manifest.setOption("JobID", job_id)
+
+    # 2.- Check JDL and Prepare DIRAC JDL
+    job_jdl = job_manifest.dumpAsJDL()
+
+    # Replace the JobID placeholder if any
+    if job_jdl.find("%j") != -1:
+        job_jdl = job_jdl.replace("%j", str(job_id))
+
+    # The JDL is unique to the job, there is no point in caching it
+    class_ad_job = make_class_ad(parse_jdl(job_jdl))
+
+    class_ad_req = ClassAd("[]")
+    if not class_ad_job.isOK():
+        # Rollback the entire transaction
+        raise ValueError(f"Error in JDL syntax for job JDL: {original_jdl}")
+    # TODO: check if that is actually true
+    if class_ad_job.lookupAttribute("Parameters"):
+        raise NotImplementedError("Parameters in the JDL are not supported")
+
+    # TODO is this even needed?
+    class_ad_job.insertAttributeInt("JobID", job_id)
+
+    ret_val = checkAndPrepareJob(
+        job_id, class_ad_job, class_ad_req, owner, owner_group, job_attrs, vo
+    )
+    if not ret_val["OK"]:
+        return PreparedJob(job_attrs, error=ret_val)
+
+    job_jdl = createJDLWithInitialStatus(
+        class_ad_job,
+        class_ad_req,
+        jdl_2_db_parameters,
+        job_attrs,
+        initial_status,
+        initial_minor_status,
+        modern=True,
+    )
+
+    input_data = []
+    if class_ad_job.lookupAttribute("InputData"):
+        input_data = class_ad_job.getListFromExpression("InputData")
+        input_data = [lfn for lfn in input_data if lfn]
+
+    return PreparedJob(job_attrs, compressJDL(job_jdl), job_jdl, input_data)
+
+
+def prepare_rescheduled_job(
+    job_id: int,
+    compressed_original_jdl: str,
+    owner: str,
+    owner_group: str,
+    reschedule_counter: int,
+) -> PreparedJob:
+    """Rebuild the JDL and the attributes of a job from its original JDL."""
+    job_jdl = extractJDL(compressed_original_jdl)
+    if not job_jdl.strip().startswith("["):
+        job_jdl = f"[{job_jdl}]"
+    # The jobs of bulk submissions share the same original JDL
+    class_ad_job = make_class_ad(parse_jdl_cached(job_jdl))
+    class_ad_job.insertAttributeInt("JobID", job_id)
+
+    class_ad_req = ClassAd("[]")
+    job_attrs: dict[str, Any] = {"RescheduleCounter": reschedule_counter}
+    ret_val = checkAndPrepareJob(
+        job_id,
+        class_ad_job,
+        class_ad_req,
+        owner,
+        owner_group,
+        job_attrs,
+        class_ad_job.getAttributeString("VirtualOrganization"),
+    )
+    if not ret_val["OK"]:
+        return PreparedJob(job_attrs, error=ret_val)
+
+    priority = class_ad_job.getAttributeInt("Priority")
+    if priority is None:
+        priority = 0
+
+    site_list = class_ad_job.getListFromExpression("Site")
+    if not site_list:
+        site = "ANY"
+    elif len(site_list) > 1:
+        site = "Multiple"
+    else:
+        site = site_list[0]
+
+    req_jdl = class_ad_req.asJDL()
+    class_ad_job.insertAttributeInt("JobRequirements", req_jdl)
+    job_jdl = class_ad_job.asJDL()
+
+    return PreparedJob(
+        {"Site": site, "UserPriority": priority, **job_attrs},
+        # Replace the JobID placeholder if any
+        compressJDL(job_jdl.replace("%j", str(job_id))),
+        job_jdl,
+    )
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
+import json
 import logging
-from typing import Any
+from typing import Any, AsyncIterator
+
+from cachetools import TTLCache
 
 from diracx.core.config.schema import Config
+from diracx.core.exceptions import InvalidQueryError
 from diracx.core.models import (
     JobSearchParams,
     JobSummaryParams,
     ScalarSearchOperator,
+    SearchCountMode,
 )
 from diracx.db.os.job_parameters import JobParametersDB
 from diracx.db.sql.job.db import JobDB
@@ -18,22 +23,22 @@ logger = logging.getLogger(__name__)
 
 MAX_PER_PAGE = 10000
 
+# Number of rows held in memory at once when exporting search results
+EXPORT_BATCH_SIZE = 1000
 
-async def search(
+# Recently computed total counts, used when an estimate is good enough
+_search_count_cache: TTLCache = TTLCache(maxsize=1024, ttl=30)
+
+
+def _prepare_search_body(
     config: Config,
-    job_db: JobDB,
-    job_parameters_db: JobParametersDB,
-    job_logging_db: JobLoggingDB,
     preferred_username: str | None,
-    page: int = 1,
-    per_page: int = 100,
-    body: JobSearchParams | None = None,
-) -> tuple[int, list[dict[str, Any]]]:
-    """Retrieve information about jobs."""
-    # Apply a limit to per_page to prevent abuse of the API
-    if per_page > MAX_PER_PAGE:
-        per_page = MAX_PER_PAGE
+    body: JobSearchParams | None,
+) -> tuple[JobSearchParams, bool]:
+    """Apply the access restrictions to the search and extract the LoggingInfo parameter.
 
+    :return: the search parameters and whether the LoggingInfo was requested
+    """
     if body is None:
         body = JobSearchParams()
 
@@ -61,31 +66,165 @@ async def search(
                 "value": preferred_username,
             }
         )
+    return body, query_logging_info
+
+
+async def _add_logging_info(
+    job_logging_db: JobLoggingDB, jobs: list[dict[str, Any]], body: JobSearchParams
+) -> None:
+    job_logging_info = {
+        job_id: records
+        async for job_id, records in job_logging_db.iter_records(
+            [job["JobID"] for job in jobs],
+            last=body.logging_info_last,
+            major_only=body.logging_info_major_only,
+        )
+    }
+    for job in jobs:
+        job["LoggingInfo"] = job_logging_info.get(job["JobID"], [])
+
+
+def _count_cache_key(body: JobSearchParams) -> str:
+    """Normalise the parts of the search which affect the number of results."""
+    search = []
+    for spec in body.search:
+        normalised: dict[str, Any] = dict(spec)
+        if "values" in normalised:
+            normalised["values"] = sorted(normalised["values"], key=str)
+        search.append(json.dumps(normalised, sort_keys=True, default=str))
+    return json.dumps(
+        {
+            "search": sorted(search),
+            "distinct": body.distinct,
+            "parameters": sorted(body.parameters or []) if body.distinct else None,
+        }
+    )
 
-    total, jobs = await job_db.search(
+
+async def search(
+    config: Config,
+    job_db: JobDB,
+    job_parameters_db: JobParametersDB,
+    job_logging_db: JobLoggingDB,
+    preferred_username: str | None,
+    page: int = 1,
+    per_page: int = 100,
+    body: JobSearchParams | None = None,
+    count: SearchCountMode = SearchCountMode.EXACT,
+) -> tuple[int | None, list[dict[str, Any]]]:
+    """Retrieve information about jobs.
+
+    The total number of matching jobs is None if ``count`` is ``NONE``, and
+    only approximate if it is ``ESTIMATE``.
+    """
+    # Apply a limit to per_page to prevent abuse of the API
+    if per_page > MAX_PER_PAGE:
+        per_page = MAX_PER_PAGE
+
+    body, query_logging_info = _prepare_search_body(config, preferred_username, body)
+
+    # NOTE: The key must be computed before searching as the DB normalises the
+    # search specs in place
+    cache_key = _count_cache_key(body)
+    total = None
+    if count == SearchCountMode.ESTIMATE:
+        total = _search_count_cache.get(cache_key)
+        if total is None and not body.search and not body.distinct:
+            total = await job_db.estimate_job_count()
+
+    need_count = count == SearchCountMode.EXACT or (
+        count == SearchCountMode.ESTIMATE and total is None
+    )
+    exact_total, jobs = await job_db.search(
         body.parameters,
         body.search,
         body.sort,
         distinct=body.distinct,
         page=page,
         per_page=per_page,
+        count=need_count,
     )
+    if exact_total is not None:
+        _search_count_cache[cache_key] = total = exact_total
 
     if query_logging_info:
-        job_logging_info = await job_logging_db.get_records(
-            [job["JobID"] for job in jobs]
-        )
-        for job in jobs:
-            job.update({"LoggingInfo": job_logging_info[job["JobID"]]})
+        await _add_logging_info(job_logging_db, jobs, body)
 
     return total, jobs
 
 
+async def search_by_cursor(
+    config: Config,
+    job_db: JobDB,
+    job_parameters_db: JobParametersDB,
+    job_logging_db: JobLoggingDB,
+    preferred_username: str | None,
+    cursor: str | None = None,
+    per_page: int = 100,
+    body: JobSearchParams | None = None,
+) -> tuple[list[dict[str, Any]], str | None]:
+    """Retrieve information about jobs, one page after the other.
+
+    :return: the jobs and the cursor to pass to get the next page, if any
+    """
+    # Apply a limit to per_page to prevent abuse of the API
+    if per_page > MAX_PER_PAGE:
+        per_page = MAX_PER_PAGE
+
+    body, query_logging_info = _prepare_search_body(config, preferred_username, body)
+    if body.distinct:
+        raise InvalidQueryError("Cursor pagination cannot be used with distinct")
+
+    jobs, next_cursor = await job_db.search_by_cursor(
+        body.parameters,
+        body.search,
+        body.sort,
+        per_page=per_page,
+        cursor=cursor,
+    )
+
+    if query_logging_info:
+        await _add_logging_info(job_logging_db, jobs, body)
+
+    return jobs, next_cursor
+
+
+def export_search(
+    config: Config,
+    job_db: JobDB,
+    preferred_username: str | None,
+    body: JobSearchParams | None = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> tuple[dict[str, type], AsyncIterator[list[dict[str, Any]]]]:
+    """Retrieve information about all the matching jobs, in batches.
+
+    Unlike ``search`` there is no limit on the number of jobs. The search is
+    validated immediately, while the query only runs when the returned
+    iterator is consumed, which must be done within a ``job_db`` transaction.
+
+    :return: the Python types of the exported columns, in order, and the
+        iterator over the batches of jobs
+    """
+    body, query_logging_info = _prepare_search_body(config, preferred_username, body)
+    if query_logging_info:
+        raise InvalidQueryError("LoggingInfo cannot be exported")
+
+    batches = job_db.stream_search(
+        body.parameters,
+        body.search,
+        body.sort,
+        distinct=body.distinct,
+        batch_size=batch_size,
+    )
+    return job_db.search_column_types(body.parameters), batches
+
+
 async def summary(
     config: Config,
     job_db: JobDB,
     preferred_username: str,
     body: JobSummaryParams,
+    use_counters: bool = False,
 ):
     """Show information suitable for plotting."""
     if not config.Operations["Defaults"].Services.JobMonitoring.GlobalJobsInfo:
@@ -100,4 +239,4 @@ async def summary(
                 "value": preferred_username,
             }
         )
-    return await job_db.summary(body.grouping, body.search)
+    return await job_db.summary(body.grouping, body.search, use_counters=use_counters)
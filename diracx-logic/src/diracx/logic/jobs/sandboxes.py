@@ -6,7 +6,7 @@ from typing import TYPE_CHECKING, Literal
 
 from pyparsing import Any
 
-from diracx.core.exceptions import SandboxAlreadyInsertedError, SandboxNotFoundError
+from diracx.core.exceptions import SandboxAlreadyInsertedError
 from diracx.core.models import (
     SandboxDownloadResponse,
     SandboxInfo,
@@ -28,6 +28,9 @@ if TYPE_CHECKING:
 
 MAX_SANDBOX_SIZE_BYTES = 100 * 1024 * 1024
 
+# Number of sandboxes checked concurrently in the storage backend
+MAX_CONCURRENT_S3_CHECKS = 20
+
 SANDBOX_PFN_REGEX = (
     # Starts with /S3/<bucket_name> or /SB:<se_name>|/S3/<bucket_name>
     r"^(:?SB:[A-Za-z]+\|)?/S3/[a-z0-9\.\-]{3,63}"
@@ -52,53 +55,105 @@ async def initiate_sandbox_upload(
     If the sandbox does not exist in the database then the "url" and "fields"
     should be used to upload the sandbox to the storage backend.
     """
-    pfn = sandbox_metadata_db.get_pfn(settings.bucket_name, user_info, sandbox_info)
+    (response,) = await initiate_sandbox_uploads(
+        user_info, [sandbox_info], sandbox_metadata_db, settings
+    )
+    return response
+
 
+async def initiate_sandbox_uploads(
+    user_info: UserInfo,
+    sandbox_infos: list[SandboxInfo],
+    sandbox_metadata_db: SandboxMetadataDB,
+    settings: SandboxStoreSettings,
+    *,
+    max_concurrent_checks: int = MAX_CONCURRENT_S3_CHECKS,
+) -> list[SandboxUploadResponse]:
+    """Bulk version of ``initiate_sandbox_upload``.
+
+    The sandboxes are looked up in the database at once and at most
+    ``max_concurrent_checks`` of them are checked concurrently in the storage
+    backend. The responses are in the order of ``sandbox_infos``.
+    """
     # TODO: This test should come first, but if we do
     # the access policy will crash for not having been called
     # so we need to find a way to acknowledge that
+    for sandbox_info in sandbox_infos:
+        if sandbox_info.size > MAX_SANDBOX_SIZE_BYTES:
+            raise ValueError(
+                f"Sandbox too large, maximum allowed is {MAX_SANDBOX_SIZE_BYTES} bytes"
+            )
 
-    if sandbox_info.size > MAX_SANDBOX_SIZE_BYTES:
-        raise ValueError(
-            f"Sandbox too large, maximum allowed is {MAX_SANDBOX_SIZE_BYTES} bytes"
-        )
-    full_pfn = f"SB:{settings.se_name}|{pfn}"
+    pfns = [
+        sandbox_metadata_db.get_pfn(settings.bucket_name, user_info, sandbox_info)
+        for sandbox_info in sandbox_infos
+    ]
+    # The same sandbox can be given several times
+    sandboxes = dict(zip(pfns, sandbox_infos))
+    registered = await sandbox_metadata_db.get_sandboxes_assigned(
+        settings.se_name, list(sandboxes)
+    )
 
-    try:
-        exists_and_assigned = await sandbox_metadata_db.sandbox_is_assigned(
-            pfn, settings.se_name
-        )
-    except SandboxNotFoundError:
-        # The sandbox doesn't exist in the database
-        pass
-    else:
-        # As sandboxes are registered in the DB before uploading to the storage
-        # backend we can't rely on their existence in the database to determine if
-        # they have been uploaded. Instead we check if the sandbox has been
-        # assigned to a job. If it has then we know it has been uploaded and we
-        # can avoid communicating with the storage backend.
-        if exists_and_assigned or await s3_object_exists(
-            settings.s3_client, settings.bucket_name, pfn_to_key(pfn)
-        ):
-            await sandbox_metadata_db.update_sandbox_last_access_time(
-                settings.se_name, pfn
+    # As sandboxes are registered in the DB before uploading to the storage
+    # backend we can't rely on their existence in the database to determine if
+    # they have been uploaded. Instead we check if the sandbox has been
+    # assigned to a job. If it has then we know it has been uploaded and we
+    # can avoid communicating with the storage backend.
+    semaphore = asyncio.Semaphore(max_concurrent_checks)
+
+    async def is_uploaded(pfn: str) -> bool:
+        if registered[pfn]:
+            return True
+        async with semaphore:
+            return await s3_object_exists(
+                settings.s3_client, settings.bucket_name, pfn_to_key(pfn)
             )
-            return SandboxUploadResponse(pfn=full_pfn)
-
-    upload_info = await generate_presigned_upload(
-        settings.s3_client,
-        settings.bucket_name,
-        pfn_to_key(pfn),
-        sandbox_info.checksum_algorithm,
-        sandbox_info.checksum,
-        sandbox_info.size,
-        settings.url_validity_seconds,
+
+    registered_pfns = list(registered)
+    uploaded = {
+        pfn
+        for pfn, exists in zip(
+            registered_pfns,
+            await asyncio.gather(*(is_uploaded(pfn) for pfn in registered_pfns)),
+        )
+        if exists
+    }
+
+    upload_infos = {
+        pfn: await generate_presigned_upload(
+            settings.s3_client,
+            settings.bucket_name,
+            pfn_to_key(pfn),
+            sandbox_info.checksum_algorithm,
+            sandbox_info.checksum,
+            sandbox_info.size,
+            settings.url_validity_seconds,
+        )
+        for pfn, sandbox_info in sandboxes.items()
+        if pfn not in uploaded
+    }
+    await sandbox_metadata_db.update_sandboxes_last_access_time(
+        settings.se_name, registered_pfns
     )
-    await insert_sandbox(
-        sandbox_metadata_db, settings.se_name, user_info, pfn, sandbox_info.size
+    await insert_sandboxes(
+        sandbox_metadata_db,
+        settings.se_name,
+        user_info,
+        {
+            pfn: sandbox_info.size
+            for pfn, sandbox_info in sandboxes.items()
+            if pfn not in registered
+        },
     )
 
-    return SandboxUploadResponse(**upload_info, pfn=full_pfn)
+    responses = []
+    for pfn in pfns:
+        full_pfn = f"SB:{settings.se_name}|{pfn}"
+        if pfn in upload_infos:
+            responses.append(SandboxUploadResponse(**upload_infos[pfn], pfn=full_pfn))
+        else:
+            responses.append(SandboxUploadResponse(pfn=full_pfn))
+    return responses
 
 
 async def get_sandbox_file(
@@ -181,23 +236,29 @@ def pfn_to_key(pfn: str) -> str:
     return "/".join(pfn.split("/")[3:])
 
 
-async def insert_sandbox(
+async def insert_sandboxes(
     sandbox_metadata_db: SandboxMetadataDB,
     se_name: str,
     user: UserInfo,
-    pfn: str,
-    size: int,
+    sizes: dict[str, int],
 ) -> None:
-    """Add a new sandbox in SandboxMetadataDB."""
+    """Add new sandboxes, given as {pfn: size}, in SandboxMetadataDB."""
+    if not sizes:
+        return
     # TODO: Follow https://github.com/DIRACGrid/diracx/issues/49
     owner_id = await sandbox_metadata_db.get_owner_id(user)
     if owner_id is None:
         owner_id = await sandbox_metadata_db.insert_owner(user)
 
     try:
-        await sandbox_metadata_db.insert_sandbox(owner_id, se_name, pfn, size)
+        await sandbox_metadata_db.insert_sandboxes(owner_id, se_name, sizes)
     except SandboxAlreadyInsertedError:
-        await sandbox_metadata_db.update_sandbox_last_access_time(se_name, pfn)
+        # Some of the sandboxes were inserted concurrently
+        for pfn, size in sizes.items():
+            try:
+                await sandbox_metadata_db.insert_sandbox(owner_id, se_name, pfn, size)
+            except SandboxAlreadyInsertedError:
+                await sandbox_metadata_db.update_sandbox_last_access_time(se_name, pfn)
 
 
 async def clean_sandboxes(
@@ -0,0 +1,177 @@
+"""Native implementation of the DIRAC job state machine.
+
+This replaces ``JobsStateMachine``, ``getNewStatus`` and ``getStartAndEndTime``
+from DIRAC such that the status updates of many jobs can be computed without
+going through the DIRAC return value machinery.
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    "JOB_STATUS_TRANSITIONS",
+    "next_status",
+    "compute_new_status",
+    "compute_start_and_end_time",
+]
+
+from datetime import datetime
+from typing import Any
+
+from diracx.core.models import JobStatus
+
+# The statuses a job can move to from a given status. When another status is
+# requested the job keeps its current status. Statuses which are not listed
+# (e.g. Deleted) have no restrictions.
+JOB_STATUS_TRANSITIONS: dict[str, frozenset[str]] = {
+    JobStatus.KILLED: frozenset([JobStatus.DELETED]),
+    JobStatus.FAILED: frozenset([JobStatus.RESCHEDULED, JobStatus.DELETED]),
+    JobStatus.DONE: frozenset([JobStatus.DELETED]),
+    JobStatus.COMPLETED: frozenset([JobStatus.DONE, JobStatus.FAILED]),
+    JobStatus.COMPLETING: frozenset(
+        [
+            JobStatus.DONE,
+            JobStatus.FAILED,
+            JobStatus.COMPLETED,
+            JobStatus.STALLED,
+            JobStatus.KILLED,
+        ]
+    ),
+    JobStatus.STALLED: frozenset(
+        [JobStatus.RUNNING, JobStatus.FAILED, JobStatus.KILLED]
+    ),
+    JobStatus.RUNNING: frozenset(
+        [
+            JobStatus.STALLED,
+            JobStatus.DONE,
+            JobStatus.FAILED,
+            JobStatus.RESCHEDULED,
+            JobStatus.COMPLETING,
+            JobStatus.KILLED,
+            JobStatus.RECEIVED,
+        ]
+    ),
+    JobStatus.RESCHEDULED: frozenset(
+        [
+            JobStatus.WAITING,
+            JobStatus.RECEIVED,
+            JobStatus.DELETED,
+            JobStatus.FAILED,
+            JobStatus.KILLED,
+        ]
+    ),
+    JobStatus.MATCHED: frozenset(
+        [
+            JobStatus.RUNNING,
+            JobStatus.FAILED,
+            JobStatus.RESCHEDULED,
+            JobStatus.KILLED,
+        ]
+    ),
+    JobStatus.WAITING: frozenset(
+        [
+            JobStatus.MATCHED,
+            JobStatus.RESCHEDULED,
+            JobStatus.DELETED,
+            JobStatus.KILLED,
+        ]
+    ),
+    JobStatus.STAGING: frozenset(
+        [JobStatus.CHECKING, JobStatus.WAITING, JobStatus.FAILED, JobStatus.KILLED]
+    ),
+    # Scouting is not part of JobStatus but jobs may still be in it
+    "Scouting": frozenset(
+        [JobStatus.CHECKING, JobStatus.FAILED, JobStatus.STALLED, JobStatus.KILLED]
+    ),
+    JobStatus.CHECKING: frozenset(
+        [
+            "Scouting",
+            JobStatus.STAGING,
+            JobStatus.WAITING,
+            JobStatus.RESCHEDULED,
+            JobStatus.FAILED,
+            JobStatus.DELETED,
+            JobStatus.KILLED,
+        ]
+    ),
+    JobStatus.RECEIVED: frozenset(
+        [
+            "Scouting",
+            JobStatus.CHECKING,
+            JobStatus.STAGING,
+            JobStatus.WAITING,
+            JobStatus.FAILED,
+            JobStatus.DELETED,
+            JobStatus.KILLED,
+        ]
+    ),
+    JobStatus.SUBMITTING: frozenset(
+        [
+            JobStatus.RECEIVED,
+            JobStatus.CHECKING,
+            JobStatus.DELETED,
+            JobStatus.KILLED,
+        ]
+    ),
+}
+
+# Statuses in which the payload has finished
+JOB_FINAL_STATUSES = frozenset(
+    [JobStatus.DONE, JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.KILLED]
+)
+
+
+def next_status(current: str, candidate: str) -> str:
+    """Get the status a job moves to when ``candidate`` is requested."""
+    allowed = JOB_STATUS_TRANSITIONS.get(current)
+    if allowed is None or candidate in allowed:
+        return candidate
+    return current
+
+
+def compute_new_status(
+    current_status: str,
+    last_time: datetime | None,
+    status_dict: dict[datetime, dict[str, Any]],
+    force: bool,
+) -> tuple[str, str, str]:
+    """Get the status, minor status and application status after the updates.
+
+    Only the updates which are not older than ``last_time``, the time of the
+    last recorded status change, are taken into account. Unless ``force`` is
+    set, the status changes go through the state machine: the ones it rejects
+    are modified in place in ``status_dict`` to reflect what was really done.
+
+    Empty strings are returned for the values which are not updated.
+    """
+    status = minor = application = ""
+    for update_time in sorted(status_dict):
+        if last_time is not None and update_time < last_time:
+            continue
+        update = status_dict[update_time]
+        status = update.get("Status", current_status)
+        if not force and status != current_status:
+            allowed_status = next_status(current_status, status)
+            if allowed_status != status:
+                status = update["Status"] = allowed_status
+                # Indicate that this is not what was requested
+                update["Source"] = update.get("Source", "") + "(SM)"
+            current_status = allowed_status
+        minor = update.get("MinorStatus", minor)
+        application = update.get("ApplicationStatus", application)
+    return status, minor, application
+
+
+def compute_start_and_end_time(
+    start_time: datetime | None,
+    end_time: datetime | None,
+    status_dict: dict[datetime, dict[str, Any]],
+) -> tuple[datetime | None, datetime | None]:
+    """Get the times at which the job started running and finished, if not known yet."""
+    status = ""
+    for update_time in sorted(status_dict):
+        status = status_dict[update_time].get("Status", status)
+        if not start_time and status == JobStatus.RUNNING:
+            start_time = update_time
+        elif not end_time and status in JOB_FINAL_STATUSES:
+            end_time = update_time
+    return start_time, end_time
@@ -7,26 +7,22 @@ __all__ = [
     "remove_jobs_from_task_queue",
     "set_job_parameters_or_attributes",
     "add_heartbeat",
+    "flush_heartbeats",
     "get_job_commands",
 ]
 
+import asyncio
+import contextvars
 import logging
 from asyncio import TaskGroup
 from collections import defaultdict
+from concurrent.futures import Executor
 from datetime import datetime, timezone
+from functools import partial
 from typing import Any, Iterable
-from unittest.mock import MagicMock
 
-from DIRAC.Core.Utilities.ClassAd.ClassAdLight import ClassAd
-from DIRAC.Core.Utilities.ReturnValues import SErrorException, returnValueOrRaise
-from DIRAC.WorkloadManagementSystem.DB.JobDBUtils import (
-    compressJDL,
-    extractJDL,
-)
-from DIRAC.WorkloadManagementSystem.Utilities.JobStatusUtility import (
-    getNewStatus,
-    getStartAndEndTime,
-)
+from DIRAC.Core.Utilities.ReturnValues import SErrorException
+from sqlalchemy.exc import IntegrityError
 
 from diracx.core.config.schema import Config
 from diracx.core.models import (
@@ -40,14 +36,19 @@ from diracx.core.models import (
     VectorSearchOperator,
     VectorSearchSpec,
 )
+from diracx.core.utils import CoalescingBuffer
 from diracx.db.os.job_parameters import JobParametersDB
 from diracx.db.sql.job.db import JobDB, _get_columns
 from diracx.db.sql.job.schema import Jobs
 from diracx.db.sql.job_logging.db import JobLoggingDB
 from diracx.db.sql.sandbox_metadata.db import SandboxMetadataDB
 from diracx.db.sql.task_queue.db import TaskQueueDB
-from diracx.db.sql.utils.functions import utcnow
-from diracx.logic.jobs.utils import check_and_prepare_job
+from diracx.logic.jobs.jdl import map_jdls, prepare_rescheduled_job
+from diracx.logic.jobs.state_machine import (
+    compute_new_status,
+    compute_start_and_end_time,
+)
+from diracx.logic.jobs.utils import raise_prepare_job_error
 from diracx.logic.task_queues.priority import recalculate_tq_shares_for_entity
 
 logger = logging.getLogger(__name__)
@@ -109,13 +110,13 @@ async def set_job_statuses(
 
     failed: dict[int, Any] = {}
     deletable_killable_jobs = set()
-    job_attribute_updates: dict[int, dict[str, str]] = {}
+    job_attribute_updates: dict[int, dict[str, Any]] = {}
     skipped_job_attribute_updates: set[int] = set()
     job_logging_updates: list[JobLoggingRecord] = []
-    status_dicts: dict[int, dict[datetime, dict[str, str]]] = defaultdict(dict)
+    job_parameter_updates: dict[int, tuple[str, dict[str, Any]]] = {}
 
     # transform JobStateUpdate objects into dicts
-    status_dicts = {
+    status_dicts: dict[int, dict[datetime, dict[str, str]]] = {
         job_id: {
             key: {k: v for k, v in value.model_dump().items() if v is not None}
             for key, value in status.items()
@@ -134,6 +135,7 @@ async def set_job_statuses(
             }
         ],
         sorts=[],
+        count=False,
     )
     if not results:
         return SetJobStatusReturn(
@@ -153,6 +155,9 @@ async def set_job_statuses(
     # Get the latest time stamps of major status updates
     wms_time_stamps = await job_logging_db.get_wms_time_stamps(found_jobs)
 
+    # Compute the changes for all the jobs in one pass, the databases are then
+    # updated once for the whole batch
+    now = str(datetime.now(timezone.utc))
     for res in results:
         job_id = int(res["JobID"])
         current_status = res["Status"]
@@ -163,55 +168,33 @@ async def set_job_statuses(
         if current_status == JobStatus.STALLED:
             current_status = JobStatus.RUNNING
 
-        #####################################################################################################
         status_dict = status_dicts[job_id]
-        # This is more precise than "LastTime". time_stamps is a sorted list of tuples...
-        # time_stamps = sorted((float(t), s) for s, t in wms_time_stamps[job_id].items())
-        first_status = min(
-            wms_time_stamps[job_id].items(), key=lambda x: x[1], default=("", 0)
-        )[0]
-        last_time = max(wms_time_stamps[job_id].values())
+        last_time = max(wms_time_stamps.get(job_id, {}).values(), default=None)
 
         # Get chronological order of new updates
         update_times = sorted(status_dict)
 
-        new_start_time, new_end_time = getStartAndEndTime(
-            start_time,
-            end_time,
-            update_times,
-            # Use a type ignore hint here as it exists solely to use the DIRAC API
-            defaultdict(lambda x=first_status: x),  # type: ignore[misc]
-            status_dict,
+        new_start_time, new_end_time = compute_start_and_end_time(
+            start_time, end_time, status_dict
         )
 
-        job_data: dict[str, str] = {}
+        job_data: dict[str, Any] = {}
         new_status: str | None = None
-        if update_times[-1] >= last_time:
-            new_status, new_minor, new_application = (
-                returnValueOrRaise(  # TODO: Catch this
-                    getNewStatus(
-                        job_id,
-                        update_times,
-                        last_time,
-                        status_dict,
-                        current_status,
-                        force,
-                        MagicMock(),  # FIXME
-                    )
-                )
+        if last_time is None or update_times[-1] >= last_time:
+            new_status, new_minor, new_application = compute_new_status(
+                current_status, last_time, status_dict, force
             )
 
             if new_status:
                 job_data.update(additional_attributes.get(job_id, {}))
                 job_data["Status"] = new_status
-                job_data["LastUpdateTime"] = str(datetime.now(timezone.utc))
+                job_data["LastUpdateTime"] = now
+                job_parameter_updates[job_id] = (res["VO"], {"Status": new_status})
             if new_minor:
                 job_data["MinorStatus"] = new_minor
             if new_application:
                 job_data["ApplicationStatus"] = new_application
 
-            await job_parameters_db.upsert(res["VO"], job_id, {"Status": new_status})
-
         for upd_time in update_times:
             source = status_dict[upd_time]["Source"]
             if source.startswith("Job") or source == "Heartbeat":
@@ -223,12 +206,10 @@ async def set_job_statuses(
         if not end_time and new_end_time:
             job_data["EndExecTime"] = new_end_time
 
-        #####################################################################################################
         # delete or kill job, if we transition to DELETED or KILLED state
         if new_status in [JobStatus.DELETED, JobStatus.KILLED]:
             deletable_killable_jobs.add(job_id)
 
-        # Update database tables
         if job_data:
             job_attribute_updates[job_id] = job_data
         else:
@@ -247,24 +228,27 @@ async def set_job_statuses(
                 )
             )
 
-    if job_attribute_updates:
-        await job_db.set_job_attributes(job_attribute_updates)
-
-    await remove_jobs_from_task_queue(
-        list(deletable_killable_jobs),
-        config,
-        task_queue_db,
-    )
+    async def update_job_db():
+        if job_attribute_updates:
+            await job_db.set_job_attributes(job_attribute_updates)
+        if deletable_killable_jobs:
+            await job_db.set_job_commands(
+                [(job_id, "Kill", "") for job_id in deletable_killable_jobs]
+            )
 
     # TODO: implement StorageManagerClient
     # returnValueOrRaise(StorageManagerClient().killTasksBySourceTaskID(job_ids))
 
-    if deletable_killable_jobs:
-        await job_db.set_job_commands(
-            [(job_id, "Kill", "") for job_id in deletable_killable_jobs]
+    # Each database is only used by one of the tasks
+    async with TaskGroup() as tg:
+        tg.create_task(update_job_db())
+        tg.create_task(
+            remove_jobs_from_task_queue(
+                list(deletable_killable_jobs), config, task_queue_db
+            )
         )
-
-    await job_logging_db.insert_records(job_logging_updates)
+        tg.create_task(job_logging_db.insert_records(job_logging_updates))
+        tg.create_task(_upsert_parameters(job_parameter_updates, job_parameters_db))
 
     return SetJobStatusReturn(
         success=job_attribute_updates | {j: {} for j in skipped_job_attribute_updates},
@@ -272,6 +256,19 @@ async def set_job_statuses(
     )
 
 
+async def _upsert_parameters(
+    updates: dict[int, tuple[str, dict[str, Any]]],
+    job_parameters_db: JobParametersDB,
+) -> None:
+    """Upsert the parameters of the jobs, given as job_id -> (VO, parameters)."""
+    updates_by_vo: defaultdict[str, dict[int, dict[str, Any]]] = defaultdict(dict)
+    for job_id, (vo, job_params) in updates.items():
+        updates_by_vo[vo][job_id] = job_params
+    async with TaskGroup() as tg:
+        for vo, vo_updates in updates_by_vo.items():
+            tg.create_task(job_parameters_db.bulk_upsert(vo, vo_updates))
+
+
 async def reschedule_jobs(
     job_ids: list[int],
     config: Config,
@@ -280,8 +277,12 @@ async def reschedule_jobs(
     task_queue_db: TaskQueueDB,
     job_parameters_db: JobParametersDB,
     reset_jobs: bool = False,
+    executor: Executor | None = None,
 ):
-    """Reschedule given job."""
+    """Reschedule given job.
+
+    The JDLs of the jobs are processed in ``executor``, see ``map_jdls``.
+    """
     failed = {}
     reschedule_max = config.Operations[
         "Defaults"
@@ -307,6 +308,7 @@ async def reschedule_jobs(
             )
         ],
         sorts=[],
+        count=False,
     )
     if not results:
         for job_id in job_ids:
@@ -366,66 +368,46 @@ async def reschedule_jobs(
     # await self.delete_job_parameters(job_id)
     # await self.delete_job_optimizer_parameters(job_id)
 
-    def parse_jdl(job_id: int, job_jdl: str):
-        if not job_jdl.strip().startswith("["):
-            job_jdl = f"[{job_jdl}]"
-        class_ad_job = ClassAd(job_jdl)
-        class_ad_job.insertAttributeInt("JobID", job_id)
-        return class_ad_job
-
-    job_jdls = {
-        jobid: parse_jdl(jobid, extractJDL(jdl))
-        for jobid, jdl in (
-            (await job_db.get_job_jdls(surviving_job_ids, original=True)).items()
+    original_jdls = await job_db.get_job_jdls(surviving_job_ids, original=True)
+    prepared_jobs = dict(
+        zip(
+            original_jdls,
+            await map_jdls(
+                executor,
+                prepare_rescheduled_job,
+                [
+                    (
+                        job_id,
+                        original_jdl,
+                        jobs_to_resched[job_id]["Owner"],
+                        jobs_to_resched[job_id]["OwnerGroup"],
+                        jobs_to_resched[job_id]["RescheduleCounter"],
+                    )
+                    for job_id, original_jdl in original_jdls.items()
+                ],
+            ),
         )
-    }
+    )
 
     for job_id in surviving_job_ids:
-        class_ad_job = job_jdls[job_id]
-        class_ad_req = ClassAd("[]")
-        try:
-            await check_and_prepare_job(
-                job_id,
-                class_ad_job,
-                class_ad_req,
-                jobs_to_resched[job_id]["Owner"],
-                jobs_to_resched[job_id]["OwnerGroup"],
-                {"RescheduleCounter": jobs_to_resched[job_id]["RescheduleCounter"]},
-                class_ad_job.getAttributeString("VirtualOrganization"),
-                job_db,
-            )
-        except SErrorException as e:
-            failed[job_id] = {"detail": str(e)}
-            # surviving_job_ids.remove(job_id)
-            continue
-
-        priority = class_ad_job.getAttributeInt("Priority")
-        if priority is None:
-            priority = 0
-
-        site_list = class_ad_job.getListFromExpression("Site")
-        if not site_list:
-            site = "ANY"
-        elif len(site_list) > 1:
-            site = "Multiple"
-        else:
-            site = site_list[0]
-
-        req_jdl = class_ad_req.asJDL()
-        class_ad_job.insertAttributeInt("JobRequirements", req_jdl)
-        job_jdl = class_ad_job.asJDL()
-        # Replace the JobID placeholder if any
-        job_jdl = job_jdl.replace("%j", str(job_id))
+        prepared = prepared_jobs[job_id]
+        if prepared.error:
+            try:
+                await raise_prepare_job_error(
+                    job_id, prepared.error, prepared.job_attrs, job_db
+                )
+            except SErrorException as e:
+                failed[job_id] = {"detail": str(e)}
+                # surviving_job_ids.remove(job_id)
+                continue
 
         additional_attrs = {
-            "Site": site,
-            "UserPriority": priority,
+            **prepared.job_attrs,
             "RescheduleTime": datetime.now(tz=timezone.utc),
-            "RescheduleCounter": jobs_to_resched[job_id]["RescheduleCounter"],
         }
 
         # set new JDL
-        jdl_changes[job_id] = compressJDL(job_jdl)
+        jdl_changes[job_id] = prepared.compressed_jdl
 
         # set new status
         status_changes[job_id] = {
@@ -456,12 +438,8 @@ async def reschedule_jobs(
             if job_id in failed:
                 continue
 
-            jdl = job_jdls.get(job_id, None)
-            if jdl:
-                jdl = jdl.asJDL()
-
             success[job_id] = {
-                "InputData": jdl,
+                "InputData": prepared_jobs[job_id].jdl,
                 **attribute_changes[job_id],
                 **set_status_result.model_dump(),
             }
@@ -482,22 +460,35 @@ async def remove_jobs_from_task_queue(
     config: Config,
     task_queue_db: TaskQueueDB,
 ):
-    """Remove the job from TaskQueueDB."""
-    await task_queue_db.remove_jobs(job_ids)
+    """Remove the jobs from TaskQueueDB.
 
+    The task queues left empty are deleted and the shares are then
+    recalculated once per group.
+    """
+    # The task queues have to be found before their jobs are removed
     tq_infos = await task_queue_db.get_tq_infos_for_jobs(job_ids)
-    for tq_id, owner, owner_group, vo in tq_infos:
-        # TODO: move to Celery
-
-        # If the task queue is not empty, do not remove it
-        if not await task_queue_db.is_task_queue_empty(tq_id):
-            continue
+    await task_queue_db.remove_jobs(job_ids)
 
-        await task_queue_db.delete_task_queue(tq_id)
+    # TODO: move to Celery
+    empty_tq_ids = set(
+        await task_queue_db.get_empty_task_queues([tq_id for tq_id, *_ in tq_infos])
+    )
+    if not empty_tq_ids:
+        return
+    await task_queue_db.delete_task_queues(list(empty_tq_ids))
 
-        # Recalculate shares for the owner group
+    owners_by_group: defaultdict[tuple[str, str], set[str]] = defaultdict(set)
+    for tq_id, owner, owner_group, vo in tq_infos:
+        if tq_id in empty_tq_ids:
+            owners_by_group[(owner_group, vo)].add(owner)
+    for (owner_group, vo), owners in owners_by_group.items():
+        # With several owners the shares of the whole group are recalculated
         await recalculate_tq_shares_for_entity(
-            owner, owner_group, vo, config, task_queue_db
+            owners.pop() if len(owners) == 1 else None,
+            owner_group,
+            vo,
+            config,
+            task_queue_db,
         )
 
 
@@ -550,8 +541,14 @@ async def add_heartbeat(
     job_logging_db: JobLoggingDB,
     task_queue_db: TaskQueueDB,
     job_parameters_db: JobParametersDB,
+    buffer: CoalescingBuffer[int] | None = None,
 ) -> None:
-    """Send a heart beat sign of life for a job jobID."""
+    """Send a heart beat sign of life for a job jobID.
+
+    If a ``buffer`` is given, the heartbeat time and data are coalesced in it
+    and written in bulk by ``flush_heartbeats`` once the buffer is due. Status
+    changes caused by the heartbeat are always applied immediately.
+    """
     # Find the current status of the jobs
     search_query: VectorSearchSpec = {
         "parameter": "JobID",
@@ -559,13 +556,14 @@ async def add_heartbeat(
         "values": list(data),
     }
     _, results = await job_db.search(
-        parameters=["Status", "JobID"], search=[search_query], sorts=[]
+        parameters=["Status", "JobID"], search=[search_query], sorts=[], count=False
     )
     if len(results) != len(data):
         raise ValueError(f"Failed to lookup job IDs: {data.keys()=} {results=}")
+    now = datetime.now(timezone.utc)
     status_changes = {
         int(result["JobID"]): {
-            datetime.now(timezone.utc): JobStatusUpdate(
+            now: JobStatusUpdate(
                 Status=JobStatus.RUNNING,
                 Source="Heartbeat",
             )
@@ -574,6 +572,13 @@ async def add_heartbeat(
         if result["Status"] in [JobStatus.MATCHED, JobStatus.STALLED]
     }
 
+    heartbeats: dict[int, dict[str, Any]] = {}
+    for job_id, job_data in data.items():
+        heartbeats[job_id] = job_data.model_dump(exclude_defaults=True)
+        # If there are no status changes, we still need to update the heartbeat time
+        if job_id not in status_changes:
+            heartbeats[job_id]["HeartBeatTime"] = now
+
     async with TaskGroup() as tg:
         if status_changes:
             tg.create_task(
@@ -586,27 +591,103 @@ async def add_heartbeat(
                     job_parameters_db=job_parameters_db,
                 )
             )
+        if buffer is None:
+            tg.create_task(_write_heartbeats(heartbeats, job_db, job_parameters_db))
 
-        if other_ids := set(data) - set(status_changes):
-            # If there are no status changes, we still need to update the heartbeat time
-            heartbeat_updates = {
-                job_id: {"HeartBeatTime": utcnow()} for job_id in other_ids
-            }
-            tg.create_task(job_db.set_job_attributes(heartbeat_updates))
+    if buffer is not None:
+        buffer.flusher = partial(flush_heartbeats, buffer, job_db, job_parameters_db)
+        for job_id, values in heartbeats.items():
+            buffer.add(job_id, values)
+        if buffer.due:
+            await flush_heartbeats(buffer, job_db, job_parameters_db)
+
+
+async def flush_heartbeats(
+    buffer: CoalescingBuffer[int],
+    job_db: JobDB,
+    job_parameters_db: JobParametersDB,
+) -> None:
+    """Write the heartbeats accumulated in ``buffer`` to the databases.
+
+    The heartbeats are written in their own transactions, independently of the
+    request which triggered the flush. The heartbeats of the jobs deleted in
+    the meantime are dropped. If writing them fails because the databases are
+    unavailable they are put back in the buffer to be retried by the next
+    flush, the other failures are only logged. Besides the flushes triggered
+    by requests, the buffer is flushed in the background through its
+    ``flusher`` by ``JobsSettings.lifetime_function``.
+    """
+    heartbeats = buffer.take()
+    if not heartbeats:
+        return
+
+    async def write():
+        async with job_db, job_parameters_db:
+            _, jobs = await job_db.search(
+                ["JobID"],
+                [{"parameter": "JobID", "operator": "in", "values": list(heartbeats)}],
+                [],
+                count=False,
+            )
+            existing_job_ids = {job["JobID"] for job in jobs}
+            if deleted_job_ids := heartbeats.keys() - existing_job_ids:
+                logger.info(
+                    "Dropping the heartbeats of %d deleted jobs", len(deleted_job_ids)
+                )
+            await _write_heartbeats(
+                {job_id: heartbeats[job_id] for job_id in existing_job_ids},
+                job_db,
+                job_parameters_db,
+            )
 
-        os_data_by_job_id: defaultdict[int, dict[str, Any]] = defaultdict(dict)
-        for job_id, job_data in data.items():
-            sql_data = {}
-            for key, value in job_data.model_dump(exclude_defaults=True).items():
-                if key in job_db.heartbeat_fields:
-                    sql_data[key] = value
-                else:
-                    os_data_by_job_id[job_id][key] = value
+    try:
+        # Use an empty context so the DB connections of the caller are not reused
+        await asyncio.create_task(write(), context=contextvars.Context())
+    except asyncio.CancelledError:
+        # Writing the same values again is harmless so they are kept for the
+        # flush done at shutdown
+        buffer.restore(heartbeats)
+        raise
+    except Exception as e:
+        # Retrying after a data error would fail in the same way and block the
+        # other heartbeats forever
+        data_errors = (KeyError, IntegrityError)
+        if isinstance(e, data_errors) or (
+            isinstance(e, ExceptionGroup) and e.subgroup(data_errors)
+        ):
+            logger.exception("Dropping the heartbeats of %d jobs", len(heartbeats))
+        else:
+            logger.exception(
+                "Failed to flush the heartbeats of %d jobs", len(heartbeats)
+            )
+            buffer.restore(heartbeats)
+
+
+async def _write_heartbeats(
+    heartbeats: dict[int, dict[str, Any]],
+    job_db: JobDB,
+    job_parameters_db: JobParametersDB,
+) -> None:
+    """Store the heartbeat time and data of the jobs."""
+    heartbeat_times: dict[int, dict[str, Any]] = {}
+    sql_data_by_job_id: defaultdict[int, dict[str, Any]] = defaultdict(dict)
+    os_data_by_job_id: defaultdict[int, dict[str, Any]] = defaultdict(dict)
+    for job_id, job_data in heartbeats.items():
+        for key, value in job_data.items():
+            if key == "HeartBeatTime":
+                heartbeat_times[job_id] = {key: value}
+            elif key in job_db.heartbeat_fields:
+                sql_data_by_job_id[job_id][key] = value
+            else:
+                os_data_by_job_id[job_id][key] = value
 
-            if sql_data:
-                tg.create_task(job_db.add_heartbeat_data(job_id, sql_data))
+    async with TaskGroup() as tg:
+        if sql_data_by_job_id:
+            tg.create_task(job_db.add_heartbeat_data(sql_data_by_job_id))
+        if heartbeat_times:
+            tg.create_task(job_db.set_job_attributes(heartbeat_times))
 
-        await _insert_parameters(os_data_by_job_id, job_parameters_db, job_db)
+    await _insert_parameters(os_data_by_job_id, job_parameters_db, job_db)
 
 
 async def _insert_parameters(
@@ -628,13 +709,13 @@ async def _insert_parameters(
         [{"parameter": "JobID", "operator": "in", "values": list(updates)}],
     )
     job_id_to_vo = {int(x["JobID"]): str(x["VO"]) for x in job_vos}
-    # Upsert the parameters into the JobParametersDB
-    # TODO: can we do a bulk upsert instead
-    async with TaskGroup() as tg:
-        for job_id, job_params in updates.items():
-            tg.create_task(
-                job_parameters_db.upsert(job_id_to_vo[job_id], job_id, job_params)
-            )
+    await _upsert_parameters(
+        {
+            job_id: (job_id_to_vo[job_id], job_params)
+            for job_id, job_params in updates.items()
+        },
+        job_parameters_db,
+    )
 
 
 async def get_job_commands(job_ids: Iterable[int], job_db: JobDB) -> list[JobCommand]:
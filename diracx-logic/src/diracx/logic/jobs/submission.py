@@ -2,22 +2,16 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from copy import deepcopy
+from concurrent.futures import Executor
 from datetime import datetime, timezone
 
-from DIRAC.Core.Utilities.ClassAd.ClassAdLight import ClassAd
-from DIRAC.Core.Utilities.ReturnValues import returnValueOrRaise
-from DIRAC.WorkloadManagementSystem.DB.JobDBUtils import (
-    checkAndAddOwner,
-    compressJDL,
-    createJDLWithInitialStatus,
-)
 from DIRAC.WorkloadManagementSystem.Utilities.ParametricJob import (
     generateParametricJobs,
     getParameterVectorLength,
 )
 from pydantic import BaseModel
 
+from diracx.core.jdl import parse_jdl_cached
 from diracx.core.models import (
     InsertedJob,
     JobLoggingRecord,
@@ -26,7 +20,13 @@ from diracx.core.models import (
 )
 from diracx.db.sql.job.db import JobDB
 from diracx.db.sql.job_logging.db import JobLoggingDB
-from diracx.logic.jobs.utils import check_and_prepare_job
+from diracx.logic.jobs.jdl import (
+    check_submitted_jdl,
+    make_class_ad,
+    map_jdls,
+    prepare_new_job,
+)
+from diracx.logic.jobs.utils import raise_prepare_job_error
 
 logger = logging.getLogger(__name__)
 
@@ -48,8 +48,14 @@ async def submit_jdl_jobs(
     job_db: JobDB,
     job_logging_db: JobLoggingDB,
     user_info: UserInfo,
+    max_parametric_jobs: int = MAX_PARAMETRIC_JOBS,
+    executor: Executor | None = None,
 ) -> list[InsertedJob]:
-    """Submit a list of JDLs to the JobDB."""
+    """Submit a list of JDLs to the JobDB.
+
+    At most ``max_parametric_jobs`` jobs can be submitted at once, their JDLs
+    are processed in ``executor`` (in the event loop if None).
+    """
     # TODO: that needs to go in the legacy adapter (Does it ? Because bulk submission is not supported there)
     for i in range(len(job_definitions)):
         job_definition = job_definitions[i].strip()
@@ -59,7 +65,7 @@ async def submit_jdl_jobs(
 
     if len(job_definitions) == 1:
         # Check if the job is a parametric one
-        job_class_ad = ClassAd(job_definitions[0])
+        job_class_ad = make_class_ad(parse_jdl_cached(job_definitions[0]))
         result = getParameterVectorLength(job_class_ad)
         if not result["OK"]:
             # FIXME dont do this
@@ -81,8 +87,11 @@ async def submit_jdl_jobs(
     else:
         # if we are here, then jobDesc is a list of JDLs
         # we need to check that none of them is a parametric
+        # Identical JDLs are only parsed once
         for job_definition in job_definitions:
-            res = getParameterVectorLength(ClassAd(job_definition))
+            res = getParameterVectorLength(
+                make_class_ad(parse_jdl_cached(job_definition))
+            )
             if not res["OK"]:
                 raise ValueError(res["Message"])
 
@@ -93,10 +102,9 @@ async def submit_jdl_jobs(
         # parametric_job = True
         parametric_job = False
 
-    # TODO: make the max number of jobs configurable in the CS
-    if len(job_desc_list) > MAX_PARAMETRIC_JOBS:
+    if len(job_desc_list) > max_parametric_jobs:
         raise ValueError(
-            f"Normal user cannot submit more than {MAX_PARAMETRIC_JOBS} jobs at once"
+            f"Normal user cannot submit more than {max_parametric_jobs} jobs at once"
         )
 
     result = []
@@ -122,6 +130,7 @@ async def submit_jdl_jobs(
                 for jdl in job_desc_list
             ],
             job_db=job_db,
+            executor=executor,
         )
     except ExceptionGroup as e:
         raise ValueError("JDL syntax error") from e
@@ -159,94 +168,66 @@ async def submit_jdl_jobs(
     ]
 
 
-async def create_jdl_jobs(jobs: list[JobSubmissionSpec], job_db: JobDB):
-    """Create jobs from JDLs and insert them into the DB."""
-    jobs_to_insert = {}
-    jdls_to_update = {}
-    inputdata_to_insert = {}
-    original_jdls = []
+async def create_jdl_jobs(
+    jobs: list[JobSubmissionSpec], job_db: JobDB, executor: Executor | None = None
+):
+    """Create jobs from JDLs and insert them into the DB.
 
-    # generate the jobIDs first
+    The JobIDs of all the jobs are allocated at once, the final JDLs, the
+    attributes and the input data are then written with one statement each.
+    The JDLs are processed in the given executor, see ``map_jdls``.
+    """
     # TODO: should ForgivingTaskGroup be used?
     async with asyncio.TaskGroup() as tg:
-        for job in jobs:
-            original_jdl = deepcopy(job.jdl)
-            job_manifest = returnValueOrRaise(
-                checkAndAddOwner(original_jdl, job.owner, job.owner_group)
+        # Identical JDLs, as in bulk submissions, are only checked once
+        submitted = [(job.jdl, job.owner, job.owner_group) for job in jobs]
+        unique_jdls = list(dict.fromkeys(submitted))
+        checked = dict(
+            zip(
+                unique_jdls,
+                await map_jdls(executor, check_submitted_jdl, unique_jdls),
             )
+        )
+        checked_jdls = [checked[key] for key in submitted]
 
-            # Fix possible lack of brackets
-            if original_jdl.strip()[0] != "[":
-                original_jdl = f"[{original_jdl}]"
+        # generate the jobIDs first
+        job_ids = await job_db.create_jobs(
+            [compressed_original_jdl for compressed_original_jdl, _ in checked_jdls]
+        )
 
-            original_jdls.append(
+        submission_time = datetime.now(tz=timezone.utc)
+        prepared_jobs = await map_jdls(
+            executor,
+            prepare_new_job,
+            [
                 (
-                    original_jdl,
-                    job_manifest,
-                    tg.create_task(job_db.create_job(compressJDL(original_jdl))),
+                    job_id,
+                    job.jdl,
+                    manifest,
+                    job.owner,
+                    job.owner_group,
+                    job.vo,
+                    job.initial_status,
+                    job.initial_minor_status,
+                    job_db.jdl_2_db_parameters,
+                    submission_time,
                 )
-            )
-
-    async with asyncio.TaskGroup() as tg:
-        for job, (original_jdl, job_manifest_, job_id_task) in zip(jobs, original_jdls):
-            job_id = job_id_task.result()
-            job_attrs = {
-                "JobID": job_id,
-                "LastUpdateTime": datetime.now(tz=timezone.utc),
-                "SubmissionTime": datetime.now(tz=timezone.utc),
-                "Owner": job.owner,
-                "OwnerGroup": job.owner_group,
-                "VO": job.vo,
-            }
-
-            job_manifest_.setOption("JobID", job_id)
-
-            # 2.- Check JDL and Prepare DIRAC JDL
-            job_jdl = job_manifest_.dumpAsJDL()
-
-            # Replace the JobID placeholder if any
-            if job_jdl.find("%j") != -1:
-                job_jdl = job_jdl.replace("%j", str(job_id))
-
-            class_ad_job = ClassAd(job_jdl)
-
-            class_ad_req = ClassAd("[]")
-            if not class_ad_job.isOK():
-                # Rollback the entire transaction
-                raise ValueError(f"Error in JDL syntax for job JDL: {original_jdl}")
-            # TODO: check if that is actually true
-            if class_ad_job.lookupAttribute("Parameters"):
-                raise NotImplementedError("Parameters in the JDL are not supported")
-
-            # TODO is this even needed?
-            class_ad_job.insertAttributeInt("JobID", job_id)
-
-            await check_and_prepare_job(
-                job_id,
-                class_ad_job,
-                class_ad_req,
-                job.owner,
-                job.owner_group,
-                job_attrs,
-                job.vo,
-                job_db,
-            )
-            job_jdl = createJDLWithInitialStatus(
-                class_ad_job,
-                class_ad_req,
-                job_db.jdl_2_db_parameters,
-                job_attrs,
-                job.initial_status,
-                job.initial_minor_status,
-                modern=True,
-            )
-
-            jobs_to_insert[job_id] = job_attrs
-            jdls_to_update[job_id] = compressJDL(job_jdl)
+                for job, job_id, (_, manifest) in zip(jobs, job_ids, checked_jdls)
+            ],
+        )
 
-            if class_ad_job.lookupAttribute("InputData"):
-                input_data = class_ad_job.getListFromExpression("InputData")
-                inputdata_to_insert[job_id] = [lfn for lfn in input_data if lfn]
+        jobs_to_insert = {}
+        jdls_to_update = {}
+        inputdata_to_insert = {}
+        for job_id, prepared in zip(job_ids, prepared_jobs):
+            if prepared.error:
+                await raise_prepare_job_error(
+                    job_id, prepared.error, prepared.job_attrs, job_db
+                )
+            jobs_to_insert[job_id] = prepared.job_attrs
+            jdls_to_update[job_id] = prepared.compressed_jdl
+            if prepared.input_data:
+                inputdata_to_insert[job_id] = prepared.input_data
 
         tg.create_task(job_db.update_job_jdls(jdls_to_update))
         tg.create_task(job_db.insert_job_attributes(jobs_to_insert))
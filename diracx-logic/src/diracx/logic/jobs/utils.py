@@ -34,7 +34,17 @@ async def check_and_prepare_job(
     )
 
     if not ret_val["OK"]:
-        if cmpError(ret_val, EWMSSUBM):
-            await job_db.set_job_attributes({job_id: job_attrs})
+        await raise_prepare_job_error(job_id, ret_val, job_attrs, job_db)
 
-        returnValueOrRaise(ret_val)
+
+async def raise_prepare_job_error(
+    job_id: int, ret_val: dict, job_attrs: dict, job_db: JobDB
+):
+    """Raise the error returned by checkAndPrepareJob.
+
+    If the job failed the submission checks, its attributes are updated first.
+    """
+    if cmpError(ret_val, EWMSSUBM):
+        await job_db.set_job_attributes({job_id: job_attrs})
+
+    returnValueOrRaise(ret_val)
@@ -0,0 +1,189 @@
+"""Matching of the resources of the pilots with the task queues.
+
+``TaskQueueIndex`` keeps the enabled task queues in memory with an inverted
+index per attribute, such that finding the eligible task queues of a resource
+only involves set operations on the task queues using its attribute values.
+"""
+
+from __future__ import annotations
+
+__all__ = ["ResourceDescription", "TaskQueueIndex", "match_job"]
+
+from collections import Counter, defaultdict
+from typing import Any, Iterable, NamedTuple
+
+from pydantic import BaseModel
+
+from diracx.db.sql.task_queue.db import TaskQueueDB
+
+# The attributes whose task queues without values match any resource
+RESTRICTING_FIELDS = ("Sites", "GridCEs", "Platforms", "JobTypes")
+
+
+class ResourceDescription(BaseModel):
+    """The resource of a pilot, the attributes which are not set match any task queue.
+
+    The task queues requiring tags are only matched if the resource has all of
+    them.
+    """
+
+    vo: str | None = None
+    owner_groups: list[str] = []
+    site: str | None = None
+    grid_ce: str | None = None
+    cpu_time: int | None = None
+    platforms: list[str] = []
+    job_types: list[str] = []
+    tags: list[str] = []
+
+
+class _IndexedTaskQueue(NamedTuple):
+    priority: float
+    cpu_time: int
+    owner_group: str
+    vo: str
+    values: dict[str, frozenset[str]]
+
+
+class TaskQueueIndex:
+    """An in-memory index of the enabled task queues.
+
+    The index is built with ``load`` and can then be kept up to date with
+    ``update`` and ``remove``.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """Remove all the task queues from the index."""
+        self._task_queues: dict[int, _IndexedTaskQueue] = {}
+        # field -> value -> TQIds
+        self._by_value: defaultdict[str, defaultdict[str, set[int]]] = defaultdict(
+            lambda: defaultdict(set)
+        )
+        # field -> TQIds without any value
+        self._unrestricted: defaultdict[str, set[int]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._task_queues)
+
+    def __contains__(self, tq_id: int) -> bool:
+        return tq_id in self._task_queues
+
+    async def load(self, task_queue_db: TaskQueueDB):
+        """Replace the content of the index with the enabled task queues of the DB."""
+        tq_data = await task_queue_db.retrieve_task_queues(enabled_only=True)
+        self.clear()
+        for tq_id, data in tq_data.items():
+            self.update(tq_id, data)
+
+    def update(self, tq_id: int, tq_data: dict[str, Any]):
+        """Add or replace a task queue, as returned by ``retrieve_task_queues``."""
+        self.remove(tq_id)
+        task_queue = _IndexedTaskQueue(
+            priority=tq_data["Priority"],
+            cpu_time=tq_data["CPUTime"],
+            owner_group=tq_data["OwnerGroup"],
+            vo=tq_data["VO"],
+            values={
+                field: frozenset(tq_data.get(field, ()))
+                for field in RESTRICTING_FIELDS + ("BannedSites", "Tags")
+            },
+        )
+        self._task_queues[tq_id] = task_queue
+        self._by_value["VO"][task_queue.vo].add(tq_id)
+        self._by_value["OwnerGroup"][task_queue.owner_group].add(tq_id)
+        for field, values in task_queue.values.items():
+            if not values and field in RESTRICTING_FIELDS:
+                self._unrestricted[field].add(tq_id)
+            for value in values:
+                self._by_value[field][value].add(tq_id)
+
+    def remove(self, tq_id: int):
+        """Remove a task queue from the index if present."""
+        task_queue = self._task_queues.pop(tq_id, None)
+        if task_queue is None:
+            return
+        self._discard("VO", task_queue.vo, tq_id)
+        self._discard("OwnerGroup", task_queue.owner_group, tq_id)
+        for field, values in task_queue.values.items():
+            self._unrestricted[field].discard(tq_id)
+            for value in values:
+                self._discard(field, value, tq_id)
+
+    def _discard(self, field: str, value: str, tq_id: int):
+        tq_ids = self._by_value[field][value]
+        tq_ids.discard(tq_id)
+        if not tq_ids:
+            del self._by_value[field][value]
+
+    def _any_of(self, field: str, values: Iterable[str]) -> set[int]:
+        """The task queues having one of the values for a field."""
+        by_value = self._by_value[field]
+        return set().union(*(by_value.get(value, ()) for value in values))
+
+    def match(self, resource: ResourceDescription) -> list[int]:
+        """Get the task queues eligible for a resource, highest priority first."""
+        if resource.vo is not None:
+            candidates = self._any_of("VO", [resource.vo])
+        else:
+            candidates = set(self._task_queues)
+        if resource.owner_groups:
+            candidates &= self._any_of("OwnerGroup", resource.owner_groups)
+
+        for field, values in (
+            ("Sites", [resource.site] if resource.site else []),
+            ("GridCEs", [resource.grid_ce] if resource.grid_ce else []),
+            ("Platforms", resource.platforms),
+            ("JobTypes", resource.job_types),
+        ):
+            if values and candidates:
+                candidates &= self._unrestricted[field] | self._any_of(field, values)
+
+        if resource.site:
+            candidates -= self._any_of("BannedSites", [resource.site])
+
+        # Only keep the task queues whose tags are all provided by the resource
+        tag_counts = Counter(
+            tq_id
+            for tag in set(resource.tags)
+            for tq_id in self._by_value["Tags"].get(tag, ())
+        )
+        candidates = {
+            tq_id
+            for tq_id in candidates
+            if len(self._task_queues[tq_id].values["Tags"]) == tag_counts[tq_id]
+        }
+
+        if resource.cpu_time is not None:
+            candidates = {
+                tq_id
+                for tq_id in candidates
+                if self._task_queues[tq_id].cpu_time <= resource.cpu_time
+            }
+
+        return sorted(
+            candidates, key=lambda tq_id: (-self._task_queues[tq_id].priority, tq_id)
+        )
+
+
+async def match_job(
+    resource: ResourceDescription,
+    index: TaskQueueIndex,
+    task_queue_db: TaskQueueDB,
+) -> tuple[int, int] | None:
+    """Take a job for a resource from the eligible task queue with the highest priority.
+
+    The task queues found to be empty are removed from the index, those whose
+    jobs are all being taken by other pilots are kept.
+
+    :return: the TQId and the JobID, None if no job matches
+    """
+    for tq_id in index.match(resource):
+        job_id, empty = await task_queue_db.pop_job(tq_id)
+        if job_id is not None:
+            return tq_id, job_id
+        if empty:
+            index.remove(tq_id)
+    return None
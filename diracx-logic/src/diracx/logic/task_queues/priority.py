@@ -12,13 +12,17 @@ PRIORITY_IGNORED_FIELDS = ("Sites", "BannedSites")
 
 
 async def recalculate_tq_shares_for_entity(
-    owner: str,
+    owner: str | None,
     owner_group: str,
     vo: str,
     config: Config,
     task_queue_db: TaskQueueDB,
 ):
-    """Recalculate the shares for a user/userGroup combo."""
+    """Recalculate the shares for a user/userGroup combo.
+
+    If the owner is None, the shares of all the owners of the group are
+    recalculated.
+    """
     group_properties = config.Registry[vo].Groups[owner_group].Properties
     job_share = config.Registry[vo].Groups[owner_group].JobShare
     allow_background_tqs = config.Registry[vo].Groups[owner_group].AllowBackgroundTQs
@@ -86,9 +90,21 @@ async def set_priorities_for_entity(
         return
 
     rows = await task_queue_db.retrieve_task_queues(list(tq_dict))
-    prio_dict = await calculate_priority(tq_dict, rows, job_share, allow_background_tqs)
-    for prio, tqs in prio_dict.items():
-        await task_queue_db.set_priorities_for_entity(tqs, prio)
+    priorities = await calculate_priority(
+        tq_dict, rows, job_share, allow_background_tqs
+    )
+    await task_queue_db.set_priorities(priorities)
+
+
+def _group_key(tq_data: dict[str, Any]) -> tuple:
+    """The attributes identifying the group of a TQ, the ignored fields excepted."""
+    return tuple(
+        sorted(
+            (field, tuple(sorted(value)) if isinstance(value, list) else value)
+            for field, value in tq_data.items()
+            if field not in ("Jobs", "Priority") + PRIORITY_IGNORED_FIELDS
+        )
+    )
 
 
 async def calculate_priority(
@@ -96,56 +112,39 @@ async def calculate_priority(
     all_tqs_data: dict[int, dict[str, Any]],
     share: float,
     allow_bg_tqs: bool,
-) -> dict[float, list[int]]:
+) -> dict[int, float]:
     """Calculate the priority for each TQ given a share.
 
     :param tq_dict: dict of {tq_id: prio}
     :param all_tqs_data: dict of {tq_id: {tq_data}}, where tq_data is a dict of {field: value}
     :param share: share to be distributed among TQs
     :param allow_bg_tqs: allow background TQs to be used
-    :return: dict of {priority: [tq_ids]}
+    :return: dict of {tq_id: priority}
     """
-
-    def is_background(tq_priority: float, allow_bg_tqs: bool) -> bool:
-        """A TQ is background if its priority is below a threshold and background TQs are allowed."""
-        return tq_priority <= 0.1 and allow_bg_tqs
+    # A TQ is background if its priority is below a threshold and background TQs are allowed
+    background = {
+        tq_id for tq_id, prio in tq_dict.items() if allow_bg_tqs and prio <= 0.1
+    }
 
     # Calculate Sum of priorities of non background TQs
-    total_prio = sum(
-        [prio for prio in tq_dict.values() if not is_background(prio, allow_bg_tqs)]
-    )
-
-    # Update prio for each TQ
-    for tq_id, tq_priority in tq_dict.items():
-        if is_background(tq_priority, allow_bg_tqs):
-            prio = TQ_MIN_SHARE
-        else:
-            prio = max((share / total_prio) * tq_priority, TQ_MIN_SHARE)
-        tq_dict[tq_id] = prio
-
-    # Generate groups of TQs that will have the same prio=sum(prios) maomenos
-    tq_groups: dict[str, list[int]] = defaultdict(list)
+    total_prio = sum(prio for tq_id, prio in tq_dict.items() if tq_id not in background)
+
+    # Share the priority amongst the TQs
+    priorities = {
+        tq_id: TQ_MIN_SHARE
+        if tq_id in background or not total_prio
+        else max((share / total_prio) * prio, TQ_MIN_SHARE)
+        for tq_id, prio in tq_dict.items()
+    }
+
+    # The TQs which only differ by the ignored fields get the sum of their priorities
+    tq_groups: defaultdict[tuple, list[int]] = defaultdict(list)
     for tq_id, tq_data in all_tqs_data.items():
-        for field in ("Jobs", "Priority") + PRIORITY_IGNORED_FIELDS:
-            if field in tq_data:
-                tq_data.pop(field)
-        tq_hash = []
-        for f in sorted(tq_data):
-            tq_hash.append(f"{f}:{tq_data[f]}")
-        tq_hash = "|".join(tq_hash)
-        # if tq_hash not in tq_groups:
-        #     tq_groups[tq_hash] = []
-        tq_groups[tq_hash].append(tq_id)
-
-    # Do the grouping
+        tq_groups[_group_key(tq_data)].append(tq_id)
     for tq_group in tq_groups.values():
-        total_prio = sum(tq_dict[tq_id] for tq_id in tq_group)
-        for tq_id in tq_group:
-            tq_dict[tq_id] = total_prio
-
-    # Group by priorities
-    result: dict[float, list[int]] = defaultdict(list)
-    for tq_id, tq_priority in tq_dict.items():
-        result[tq_priority].append(tq_id)
+        if len(tq_group) > 1:
+            group_prio = sum(priorities[tq_id] for tq_id in tq_group)
+            for tq_id in tq_group:
+                priorities[tq_id] = group_prio
 
-    return result
+    return priorities
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import pytest
+
+from diracx.core.utils import CoalescingBuffer
+from diracx.db.os.job_parameters import JobParametersDB
+from diracx.db.sql.job.db import JobDB
+from diracx.logic.jobs.status import flush_heartbeats
+from diracx.testing.mock_osdb import MockOSDBMixin
+
+
+@pytest.fixture
+async def job_db():
+    job_db = JobDB("sqlite+aiosqlite:///:memory:")
+    async with job_db.engine_context():
+        async with job_db.engine.begin() as conn:
+            await conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+            await conn.run_sync(job_db.metadata.create_all)
+        yield job_db
+
+
+@pytest.fixture
+async def job_parameters_db():
+    db_class = type("JobParametersDB", (MockOSDBMixin, JobParametersDB), {})
+    db = db_class({"sqlalchemy_dsn": "sqlite+aiosqlite:///:memory:"})
+    async with db.client_context():
+        await db.create_index_template()
+        yield db
+
+
+async def test_flush_heartbeats_deleted_job(job_db, job_parameters_db):
+    """The heartbeats of the jobs deleted before the flush are dropped."""
+    async with job_db:
+        job_ids = [await job_db.create_job(f"JDL{i}") for i in range(3)]
+        await job_db.insert_job_attributes(
+            {
+                job_id: {"Status": "Running", "Owner": "owner", "VO": "vo"}
+                for job_id in job_ids
+            }
+        )
+
+    now = datetime.now(timezone.utc)
+    buffer = CoalescingBuffer[int](max_age=3600, max_items=100)
+    for job_id in job_ids:
+        buffer.add(
+            job_id,
+            {"LoadAverage": 1.5, "StandardOutput": "output", "HeartBeatTime": now},
+        )
+
+    async with job_db:
+        await job_db.delete_jobs([job_ids[1]])
+
+    await flush_heartbeats(buffer, job_db, job_parameters_db)
+    assert len(buffer) == 0
+
+    async with job_db:
+        _, jobs = await job_db.search(["JobID", "HeartBeatTime"], [], [])
+    assert {job["JobID"] for job in jobs if job["HeartBeatTime"]} == {
+        job_ids[0],
+        job_ids[2],
+    }
+    params = await job_parameters_db.search(["StandardOutput"], [], [])
+    assert params == [{"StandardOutput": "output"}] * 2
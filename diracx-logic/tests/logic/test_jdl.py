@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pytest
+from DIRAC.Core.Utilities.ClassAd.ClassAdLight import ClassAd
+from DIRAC.Core.Utilities.ReturnValues import SErrorException
+from DIRAC.WorkloadManagementSystem.DB.JobDBUtils import extractJDL
+
+from diracx.core.jdl import parse_jdl, parse_jdl_cached
+from diracx.logic.jobs.jdl import (
+    check_submitted_jdl,
+    make_class_ad,
+    map_jdls,
+    prepare_new_job,
+    prepare_rescheduled_job,
+)
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+TEST_JDL = """[
+    Executable = "echo";
+    Arguments = "Job %j";
+    JobName = "Test";
+    InputData = {/vo/data1, /vo/data2};
+    Site = {Site1, Site2};
+    Priority = 3;
+]"""
+
+
+@pytest.fixture(scope="module", params=["inline", "thread", "process"])
+def executor(request):
+    if request.param == "inline":
+        yield None
+    elif request.param == "thread":
+        with ThreadPoolExecutor(2) as pool:
+            yield pool
+    else:
+        with ProcessPoolExecutor(
+            1, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            yield pool
+
+
+async def test_prepare_jobs(executor):
+    """The JDLs are processed in the same way in all the executors."""
+    job_ids = [1, 2, 3]
+
+    checked = await map_jdls(
+        executor,
+        check_submitted_jdl,
+        [(TEST_JDL, "owner", "group")] * len(job_ids),
+        chunk_size=2,
+    )
+    prepared = await map_jdls(
+        executor,
+        prepare_new_job,
+        [
+            (
+                job_id,
+                TEST_JDL,
+                manifest,
+                "owner",
+                "group",
+                "vo",
+                "Received",
+                "Job accepted",
+                ["JobName"],
+                T0,
+            )
+            for job_id, (_, manifest) in zip(job_ids, checked)
+        ],
+        chunk_size=2,
+    )
+
+    # The results are in the order of the arguments
+    assert [job.job_attrs["JobID"] for job in prepared] == job_ids
+    for job_id, job in zip(job_ids, prepared):
+        assert job.error is None
+        assert job.job_attrs["JobName"] == "Test"
+        assert job.job_attrs["SubmissionTime"] == T0
+        assert job.input_data == ["/vo/data1", "/vo/data2"]
+        assert f"Job {job_id}" in extractJDL(job.compressed_jdl)
+
+    rescheduled = await map_jdls(
+        executor,
+        prepare_rescheduled_job,
+        [(1, checked[0][0], "owner", "group", 2)],
+    )
+    assert rescheduled[0].error is None
+    assert rescheduled[0].job_attrs == {
+        "Site": "Multiple",
+        "UserPriority": 3,
+        "RescheduleCounter": 2,
+    }
+    assert "Job %j" in rescheduled[0].jdl
+    assert "Job 1" in extractJDL(rescheduled[0].compressed_jdl)
+
+
+async def test_prepare_jobs_errors():
+    with pytest.raises(SErrorException, match="Priority must be a number"):
+        await map_jdls(None, check_submitted_jdl, [("[Priority = high;]", "a", "b")])
+
+    # The failed submission checks are returned to the caller
+    (prepared,) = await map_jdls(
+        None,
+        prepare_rescheduled_job,
+        [(1, "[Owner = other; Executable = echo;]", "owner", "group", 0)],
+    )
+    assert prepared.error is not None
+    assert prepared.job_attrs["MinorStatus"] == "Wrong Owner in JDL"
+
+
+@pytest.mark.parametrize(
+    "jdl",
+    [
+        TEST_JDL,
+        "[]",
+        "  [Executable = echo]  ",
+        '[Arguments = "a b";\nParameters = {1, 2, {3, 4}};\nParameters.Name = "x y"]',
+        '[Tags = {"a", "b c", d};Empty = {};Quoted = "{x}";]',
+        "[JobRequirements = [OwnerDN = x; Sites = {A, B};];CPUTime = 10;]",
+        "[Nested = [A = [B = 1;];];Other = 2;]",
+        "[Executable = echo; Empty =;]",
+        "[Trailing = 1; garbage]",
+        "Executable = echo;",
+    ],
+)
+def test_parse_jdl(jdl):
+    """The native parser gives the same attributes as the DIRAC ClassAd."""
+    class_ad = ClassAd(jdl)
+    parsed = parse_jdl(jdl)
+    assert dict(parsed) == class_ad.contents
+    for name in parsed:
+        assert parsed.get_string(name) == class_ad.getAttributeString(name)
+        assert parsed.get_int(name) == class_ad.getAttributeInt(name)
+        assert parsed.is_list(name) == class_ad.isAttributeList(name)
+        assert list(parsed.get_list(name)) == class_ad.getListFromExpression(name)
+
+    built = make_class_ad(parsed)
+    assert built.asJDL() == class_ad.asJDL()
+    assert built.isOK() == class_ad.isOK()
+
+
+def test_parse_jdl_cached():
+    parsed = parse_jdl_cached(TEST_JDL)
+    assert parse_jdl_cached(TEST_JDL) is parsed
+    with pytest.raises(TypeError):
+        parsed["Priority"] = "4"  # type: ignore[index]
+
+    # The ClassAds built from the cached JDL can be modified independently
+    class_ad = make_class_ad(parsed)
+    class_ad.insertAttributeInt("JobID", 1)
+    assert "JobID" not in parse_jdl_cached(TEST_JDL)
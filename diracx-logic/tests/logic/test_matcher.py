@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import insert
+
+from diracx.db.sql.task_queue.db import TaskQueueDB
+from diracx.db.sql.task_queue.schema import (
+    BannedSitesQueue,
+    JobsQueue,
+    SitesQueue,
+    TagsQueue,
+    TaskQueues,
+)
+from diracx.logic.task_queues.matcher import (
+    ResourceDescription,
+    TaskQueueIndex,
+    match_job,
+)
+
+
+def make_tq(priority=1.0, cpu_time=3600, owner_group="group", vo="vo", **values):
+    return {
+        "Priority": priority,
+        "CPUTime": cpu_time,
+        "Owner": "owner",
+        "OwnerGroup": owner_group,
+        "VO": vo,
+        **values,
+    }
+
+
+@pytest.fixture
+def index() -> TaskQueueIndex:
+    index = TaskQueueIndex()
+    index.update(1, make_tq(priority=1.0))
+    index.update(2, make_tq(priority=5.0, Sites=["Site1"], GridCEs=["ce1"]))
+    index.update(3, make_tq(priority=3.0, BannedSites=["Site1"], Tags=["GPU"]))
+    index.update(4, make_tq(priority=2.0, cpu_time=100000, Platforms=["el9"]))
+    index.update(5, make_tq(priority=9.0, vo="other", owner_group="other"))
+    return index
+
+
+@pytest.mark.parametrize(
+    "resource, expected",
+    [
+        ({}, [5, 2, 4, 1]),
+        ({"vo": "vo"}, [2, 4, 1]),
+        ({"owner_groups": ["other"]}, [5]),
+        ({"vo": "vo", "site": "Site1"}, [2, 4, 1]),
+        ({"vo": "vo", "site": "Site2"}, [4, 1]),
+        ({"vo": "vo", "site": "Site1", "grid_ce": "ce2"}, [4, 1]),
+        ({"vo": "vo", "site": "Site2", "tags": ["GPU", "MultiProcessor"]}, [3, 4, 1]),
+        ({"vo": "vo", "site": "Site1", "tags": ["GPU"]}, [2, 4, 1]),
+        ({"vo": "vo", "cpu_time": 3600}, [2, 1]),
+        ({"vo": "vo", "platforms": ["el8"]}, [2, 1]),
+        ({"vo": "vo", "platforms": ["el8", "el9"]}, [2, 4, 1]),
+        ({"vo": "unknown"}, []),
+    ],
+)
+def test_match(index: TaskQueueIndex, resource, expected):
+    assert index.match(ResourceDescription(**resource)) == expected
+
+
+def test_update_and_remove(index: TaskQueueIndex):
+    resource = ResourceDescription(vo="vo", site="Site2")
+
+    index.update(2, make_tq(priority=5.0))
+    assert index.match(resource) == [2, 4, 1]
+
+    index.remove(2)
+    index.remove(2)
+    assert 2 not in index
+    assert index.match(resource) == [4, 1]
+    assert len(index) == 4
+
+
+async def test_match_job(task_queue_db: TaskQueueDB):
+    async with task_queue_db as task_queue_db:
+        await task_queue_db.conn.execute(
+            insert(TaskQueues),
+            [
+                {
+                    "TQId": tq_id,
+                    "Owner": "owner",
+                    "OwnerGroup": "group",
+                    "VO": "vo",
+                    "CPUTime": 3600,
+                    "Priority": priority,
+                    "Enabled": enabled,
+                }
+                for tq_id, priority, enabled in [(1, 1.0, 1), (2, 2.0, 1), (3, 9.0, 0)]
+            ],
+        )
+        await task_queue_db.conn.execute(
+            insert(JobsQueue),
+            [
+                {"TQId": tq_id, "JobId": job_id, "Priority": 1, "RealPriority": prio}
+                for job_id, tq_id, prio in [
+                    (10, 1, 1.0),
+                    (20, 2, 1.0),
+                    (21, 2, 2.0),
+                    (30, 3, 1.0),
+                ]
+            ],
+        )
+        await task_queue_db.conn.execute(
+            insert(SitesQueue), [{"TQId": 2, "Value": "Site1"}]
+        )
+        await task_queue_db.conn.execute(
+            insert(BannedSitesQueue), [{"TQId": 1, "Value": "Site2"}]
+        )
+        await task_queue_db.conn.execute(
+            insert(TagsQueue), [{"TQId": 1, "Value": "GPU"}]
+        )
+
+        index = TaskQueueIndex()
+        await index.load(task_queue_db)
+        # The disabled task queue is not indexed
+        assert len(index) == 2
+
+        resource = ResourceDescription(vo="vo", site="Site1", tags=["GPU"])
+        # The jobs are taken by priority of the task queues then of the jobs
+        assert await match_job(resource, index, task_queue_db) == (2, 21)
+        assert await match_job(resource, index, task_queue_db) == (2, 20)
+        assert await match_job(resource, index, task_queue_db) == (1, 10)
+        assert await match_job(resource, index, task_queue_db) is None
+        # The empty task queues have been removed from the index
+        assert len(index) == 0
+
+
+async def test_match_job_locked(task_queue_db: TaskQueueDB, monkeypatch):
+    """The task queues whose jobs are all locked by other pilots stay indexed."""
+    index = TaskQueueIndex()
+    index.update(1, make_tq())
+
+    async def pop_job(tq_id):
+        return None, False
+
+    monkeypatch.setattr(task_queue_db, "pop_job", pop_job)
+    assert await match_job(ResourceDescription(), index, task_queue_db) is None
+    assert 1 in index
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import pytest
+
+from diracx.logic.task_queues.priority import TQ_MIN_SHARE, calculate_priority
+
+
+def make_tq(sites, owner="owner", cpu_time=3600):
+    return {
+        "Priority": 1.0,
+        "Jobs": 10,
+        "Owner": owner,
+        "OwnerGroup": "group",
+        "VO": "vo",
+        "CPUTime": cpu_time,
+        "Sites": sites,
+        "GridCEs": [],
+        "BannedSites": [],
+        "Platforms": [],
+        "JobTypes": [],
+        "Tags": ["a", "b"],
+    }
+
+
+@pytest.mark.parametrize("allow_bg_tqs", [True, False])
+async def test_calculate_priority(allow_bg_tqs):
+    tq_dict = {1: 1.0, 2: 3.0, 3: 0.05, 4: 4.0}
+    all_tqs_data = {
+        1: make_tq(["Site1"]),
+        # Only the sites differ from TQ 1, they are in the same group
+        2: make_tq(["Site2"]),
+        3: make_tq([], cpu_time=100),
+        4: make_tq([], owner="other"),
+    }
+    all_tqs_data[4]["Tags"] = ["b", "a"]
+
+    priorities = await calculate_priority(tq_dict, all_tqs_data, 16.0, allow_bg_tqs)
+
+    if allow_bg_tqs:
+        # The background TQ gets the minimal share
+        assert priorities == {1: 8.0, 2: 8.0, 3: TQ_MIN_SHARE, 4: 8.0}
+    else:
+        total = sum(tq_dict.values())
+        assert priorities == pytest.approx(
+            {1: 64 / total, 2: 64 / total, 3: 0.8 / total, 4: 64 / total}
+        )
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import copy
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import pytest
+from DIRAC.WorkloadManagementSystem.Client.JobStatus import JobsStateMachine
+from DIRAC.WorkloadManagementSystem.Utilities.JobStatusUtility import getNewStatus
+
+from diracx.core.models import JobStatus
+from diracx.logic.jobs.state_machine import (
+    compute_new_status,
+    compute_start_and_end_time,
+    next_status,
+)
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+STATUSES = [*JobStatus, "Scouting"]
+
+
+@pytest.mark.parametrize("current", STATUSES)
+def test_next_status_matches_dirac(current):
+    """The native state machine makes the same transitions as the DIRAC one."""
+    for candidate in STATUSES:
+        expected = JobsStateMachine(current).getNextState(candidate)["Value"]
+        assert next_status(current, candidate) == expected, (current, candidate)
+
+
+@pytest.mark.parametrize(
+    "current,updates,last_time,force",
+    [
+        # A normal sequence of updates
+        (
+            JobStatus.MATCHED,
+            [
+                {"Status": JobStatus.RUNNING, "MinorStatus": "Starting"},
+                {"MinorStatus": "Application", "ApplicationStatus": "Running"},
+                {"Status": JobStatus.DONE, "MinorStatus": "Execution Complete"},
+            ],
+            None,
+            False,
+        ),
+        # An impossible transition is rejected
+        (
+            JobStatus.DONE,
+            [{"Status": JobStatus.RUNNING, "MinorStatus": "Late", "Source": "Job"}],
+            None,
+            False,
+        ),
+        # Unless forced
+        (JobStatus.DONE, [{"Status": JobStatus.RUNNING}], None, True),
+        # Updates older than the last recorded one are ignored
+        (
+            JobStatus.WAITING,
+            [{"Status": JobStatus.KILLED}, {"Status": JobStatus.MATCHED}],
+            T0 + timedelta(seconds=1),
+            False,
+        ),
+    ],
+)
+def test_compute_new_status_matches_dirac(current, updates, last_time, force):
+    status_dict = {
+        T0 + timedelta(seconds=i): {"Source": "Test"} | update
+        for i, update in enumerate(updates)
+    }
+    dirac_status_dict = copy.deepcopy(status_dict)
+    expected = getNewStatus(
+        1,
+        sorted(dirac_status_dict),
+        last_time or T0,
+        dirac_status_dict,
+        current,
+        force,
+        MagicMock(),
+    )["Value"]
+
+    assert compute_new_status(current, last_time, status_dict, force) == expected
+    # The rejected transitions are recorded in the same way
+    assert status_dict == dirac_status_dict
+
+
+def test_compute_start_and_end_time():
+    status_dict = {
+        T0: {"Status": JobStatus.RUNNING},
+        T0 + timedelta(seconds=1): {"MinorStatus": "Application"},
+        T0 + timedelta(seconds=2): {"Status": JobStatus.FAILED},
+    }
+    assert compute_start_and_end_time(None, None, status_dict) == (
+        T0,
+        T0 + timedelta(seconds=2),
+    )
+    # Known times are kept
+    start = T0 - timedelta(days=1)
+    assert compute_start_and_end_time(start, None, status_dict) == (
+        start,
+        T0 + timedelta(seconds=2),
+    )
+    # Not finished yet
+    assert compute_start_and_end_time(None, None, {T0: {"Status": "Matched"}}) == (
+        None,
+        None,
+    )
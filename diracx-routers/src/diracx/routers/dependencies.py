@@ -21,6 +21,7 @@ from diracx.core.config import ConfigSource
 from diracx.core.properties import SecurityProperty
 from diracx.core.settings import AuthSettings as _AuthSettings
 from diracx.core.settings import DevelopmentSettings as _DevelopmentSettings
+from diracx.core.settings import JobsSettings as _JobsSettings
 from diracx.core.settings import SandboxStoreSettings as _SandboxStoreSettings
 from diracx.db.os import JobParametersDB as _JobParametersDB
 from diracx.db.sql import AuthDB as _AuthDB
@@ -62,6 +63,7 @@ AuthSettings = Annotated[_AuthSettings, Depends(_AuthSettings.create)]
 DevelopmentSettings = Annotated[
     _DevelopmentSettings, Depends(_DevelopmentSettings.create)
 ]
+JobsSettings = Annotated[_JobsSettings, Depends(_JobsSettings.create)]
 SandboxStoreSettings = Annotated[
     _SandboxStoreSettings, Depends(_SandboxStoreSettings.create)
 ]
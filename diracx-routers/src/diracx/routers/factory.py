@@ -138,15 +138,17 @@ def create_app_inner(
     # We use a single instance of each Setting classes for performance reasons,
     # since it avoids recreating a pydantic model every time
     # We add the Settings lifetime_function to the application lifetime_function,
-    # Please see ServiceSettingsBase for more details
+    # after the ones of the databases so the settings can still use them when
+    # exiting. Please see ServiceSettingsBase for more details
 
     available_settings_classes: set[type[ServiceSettingsBase]] = set()
+    settings_lifetime_functions = []
 
     for service_settings in all_service_settings:
         cls = type(service_settings)
         assert cls not in available_settings_classes
         available_settings_classes.add(cls)
-        app.lifetime_functions.append(service_settings.lifetime_function)
+        settings_lifetime_functions.append(service_settings.lifetime_function)
         # We always return the same setting instance for perf reasons
         app.dependency_overrides[cls.create] = partial(lambda x: x, service_settings)
 
@@ -228,6 +230,8 @@ def create_app_inner(
                 db_transaction, os_db
             )
 
+    app.lifetime_functions.extend(settings_lifetime_functions)
+
     # Load the requested routers
     routers: dict[str, APIRouter] = {}
     # The enabled systems must be sorted to ensure the openapi.json is deterministic
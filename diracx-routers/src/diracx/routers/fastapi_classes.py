@@ -37,8 +37,18 @@ class DiracFastAPI(FastAPI):
         @contextlib.asynccontextmanager
         async def lifespan(app: DiracFastAPI):
             async with contextlib.AsyncExitStack() as stack:
+                # Enter the lifetime functions concurrently but exit them in the
+                # reverse order of their registration, whatever the order in
+                # which they were entered
+                stacks = [
+                    await stack.enter_async_context(contextlib.AsyncExitStack())
+                    for _ in app.lifetime_functions
+                ]
                 await asyncio.gather(
-                    *(stack.enter_async_context(f()) for f in app.lifetime_functions)
+                    *(
+                        sub_stack.enter_async_context(f())
+                        for sub_stack, f in zip(stacks, app.lifetime_functions)
+                    )
                 )
                 yield
 
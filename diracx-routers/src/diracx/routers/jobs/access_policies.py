@@ -82,19 +82,14 @@ class WMSAccessPolicy(BaseAccessPolicy):
         # Now we know we are either in READ/MODIFY for a NORMAL_USER
         # so just make sure that whatever job_id was given belongs
         # to the current user
-        job_owners = await job_db.summary(
-            ["Owner", "VO"],
-            [{"parameter": "JobID", "operator": "in", "values": job_ids}],
-        )
-
-        expected_owner = {
-            "Owner": user_info.preferred_username,
-            "VO": user_info.vo,
-            "count": len(set(job_ids)),
-        }
+        job_owners = await job_db.get_job_owners(job_ids)
+
         # All the jobs belong to the user doing the query
         # and all of them are present
-        if job_owners == [expected_owner]:
+        expected_owner = (user_info.preferred_username, user_info.vo)
+        if len(job_owners) == len(set(job_ids)) and all(
+            owner == expected_owner for owner in job_owners.values()
+        ):
             return
 
         raise HTTPException(status.HTTP_403_FORBIDDEN)
@@ -148,16 +143,18 @@ class SandboxAccessPolicy(BaseAccessPolicy):
                         status_code=status.HTTP_403_FORBIDDEN,
                         detail=f"Invalid PFN. PFN must start with {required_prefix}",
                     )
-                # Checking if the user owns the sandbox
-                owner_id = await sandbox_metadata_db.get_owner_id(user_info)
-                sandbox_owner_id = await sandbox_metadata_db.get_sandbox_owner_id(
-                    pfn, se_name
+            # Checking if the user owns the sandboxes
+            owner_id = await sandbox_metadata_db.get_owner_id(user_info)
+            sandbox_owner_ids = await sandbox_metadata_db.get_sandbox_owner_ids(
+                pfns, se_name
+            )
+            if not owner_id or any(
+                sandbox_owner_ids.get(pfn) != owner_id for pfn in pfns
+            ):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail=f"{user_info.preferred_username} is not the owner of the sandbox",
                 )
-                if not owner_id or owner_id != sandbox_owner_id:
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail=f"{user_info.preferred_username} is not the owner of the sandbox",
-                    )
 
 
 CheckSandboxPolicyCallable = Annotated[Callable, Depends(SandboxAccessPolicy.check)]
@@ -1,16 +1,25 @@
 from __future__ import annotations
 
+import contextlib
+import json
+from datetime import datetime
 from http import HTTPStatus
-from typing import Annotated, Any
+from io import BytesIO
+from typing import Annotated, Any, AsyncIterator
 
-from fastapi import Body, Depends, Response
+from fastapi import Body, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
 
 from diracx.core.models import (
     JobSearchParams,
     JobSummaryParams,
+    SearchCountMode,
+    SearchExportFormat,
 )
 from diracx.core.properties import JOB_ADMINISTRATOR
+from diracx.logic.jobs.query import export_search as export_search_bl
 from diracx.logic.jobs.query import search as search_bl
+from diracx.logic.jobs.query import search_by_cursor as search_by_cursor_bl
 from diracx.logic.jobs.query import summary as summary_bl
 
 from ..dependencies import (
@@ -18,6 +27,7 @@ from ..dependencies import (
     JobDB,
     JobLoggingDB,
     JobParametersDB,
+    JobsSettings,
 )
 from ..fastapi_classes import DiracxRouter
 from ..utils.users import AuthorizedUserInfo, verify_dirac_access_token
@@ -57,6 +67,15 @@ EXAMPLE_SEARCHES = {
 EXAMPLE_RESPONSES: dict[int | str, dict[str, Any]] = {
     200: {
         "description": "List of matching results",
+        "headers": {
+            "Next-Cursor": {
+                "description": (
+                    "When using cursor pagination, the cursor to pass "
+                    "to get the next page. Absent on the last page."
+                ),
+                "schema": {"type": "string"},
+            }
+        },
         "content": {
             "application/json": {
                 "example": [
@@ -134,12 +153,27 @@ async def search(
     response: Response,
     page: int = 1,
     per_page: int = 100,
+    cursor: str | None = None,
+    count: SearchCountMode = SearchCountMode.EXACT,
     body: Annotated[
         JobSearchParams | None, Body(openapi_examples=EXAMPLE_SEARCHES)
     ] = None,
 ) -> list[dict[str, Any]]:
     """Retrieve information about jobs.
 
+    By default the results are paginated using `page` and `per_page`.
+    Deep pages are expensive to compute, so when iterating over many results
+    cursor pagination should be used instead: pass an empty `cursor` to get
+    the first page, and then the value of the `Next-Cursor` response header
+    to get the following ones. In this mode `page` is ignored and no total
+    count is reported.
+
+    Counting all the matching jobs is costly for broad searches. With
+    `count=none` the total is not computed, and with `count=estimate` it is
+    taken from the table statistics or from a recent count of the same search.
+    The total in the `Content-Range` header is then `*` or prefixed by `~`,
+    respectively, unless the end of the results was reached.
+
     **TODO: Add more docs**
     """
     await check_permissions(action=ActionType.QUERY, job_db=job_db)
@@ -148,6 +182,21 @@ async def search(
     if JOB_ADMINISTRATOR in user_info.properties:
         preferred_username = None
 
+    if cursor is not None:
+        jobs, next_cursor = await search_by_cursor_bl(
+            config=config,
+            job_db=job_db,
+            job_parameters_db=job_parameters_db,
+            job_logging_db=job_logging_db,
+            preferred_username=preferred_username,
+            cursor=cursor or None,
+            per_page=per_page,
+            body=body,
+        )
+        if next_cursor is not None:
+            response.headers["Next-Cursor"] = next_cursor
+        return jobs
+
     total, jobs = await search_bl(
         config=config,
         job_db=job_db,
@@ -157,27 +206,179 @@ async def search(
         page=page,
         per_page=per_page,
         body=body,
+        count=count,
     )
 
+    # Without an exact count, the total is only known for sure once the end of
+    # the results is reached. Otherwise it is reported as unknown or approximate.
+    total_str = str(total)
+    if count != SearchCountMode.EXACT:
+        if len(jobs) < min(per_page, MAX_PER_PAGE) and (jobs or page == 1):
+            total = per_page * (page - 1) + len(jobs)
+            total_str = str(total)
+        elif total is None:
+            total_str = "*"
+        else:
+            # The estimate may be lower than what was already found
+            total_str = f"~{max(total, per_page * (page - 1) + len(jobs))}"
+            total = None
+
     # Set the Content-Range header if needed
     # https://datatracker.ietf.org/doc/html/rfc7233#section-4
 
     # No jobs found but there are jobs for the requested search
     # https://datatracker.ietf.org/doc/html/rfc7233#section-4.4
-    if len(jobs) == 0 and total > 0:
-        response.headers["Content-Range"] = f"jobs */{total}"
+    if len(jobs) == 0 and (total is None or total > 0):
+        response.headers["Content-Range"] = f"jobs */{total_str}"
         response.status_code = HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
 
     # The total number of jobs is greater than the number of jobs returned
     # https://datatracker.ietf.org/doc/html/rfc7233#section-4.2
-    elif len(jobs) < total:
+    elif total is None or len(jobs) < total:
         first_idx = per_page * (page - 1)
-        last_idx = min(first_idx + len(jobs), total) - 1 if total > 0 else 0
-        response.headers["Content-Range"] = f"jobs {first_idx}-{last_idx}/{total}"
+        last_idx = first_idx + len(jobs) - 1
+        if total is not None:
+            last_idx = min(first_idx + len(jobs), total) - 1 if total > 0 else 0
+        response.headers["Content-Range"] = f"jobs {first_idx}-{last_idx}/{total_str}"
         response.status_code = HTTPStatus.PARTIAL_CONTENT
     return jobs
 
 
+EXPORT_MEDIA_TYPES = {
+    SearchExportFormat.NDJSON: "application/x-ndjson",
+    SearchExportFormat.ARROW: "application/vnd.apache.arrow.stream",
+}
+
+
+EXPORT_RESPONSES: dict[int | str, dict[str, Any]] = {
+    200: {
+        "description": "All the matching results, streamed in the requested format",
+        "content": {
+            media_type: {"schema": {"type": "string", "format": "binary"}}
+            for media_type in EXPORT_MEDIA_TYPES.values()
+        },
+    },
+}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+async def _encode_ndjson(
+    column_types: dict[str, type],
+    batches: AsyncIterator[list[dict[str, Any]]],
+) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        yield "".join(
+            json.dumps(row, default=_json_default) + "\n" for row in batch
+        ).encode()
+
+
+async def _encode_arrow(
+    column_types: dict[str, type],
+    batches: AsyncIterator[list[dict[str, Any]]],
+) -> AsyncIterator[bytes]:
+    import pyarrow as pa
+
+    # The schema comes from the types of the columns, such that it does not
+    # depend on the values of the first batch
+    arrow_types = {
+        int: pa.int64(),
+        float: pa.float64(),
+        bool: pa.bool_(),
+        datetime: pa.timestamp("us"),
+    }
+    schema = pa.schema(
+        (name, arrow_types.get(column_type, pa.string()))
+        for name, column_type in column_types.items()
+    )
+    # The values of the other types are sent as strings
+    str_columns = [
+        name
+        for name, column_type in column_types.items()
+        if column_type is not str and column_type not in arrow_types
+    ]
+
+    sink = BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+    async for batch in batches:
+        for row in batch:
+            for name in str_columns:
+                if row[name] is not None:
+                    row[name] = str(row[name])
+        writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()
+
+
+@router.post(
+    "/search/export", response_class=StreamingResponse, responses=EXPORT_RESPONSES
+)
+async def export_search(
+    config: Config,
+    job_db: JobDB,
+    user_info: Annotated[AuthorizedUserInfo, Depends(verify_dirac_access_token)],
+    check_permissions: CheckWMSPolicyCallable,
+    format: SearchExportFormat = SearchExportFormat.NDJSON,
+    body: Annotated[
+        JobSearchParams | None, Body(openapi_examples=EXAMPLE_SEARCHES)
+    ] = None,
+) -> StreamingResponse:
+    """Export information about all the matching jobs.
+
+    Unlike `search`, the results are not paginated: they are read from the
+    database and sent progressively, so that arbitrarily large numbers of jobs
+    can be retrieved without holding them in memory.
+
+    With `format=ndjson` each job is sent as a JSON object on its own line.
+    With `format=arrow` the jobs are sent as an Apache Arrow IPC stream,
+    which requires `pyarrow` to be installed on the server.
+    """
+    await check_permissions(action=ActionType.QUERY, job_db=job_db)
+
+    preferred_username: str | None = user_info.preferred_username
+    if JOB_ADMINISTRATOR in user_info.properties:
+        preferred_username = None
+
+    if format == SearchExportFormat.ARROW:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_IMPLEMENTED,
+                detail="Arrow export is not available on this server",
+            ) from e
+        encode = _encode_arrow
+    else:
+        encode = _encode_ndjson
+
+    column_types, batches = export_search_bl(
+        config=config,
+        job_db=job_db,
+        preferred_username=preferred_username,
+        body=body,
+    )
+
+    async def stream() -> AsyncIterator[bytes]:
+        async with contextlib.AsyncExitStack() as stack:
+            # Depending on the FastAPI version, the transaction of the route may
+            # already be closed when the response is sent
+            try:
+                job_db.conn  # noqa: B018
+            except RuntimeError:
+                await stack.enter_async_context(job_db)
+            async for chunk in encode(column_types, batches):
+                yield chunk
+
+    return StreamingResponse(stream(), media_type=EXPORT_MEDIA_TYPES[format])
+
+
 @router.post("/summary")
 async def summary(
     config: Config,
@@ -185,6 +386,7 @@ async def summary(
     user_info: Annotated[AuthorizedUserInfo, Depends(verify_dirac_access_token)],
     body: JobSummaryParams,
     check_permissions: CheckWMSPolicyCallable,
+    jobs_settings: JobsSettings,
 ):
     """Show information suitable for plotting."""
     await check_permissions(action=ActionType.QUERY, job_db=job_db)
@@ -194,4 +396,5 @@ async def summary(
         job_db=job_db,
         preferred_username=user_info.preferred_username,
         body=body,
+        use_counters=jobs_settings.summary_from_counters,
     )
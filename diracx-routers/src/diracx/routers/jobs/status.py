@@ -25,6 +25,7 @@ from ..dependencies import (
     JobDB,
     JobLoggingDB,
     JobParametersDB,
+    JobsSettings,
     TaskQueueDB,
 )
 from ..fastapi_classes import DiracxRouter
@@ -81,6 +82,7 @@ async def add_heartbeat(
     job_logging_db: JobLoggingDB,
     task_queue_db: TaskQueueDB,
     job_parameters_db: JobParametersDB,
+    jobs_settings: JobsSettings,
     check_permissions: CheckWMSPolicyCallable,
 ) -> list[JobCommand]:
     """Register a heartbeat from the job.
@@ -90,11 +92,20 @@ async def add_heartbeat(
     restored to the RUNNING status.
 
     The `data` parameter and return value are mappings keyed by job ID.
+
+    The heartbeat time and data may be written asynchronously, see
+    `JobsSettings.heartbeat_buffer_seconds`.
     """
     await check_permissions(action=ActionType.PILOT, job_db=job_db, job_ids=list(data))
 
     await add_heartbeat_bl(
-        data, config, job_db, job_logging_db, task_queue_db, job_parameters_db
+        data,
+        config,
+        job_db,
+        job_logging_db,
+        task_queue_db,
+        job_parameters_db,
+        buffer=jobs_settings.heartbeat_buffer,
     )
     return await get_job_commands_bl(data, job_db)
 
@@ -108,6 +119,7 @@ async def reschedule_jobs(
     task_queue_db: TaskQueueDB,
     job_parameters_db: JobParametersDB,
     check_permissions: CheckWMSPolicyCallable,
+    jobs_settings: JobsSettings,
     reset_jobs: Annotated[bool, Query()] = False,
 ) -> dict[str, Any]:
     await check_permissions(action=ActionType.MANAGE, job_db=job_db, job_ids=job_ids)
@@ -120,6 +132,7 @@ async def reschedule_jobs(
         task_queue_db,
         job_parameters_db,
         reset_jobs=reset_jobs,
+        executor=jobs_settings.jdl_executor,
     )
 
     if not resched_jobs.get("success", []):
@@ -12,6 +12,7 @@ from diracx.logic.jobs.submission import submit_jdl_jobs as submit_jdl_jobs_bl
 from ..dependencies import (
     JobDB,
     JobLoggingDB,
+    JobsSettings,
 )
 from ..fastapi_classes import DiracxRouter
 from ..utils.users import AuthorizedUserInfo, verify_dirac_access_token
@@ -24,8 +25,6 @@ class JobID(BaseModel):
     job_id: int
 
 
-MAX_PARAMETRIC_JOBS = 20
-
 EXAMPLE_JDLS = {
     "Simple JDL": {
         "value": [
@@ -60,13 +59,23 @@ async def submit_jdl_jobs(
     job_logging_db: JobLoggingDB,
     user_info: Annotated[AuthorizedUserInfo, Depends(verify_dirac_access_token)],
     check_permissions: CheckWMSPolicyCallable,
+    jobs_settings: JobsSettings,
 ) -> list[InsertedJob]:
-    """Submit a list of jobs in JDL format."""
+    """Submit a list of jobs in JDL format.
+
+    The number of jobs which can be submitted at once, including the ones
+    generated from a parametric JDL, is limited by the service settings.
+    """
     await check_permissions(action=ActionType.CREATE, job_db=job_db)
 
     try:
         inserted_jobs = await submit_jdl_jobs_bl(
-            job_definitions, job_db, job_logging_db, user_info
+            job_definitions,
+            job_db,
+            job_logging_db,
+            user_info,
+            max_parametric_jobs=jobs_settings.max_parametric_jobs,
+            executor=jobs_settings.jdl_executor,
         )
     except ValueError as e:
         raise HTTPException(
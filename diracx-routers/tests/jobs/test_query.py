@@ -1,13 +1,16 @@
 from __future__ import annotations
 
+import json
 from datetime import datetime, timezone
 from http import HTTPStatus
+from unittest.mock import patch
 
 import pytest
 from fastapi.testclient import TestClient
 from freezegun import freeze_time
 
 from diracx.core.models import JobStatus
+from diracx.core.settings import JobsSettings
 
 from .conftest import TEST_JDL, TEST_PARAMETRIC_JDL
 
@@ -35,6 +38,7 @@ pytestmark = pytest.mark.enabled_dependencies(
         "SandboxMetadataDB",
         "WMSAccessPolicy",
         "DevelopmentSettings",
+        "JobsSettings",
         "JobParametersDB",
     ]
 )
@@ -523,6 +527,209 @@ def test_search_pagination(normal_user_client):
     assert r.status_code == 400, r.json()
 
 
+def test_search_count_modes(normal_user_client):
+    """Test that the total count can be skipped or estimated."""
+    job_definitions = [TEST_JDL] * 20
+    r = normal_user_client.post("/api/jobs/jdl", json=job_definitions)
+    assert r.status_code == 200, r.json()
+
+    # Without counting, the total is unknown until the last page
+    params = {"per_page": 10, "count": "none"}
+    r = normal_user_client.post("/api/jobs/search", params={"page": 1, **params})
+    assert r.status_code == 206, r.json()
+    assert len(r.json()) == 10
+    assert r.headers["Content-Range"] == "jobs 0-9/*"
+
+    r = normal_user_client.post("/api/jobs/search", params={"page": 2, **params})
+    assert r.status_code == 206, r.json()
+    assert r.headers["Content-Range"] == "jobs 10-19/*"
+
+    r = normal_user_client.post("/api/jobs/search", params={"page": 3, **params})
+    assert r.status_code == 416, r.json()
+    assert r.headers["Content-Range"] == "jobs */*"
+
+    # A page which is not full gives the exact total
+    r = normal_user_client.post(
+        "/api/jobs/search", params={"per_page": 15, "page": 2, "count": "none"}
+    )
+    assert r.status_code == 206, r.json()
+    assert r.headers["Content-Range"] == "jobs 15-19/20"
+
+    r = normal_user_client.post(
+        "/api/jobs/search", params={"per_page": 30, "count": "none"}
+    )
+    assert r.status_code == 200, r.json()
+    assert len(r.json()) == 20
+    assert "Content-Range" not in r.headers
+
+    # Estimated totals are marked as approximate
+    body = {
+        "search": [{"parameter": "JobName", "operator": "neq", "value": "count-test"}]
+    }
+    params = {"per_page": 10, "count": "estimate"}
+    r = normal_user_client.post(
+        "/api/jobs/search", params={"page": 1, **params}, json=body
+    )
+    assert r.status_code == 206, r.json()
+    assert r.headers["Content-Range"] == "jobs 0-9/~20"
+
+    # The estimate is cached, so it does not see the new jobs
+    r = normal_user_client.post("/api/jobs/jdl", json=[TEST_JDL] * 10)
+    assert r.status_code == 200, r.json()
+    r = normal_user_client.post(
+        "/api/jobs/search", params={"page": 2, **params}, json=body
+    )
+    assert r.status_code == 206, r.json()
+    assert r.headers["Content-Range"] == "jobs 10-19/~20"
+
+    # It is never lower than the number of jobs found so far
+    r = normal_user_client.post(
+        "/api/jobs/search", params={"page": 3, **params}, json=body
+    )
+    assert r.status_code == 206, r.json()
+    assert r.headers["Content-Range"] == "jobs 20-29/~30"
+
+    # The total is exact once the end of the results is reached
+    r = normal_user_client.post(
+        "/api/jobs/search",
+        params={"page": 2, "per_page": 25, "count": "estimate"},
+        json=body,
+    )
+    assert r.status_code == 206, r.json()
+    assert r.headers["Content-Range"] == "jobs 25-29/30"
+
+
+def test_export_search(normal_user_client):
+    """Test that all the search results can be exported as NDJSON."""
+    r = normal_user_client.post("/api/jobs/jdl", json=[TEST_JDL] * 20)
+    assert r.status_code == 200, r.json()
+    submitted_job_ids = sorted(job["JobID"] for job in r.json())
+
+    body = {
+        "parameters": ["JobID", "Status", "SubmissionTime"],
+        "sort": [{"parameter": "JobID", "direction": "asc"}],
+    }
+    r = normal_user_client.post("/api/jobs/search/export", json=body)
+    assert r.status_code == 200, r.text
+    assert r.headers["Content-Type"] == "application/x-ndjson"
+    jobs = [json.loads(line) for line in r.text.splitlines()]
+    assert [job["JobID"] for job in jobs] == submitted_job_ids
+    assert all(job.keys() == {"JobID", "Status", "SubmissionTime"} for job in jobs)
+    # The values are formatted in the same way as with the search
+    r = normal_user_client.post("/api/jobs/search", json=body)
+    assert r.json() == jobs
+
+    # No results
+    body = {"search": [{"parameter": "JobID", "operator": "eq", "value": "0"}]}
+    r = normal_user_client.post("/api/jobs/search/export", json=body)
+    assert r.status_code == 200, r.text
+    assert r.text == ""
+
+    # Invalid searches are rejected before streaming
+    r = normal_user_client.post(
+        "/api/jobs/search/export", json={"parameters": ["NotAParameter"]}
+    )
+    assert r.status_code == HTTPStatus.BAD_REQUEST, r.json()
+    r = normal_user_client.post(
+        "/api/jobs/search/export", json={"parameters": ["JobID", "LoggingInfo"]}
+    )
+    assert r.status_code == HTTPStatus.BAD_REQUEST, r.json()
+
+
+def test_export_search_arrow(normal_user_client):
+    """Test that the search results can be exported as an Arrow stream."""
+    pa = pytest.importorskip("pyarrow")
+
+    r = normal_user_client.post("/api/jobs/jdl", json=[TEST_JDL] * 5)
+    assert r.status_code == 200, r.json()
+    submitted_job_ids = sorted(job["JobID"] for job in r.json())
+
+    parameters = ["JobID", "StartExecTime", "Status", "VerifiedFlag", "AccountedFlag"]
+    r = normal_user_client.post(
+        "/api/jobs/search/export",
+        params={"format": "arrow"},
+        json={"parameters": parameters},
+    )
+    assert r.status_code == 200, r.text
+    table = pa.ipc.open_stream(r.content).read_all()
+    assert table.column_names == parameters
+    assert sorted(table.column("JobID").to_pylist()) == submitted_job_ids
+    # The types come from the columns even if they have no values
+    assert table.schema.field("StartExecTime").type == pa.timestamp("us")
+    assert table.schema.field("VerifiedFlag").type == pa.bool_()
+    assert table.schema.field("AccountedFlag").type == pa.string()
+    assert set(table.column("AccountedFlag").to_pylist()) == {"False"}
+
+
+async def test_encode_arrow_schema():
+    """The schema does not depend on the values of the first batch."""
+    pa = pytest.importorskip("pyarrow")
+
+    from diracx.routers.jobs.query import _encode_arrow
+
+    t0 = datetime(2024, 1, 1)  # noqa: DTZ001
+
+    async def batches():
+        yield [{"JobID": 1, "EndExecTime": None, "AccountedFlag": None}]
+        yield [
+            {"JobID": 2, "EndExecTime": t0, "AccountedFlag": True},
+            {"JobID": 3, "EndExecTime": None, "AccountedFlag": "Failed"},
+        ]
+
+    column_types = {"JobID": int, "EndExecTime": datetime, "AccountedFlag": object}
+    chunks = [chunk async for chunk in _encode_arrow(column_types, batches())]
+    table = pa.ipc.open_stream(b"".join(chunks)).read_all()
+    assert table.to_pylist() == [
+        {"JobID": 1, "EndExecTime": None, "AccountedFlag": None},
+        {"JobID": 2, "EndExecTime": t0, "AccountedFlag": "True"},
+        {"JobID": 3, "EndExecTime": None, "AccountedFlag": "Failed"},
+    ]
+
+
+def test_search_cursor_pagination(normal_user_client):
+    """Test that the cursor pagination works as expected."""
+    job_definitions = [TEST_JDL] * 20
+    r = normal_user_client.post("/api/jobs/jdl", json=job_definitions)
+    assert r.status_code == 200, r.json()
+    submitted_job_ids = sorted(job_dict["JobID"] for job_dict in r.json())
+
+    body = {
+        "parameters": ["JobID"],
+        "sort": [{"parameter": "SubmissionTime", "direction": "asc"}],
+    }
+    listed_job_ids = []
+    cursor = ""
+    for _ in range(3):
+        r = normal_user_client.post(
+            "/api/jobs/search",
+            params={"per_page": 8, "cursor": cursor},
+            json=body,
+        )
+        assert r.status_code == 200, r.json()
+        assert "Content-Range" not in r.headers
+        assert all(job.keys() == {"JobID"} for job in r.json())
+        listed_job_ids.extend(job["JobID"] for job in r.json())
+        if "Next-Cursor" not in r.headers:
+            break
+        cursor = r.headers["Next-Cursor"]
+    assert "Next-Cursor" not in r.headers
+    assert listed_job_ids == submitted_job_ids
+
+    # Invalid cursor
+    r = normal_user_client.post(
+        "/api/jobs/search", params={"per_page": 8, "cursor": "invalid"}, json=body
+    )
+    assert r.status_code == 400, r.json()
+
+    # Distinct cannot be used with a cursor
+    r = normal_user_client.post(
+        "/api/jobs/search",
+        params={"per_page": 8, "cursor": ""},
+        json={"parameters": ["Status"], "distinct": True},
+    )
+    assert r.status_code == 400, r.json()
+
+
 def test_user_cannot_submit_parametric_jdl_greater_than_max_parametric_jobs(
     normal_user_client,
 ):
@@ -541,6 +748,38 @@ def test_user_cannot_submit_list_of_jdl_greater_than_max_number_of_jobs(
     assert res.status_code == HTTPStatus.BAD_REQUEST, res.json()
 
 
+def test_max_parametric_jobs_is_configurable(normal_user_client, test_jobs_settings):
+    """The limit on the number of jobs submitted at once comes from the settings."""
+    jobs_settings = test_jobs_settings.model_copy(update={"max_parametric_jobs": 100})
+    with patch.dict(
+        normal_user_client.app.dependency_overrides,
+        {JobsSettings.create: lambda: jobs_settings},
+    ):
+        r = normal_user_client.post("/api/jobs/jdl", json=[TEST_LARGE_PARAMETRIC_JDL])
+        assert r.status_code == 200, r.json()
+        job_ids = [job["JobID"] for job in r.json()]
+        assert len(job_ids) == 100
+        # The jobs are numbered in the order of the parameters
+        assert job_ids == sorted(job_ids)
+
+        r = normal_user_client.post(
+            "/api/jobs/search",
+            json={
+                "parameters": ["JobID", "JobName"],
+                "search": [{"parameter": "JobID", "operator": "in", "values": job_ids}],
+            },
+        )
+        assert r.status_code == 200, r.json()
+        assert {job["JobID"]: job["JobName"] for job in r.json()} == {
+            job_id: f"Test_{i:02d}" for i, job_id in enumerate(job_ids)
+        }
+
+        r = normal_user_client.post(
+            "/api/jobs/jdl", json=[TEST_LARGE_PARAMETRIC_JDL.replace("100", "101")]
+        )
+        assert r.status_code == HTTPStatus.BAD_REQUEST, r.json()
+
+
 @pytest.mark.parametrize(
     "job_definitions",
     [[TEST_PARAMETRIC_JDL, TEST_JDL], [TEST_PARAMETRIC_JDL, TEST_PARAMETRIC_JDL]],
@@ -697,6 +936,20 @@ async def test_get_job_status_history(
     )
     assert r.json()[0]["LoggingInfo"][1]["Source"] == "Unknown"
 
+    # Only the last records can be requested
+    r = normal_user_client.post(
+        "/api/jobs/search",
+        json={
+            "parameters": ["JobID", "LoggingInfo"],
+            "search": [{"parameter": "JobID", "operator": "eq", "value": valid_job_id}],
+            "logging_info_last": 1,
+        },
+    )
+    assert r.status_code == 200, r.json()
+    assert [x["Status"] for x in r.json()[0]["LoggingInfo"]] == [
+        JobStatus.CHECKING.value
+    ]
+
 
 # Test setting job properties
 
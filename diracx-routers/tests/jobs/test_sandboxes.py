@@ -22,6 +22,7 @@ pytestmark = pytest.mark.enabled_dependencies(
         "WMSAccessPolicy",
         "SandboxAccessPolicy",
         "DevelopmentSettings",
+        "JobsSettings",
     ]
 )
 
@@ -100,6 +101,58 @@ TEST_JDL = """
 """
 
 
+def test_bulk_upload(normal_user_client: TestClient):
+    """Test that several sandboxes can be uploaded with a single request."""
+    data = [secrets.token_bytes(512) for _ in range(3)]
+    sandbox_infos = [
+        {
+            "checksum_algorithm": "sha256",
+            "checksum": hashlib.sha256(d).hexdigest(),
+            "size": len(d),
+            "format": "tar.bz2",
+        }
+        for d in data
+    ]
+
+    # The same sandbox can be given several times
+    r = normal_user_client.post(
+        "/api/jobs/sandbox/bulk", json=sandbox_infos + sandbox_infos[:1]
+    )
+    assert r.status_code == 200, r.text
+    upload_infos = r.json()
+    assert len(upload_infos) == 4
+    assert upload_infos[3] == upload_infos[0]
+    assert all(upload_info["url"] for upload_info in upload_infos)
+
+    # Upload the first sandbox
+    files = {"file": ("file", BytesIO(data[0]))}
+    r = httpx.post(upload_infos[0]["url"], data=upload_infos[0]["fields"], files=files)
+    assert r.status_code == 204, r.text
+
+    # Only the sandboxes which were not uploaded have to be uploaded again
+    r = normal_user_client.post("/api/jobs/sandbox/bulk", json=sandbox_infos)
+    assert r.status_code == 200, r.text
+    new_upload_infos = r.json()
+    assert [upload_info["pfn"] for upload_info in new_upload_infos] == [
+        upload_info["pfn"] for upload_info in upload_infos[:3]
+    ]
+    assert new_upload_infos[0]["url"] is None
+    assert new_upload_infos[1]["url"]
+    assert new_upload_infos[2]["url"]
+
+    # The single sandbox route gives the same result
+    r = normal_user_client.post("/api/jobs/sandbox", json=sandbox_infos[0])
+    assert r.status_code == 200, r.text
+    assert r.json() == new_upload_infos[0]
+
+    # Oversized sandboxes are refused
+    r = normal_user_client.post(
+        "/api/jobs/sandbox/bulk",
+        json=[sandbox_infos[1], {**sandbox_infos[2], "size": 1024**3}],
+    )
+    assert r.status_code == 400, r.text
+
+
 def test_assign_then_unassign_sandboxes_to_jobs(normal_user_client: TestClient):
     """Test that we can assign and unassign sandboxes to jobs."""
     data = secrets.token_bytes(512)
@@ -3,11 +3,13 @@ from __future__ import annotations
 from datetime import datetime, timedelta, timezone
 from http import HTTPStatus
 from time import sleep
+from unittest.mock import ANY, patch
 
 import pytest
 from fastapi.testclient import TestClient
 
 from diracx.core.models import JobStatus
+from diracx.core.utils import CoalescingBuffer
 
 from .conftest import TEST_JDL
 
@@ -21,6 +23,7 @@ pytestmark = pytest.mark.enabled_dependencies(
         "SandboxMetadataDB",
         "WMSAccessPolicy",
         "DevelopmentSettings",
+        "JobsSettings",
         "JobParametersDB",
     ]
 )
@@ -1019,3 +1022,52 @@ def test_heartbeat(normal_user_client: TestClient, valid_job_id: int):
     assert len(commands) == 0, (
         "Exactly zero job commands should be returned after heartbeat commands are sent"
     )
+
+
+def test_heartbeat_buffered(
+    normal_user_client: TestClient, valid_job_ids: list[int], test_jobs_settings
+):
+    buffer = CoalescingBuffer[int](max_age=3600, max_items=len(valid_job_ids))
+    search_body = {
+        "search": [{"parameter": "JobID", "operator": "in", "values": valid_job_ids}]
+    }
+    r = normal_user_client.patch(
+        "/api/jobs/status",
+        json={
+            valid_job_ids[0]: {
+                str(datetime.now(timezone.utc)): {"Status": JobStatus.MATCHED}
+            }
+        },
+        params={"force": True},
+    )
+    r.raise_for_status()
+
+    with patch.object(test_jobs_settings, "_heartbeat_buffer", buffer):
+        for vsize in [1234, 1235]:
+            payload = {job_id: {"Vsize": vsize} for job_id in valid_job_ids[:2]}
+            r = normal_user_client.patch("/api/jobs/heartbeat", json=payload)
+            r.raise_for_status()
+
+        # The heartbeats are coalesced in the buffer
+        items = buffer.take()
+        assert items == {
+            job_id: {"Vsize": 1235, "HeartBeatTime": ANY}
+            for job_id in valid_job_ids[:2]
+        }
+        buffer.restore(items)
+        # But the status changes are applied immediately
+        r = normal_user_client.post("/api/jobs/search", json=search_body)
+        r.raise_for_status()
+        jobs = {job["JobID"]: job for job in r.json()}
+        assert jobs[valid_job_ids[0]]["Status"] == JobStatus.RUNNING
+        assert jobs[valid_job_ids[1]]["HeartBeatTime"] is None
+
+        # Once the buffer is full the heartbeats are written
+        payload = {job_id: {"Vsize": 1236} for job_id in valid_job_ids}
+        r = normal_user_client.patch("/api/jobs/heartbeat", json=payload)
+        r.raise_for_status()
+        assert len(buffer) == 0
+
+    r = normal_user_client.post("/api/jobs/search", json=search_body)
+    r.raise_for_status()
+    assert all(job["HeartBeatTime"] is not None for job in r.json())
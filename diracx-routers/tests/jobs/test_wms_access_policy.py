@@ -23,12 +23,12 @@ base_payload = {
 
 
 class FakeJobDB:
-    async def summary(self, *args): ...
+    async def get_job_owners(self, *args): ...
 
 
 class FakeSBMetadataDB:
     async def get_owner_id(self, *args): ...
-    async def get_sandbox_owner_id(self, *args): ...
+    async def get_sandbox_owner_ids(self, *args): ...
 
 
 @pytest.fixture
@@ -156,10 +156,10 @@ async def test_wms_access_policy_read_modify(job_db, monkeypatch):
             )
 
         # Standard case, querying for one own jobs
-        async def summary_matching(*args):
-            return [{"Owner": "preferred_username", "VO": "lhcb", "count": 3}]
+        async def owners_matching(*args):
+            return {i: ("preferred_username", "lhcb") for i in (1, 2, 3)}
 
-        monkeypatch.setattr(job_db, "summary", summary_matching)
+        monkeypatch.setattr(job_db, "get_job_owners", owners_matching)
 
         await WMSAccessPolicy.policy(
             WMS_POLICY_NAME,
@@ -179,10 +179,10 @@ async def test_wms_access_policy_read_modify(job_db, monkeypatch):
         )
 
         # Jobs belong to somebody else
-        async def summary_other_owner(*args):
-            return [{"Owner": "other_owner", "VO": "lhcb", "count": 3}]
+        async def owners_other_owner(*args):
+            return {1: ("preferred_username", "lhcb"), 2: ("other_owner", "lhcb")}
 
-        monkeypatch.setattr(job_db, "summary", summary_other_owner)
+        monkeypatch.setattr(job_db, "get_job_owners", owners_other_owner)
         with pytest.raises(HTTPException, match=f"{status.HTTP_403_FORBIDDEN}"):
             await WMSAccessPolicy.policy(
                 WMS_POLICY_NAME,
@@ -193,10 +193,10 @@ async def test_wms_access_policy_read_modify(job_db, monkeypatch):
             )
 
         # Jobs belong to somebody else
-        async def summary_other_vo(*args):
-            return [{"Owner": "preferred_username", "VO": "gridpp", "count": 3}]
+        async def owners_other_vo(*args):
+            return {i: ("preferred_username", "gridpp") for i in (1, 2, 3)}
 
-        monkeypatch.setattr(job_db, "summary", summary_other_vo)
+        monkeypatch.setattr(job_db, "get_job_owners", owners_other_vo)
         with pytest.raises(HTTPException, match=f"{status.HTTP_403_FORBIDDEN}"):
             await WMSAccessPolicy.policy(
                 WMS_POLICY_NAME,
@@ -206,11 +206,11 @@ async def test_wms_access_policy_read_modify(job_db, monkeypatch):
                 job_ids=[1, 2, 3],
             )
 
-        # Wrong job count
-        async def summary_other_vo(*args):
-            return [{"Owner": "preferred_username", "VO": "lhcb", "count": 2}]
+        # One of the jobs does not exist
+        async def owners_missing_job(*args):
+            return {i: ("preferred_username", "lhcb") for i in (1, 2)}
 
-        monkeypatch.setattr(job_db, "summary", summary_other_vo)
+        monkeypatch.setattr(job_db, "get_job_owners", owners_missing_job)
         with pytest.raises(HTTPException, match=f"{status.HTTP_403_FORBIDDEN}"):
             await WMSAccessPolicy.policy(
                 WMS_POLICY_NAME,
@@ -312,12 +312,12 @@ async def test_sandbox_access_policy_read(sandbox_metadata_db, monkeypatch):
     async def get_owner_id(*args):
         return 1
 
-    async def get_sandbox_owner_id(*args):
-        return 1
+    async def get_sandbox_owner_ids(pfns, se_name):
+        return {pfn: 1 for pfn in pfns}
 
     monkeypatch.setattr(sandbox_metadata_db, "get_owner_id", get_owner_id)
     monkeypatch.setattr(
-        sandbox_metadata_db, "get_sandbox_owner_id", get_sandbox_owner_id
+        sandbox_metadata_db, "get_sandbox_owner_ids", get_sandbox_owner_ids
     )
 
     await SandboxAccessPolicy.policy(
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
 from http import HTTPStatus
 
 import pytest
+from fastapi.testclient import TestClient
 from packaging.version import Version, parse
 
 from diracx.routers import DIRACX_MIN_CLIENT_VERSION
+from diracx.routers.fastapi_classes import DiracFastAPI
 
 pytestmark = pytest.mark.enabled_dependencies(
     [
@@ -71,3 +75,25 @@ def test_invalid_client_version(test_client, caplog: pytest.LogCaptureFixture):
     r = test_client.get("/", headers={"DiracX-Client-Version": invalid_version})
     assert r.status_code == 400
     assert invalid_version in r.json()["detail"]
+
+
+def test_lifetime_functions_exit_order():
+    """Lifetime functions exit in reverse order however fast they are entered."""
+    app = DiracFastAPI()
+    events = []
+
+    def lifetime_function(name, delay):
+        @contextlib.asynccontextmanager
+        async def lifetime():
+            await asyncio.sleep(delay)
+            events.append(f"enter {name}")
+            yield
+            events.append(f"exit {name}")
+
+        return lifetime
+
+    app.lifetime_functions.append(lifetime_function("db", 0.1))
+    app.lifetime_functions.append(lifetime_function("settings", 0))
+    with TestClient(app):
+        pass
+    assert events == ["enter settings", "enter db", "exit settings", "exit db"]
@@ -14,8 +14,10 @@ from .utils import (
     private_key,
     pytest_addoption,
     session_client_factory,
+    task_queue_db,
     test_auth_settings,
     test_dev_settings,
+    test_jobs_settings,
     test_login,
     test_sandbox_settings,
     with_cli_login,
@@ -31,11 +33,13 @@ __all__ = (
     "private_key",
     "fernet_key",
     "test_dev_settings",
+    "test_jobs_settings",
     "test_auth_settings",
     "aio_moto",
     "test_sandbox_settings",
     "session_client_factory",
     "client_factory",
+    "task_queue_db",
     "with_config_repo",
     "demo_dir",
     "demo_urls",
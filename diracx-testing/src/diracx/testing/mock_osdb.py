@@ -88,17 +88,24 @@ class MockOSDBMixin:
 
     async def upsert(self, vo, doc_id, document) -> None:
         async with self._sql_db:
-            values = {}
-            for key, value in document.items():
-                if key in self.fields:
-                    values[key] = value
-                else:
-                    values.setdefault("extra", {})[key] = value
-
-            stmt = sqlite_insert(self._table).values(doc_id=doc_id, **values)
-            # TODO: Upsert the JSON blob properly
-            stmt = stmt.on_conflict_do_update(index_elements=["doc_id"], set_=values)
-            await self._sql_db.conn.execute(stmt)
+            await self._sql_db.conn.execute(self._upsert_stmt(doc_id, document))
+
+    async def bulk_upsert(self, vo, documents) -> None:
+        async with self._sql_db:
+            for doc_id, document in documents.items():
+                await self._sql_db.conn.execute(self._upsert_stmt(doc_id, document))
+
+    def _upsert_stmt(self, doc_id, document):
+        values = {}
+        for key, value in document.items():
+            if key in self.fields:
+                values[key] = value
+            else:
+                values.setdefault("extra", {})[key] = value
+
+        stmt = sqlite_insert(self._table).values(doc_id=doc_id, **values)
+        # TODO: Upsert the JSON blob properly
+        return stmt.on_conflict_do_update(index_elements=["doc_id"], set_=values)
 
     async def search(
         self,
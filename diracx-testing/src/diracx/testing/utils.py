@@ -15,7 +15,7 @@ from datetime import datetime, timedelta, timezone
 from functools import partial
 from html.parser import HTMLParser
 from pathlib import Path
-from typing import TYPE_CHECKING, Generator
+from typing import TYPE_CHECKING, AsyncGenerator, Generator
 from urllib.parse import parse_qs, urljoin, urlparse
 
 import httpx
@@ -29,8 +29,10 @@ if TYPE_CHECKING:
     from diracx.core.settings import (
         AuthSettings,
         DevelopmentSettings,
+        JobsSettings,
         SandboxStoreSettings,
     )
+    from diracx.db.sql import TaskQueueDB
     from diracx.routers.utils.users import AuthorizedUserInfo
 
 
@@ -80,6 +82,25 @@ def test_dev_settings() -> Generator[DevelopmentSettings, None, None]:
     yield DevelopmentSettings()
 
 
+@pytest.fixture(scope="session")
+def test_jobs_settings() -> Generator[JobsSettings, None, None]:
+    from diracx.core.settings import JobsSettings
+
+    yield JobsSettings()
+
+
+@pytest.fixture
+async def task_queue_db() -> AsyncGenerator[TaskQueueDB, None]:
+    """An empty TaskQueueDB in an in-memory SQLite database."""
+    from diracx.db.sql import TaskQueueDB
+
+    db = TaskQueueDB("sqlite+aiosqlite:///:memory:")
+    async with db.engine_context():
+        async with db.engine.begin() as conn:
+            await conn.run_sync(db.metadata.create_all)
+        yield db
+
+
 @pytest.fixture(scope="session")
 def test_auth_settings(private_key, fernet_key) -> Generator[AuthSettings, None, None]:
     from diracx.core.settings import AuthSettings
@@ -145,6 +166,7 @@ class ClientFactory:
         test_auth_settings,
         test_sandbox_settings,
         test_dev_settings,
+        test_jobs_settings,
     ):
         from diracx.core.config import ConfigSource
         from diracx.core.extensions import select_from_extension
@@ -213,6 +235,7 @@ class ClientFactory:
                 test_auth_settings,
                 test_sandbox_settings,
                 test_dev_settings,
+                test_jobs_settings,
             ],
             database_urls=database_urls,
             os_database_conn_kwargs=os_database_conn_kwargs,
@@ -389,6 +412,7 @@ def session_client_factory(
     with_config_repo,
     tmp_path_factory,
     test_dev_settings,
+    test_jobs_settings,
 ):
     """TODO.
     ----
@@ -400,6 +424,7 @@ def session_client_factory(
         test_auth_settings,
         test_sandbox_settings,
         test_dev_settings,
+        test_jobs_settings,
     )
 
 
@@ -6,7 +6,7 @@
 # --------------------------------------------------------------------------
 from collections.abc import MutableMapping
 from io import IOBase
-from typing import Any, Callable, Dict, IO, List, Optional, TypeVar, Union, overload
+from typing import Any, AsyncIterator, Callable, Dict, IO, List, Optional, TypeVar, Union, overload
 
 from azure.core import AsyncPipelineClient, MatchConditions
 from azure.core.exceptions import (
@@ -16,6 +16,8 @@ from azure.core.exceptions import (
     ResourceModifiedError,
     ResourceNotFoundError,
     ResourceNotModifiedError,
+    StreamClosedError,
+    StreamConsumedError,
     map_error,
 )
 from azure.core.pipeline import PipelineResponse
@@ -40,10 +42,12 @@ from ...operations._operations import (
     build_config_serve_config_request,
     build_jobs_add_heartbeat_request,
     build_jobs_assign_sandbox_to_job_request,
+    build_jobs_export_search_request,
     build_jobs_get_job_sandbox_request,
     build_jobs_get_job_sandboxes_request,
     build_jobs_get_sandbox_file_request,
     build_jobs_initiate_sandbox_upload_request,
+    build_jobs_initiate_sandbox_uploads_request,
     build_jobs_patch_metadata_request,
     build_jobs_reschedule_jobs_request,
     build_jobs_search_request,
@@ -1132,6 +1136,114 @@ class JobsOperations:
 
         return deserialized  # type: ignore
 
+    @overload
+    async def initiate_sandbox_uploads(
+        self, body: List[_models.SandboxInfo], *, content_type: str = "application/json", **kwargs: Any
+    ) -> List[_models.SandboxUploadResponse]:
+        """Initiate Sandbox Uploads.
+
+        Get the PFNs for the given sandboxes, initiate the uploads as required.
+
+        This is the bulk version of ``initiate_sandbox_upload``, the responses are
+        in the order of the sandboxes.
+
+        :param body: Required.
+        :type body: list[~_generated.models.SandboxInfo]
+        :keyword content_type: Body Parameter content-type. Content type parameter for JSON body.
+         Default value is "application/json".
+        :paramtype content_type: str
+        :return: list of SandboxUploadResponse
+        :rtype: list[~_generated.models.SandboxUploadResponse]
+        :raises ~azure.core.exceptions.HttpResponseError:
+        """
+
+    @overload
+    async def initiate_sandbox_uploads(
+        self, body: IO[bytes], *, content_type: str = "application/json", **kwargs: Any
+    ) -> List[_models.SandboxUploadResponse]:
+        """Initiate Sandbox Uploads.
+
+        Get the PFNs for the given sandboxes, initiate the uploads as required.
+
+        This is the bulk version of ``initiate_sandbox_upload``, the responses are
+        in the order of the sandboxes.
+
+        :param body: Required.
+        :type body: IO[bytes]
+        :keyword content_type: Body Parameter content-type. Content type parameter for binary body.
+         Default value is "application/json".
+        :paramtype content_type: str
+        :return: list of SandboxUploadResponse
+        :rtype: list[~_generated.models.SandboxUploadResponse]
+        :raises ~azure.core.exceptions.HttpResponseError:
+        """
+
+    @distributed_trace_async
+    async def initiate_sandbox_uploads(
+        self, body: Union[List[_models.SandboxInfo], IO[bytes]], **kwargs: Any
+    ) -> List[_models.SandboxUploadResponse]:
+        """Initiate Sandbox Uploads.
+
+        Get the PFNs for the given sandboxes, initiate the uploads as required.
+
+        This is the bulk version of ``initiate_sandbox_upload``, the responses are
+        in the order of the sandboxes.
+
+        :param body: Is either a [SandboxInfo] type or a IO[bytes] type. Required.
+        :type body: list[~_generated.models.SandboxInfo] or IO[bytes]
+        :return: list of SandboxUploadResponse
+        :rtype: list[~_generated.models.SandboxUploadResponse]
+        :raises ~azure.core.exceptions.HttpResponseError:
+        """
+        error_map: MutableMapping = {
+            401: ClientAuthenticationError,
+            404: ResourceNotFoundError,
+            409: ResourceExistsError,
+            304: ResourceNotModifiedError,
+        }
+        error_map.update(kwargs.pop("error_map", {}) or {})
+
+        _headers = case_insensitive_dict(kwargs.pop("headers", {}) or {})
+        _params = kwargs.pop("params", {}) or {}
+
+        content_type: Optional[str] = kwargs.pop("content_type", _headers.pop("Content-Type", None))
+        cls: ClsType[List[_models.SandboxUploadResponse]] = kwargs.pop("cls", None)
+
+        content_type = content_type or "application/json"
+        _json = None
+        _content = None
+        if isinstance(body, (IOBase, bytes)):
+            _content = body
+        else:
+            _json = self._serialize.body(body, "[SandboxInfo]")
+
+        _request = build_jobs_initiate_sandbox_uploads_request(
+            content_type=content_type,
+            json=_json,
+            content=_content,
+            headers=_headers,
+            params=_params,
+        )
+        _request.url = self._client.format_url(_request.url)
+
+        _stream = False
+        pipeline_response: PipelineResponse = await self._client._pipeline.run(  # pylint: disable=protected-access
+            _request, stream=_stream, **kwargs
+        )
+
+        response = pipeline_response.http_response
+
+        if response.status_code not in [200]:
+            map_error(status_code=response.status_code, response=response, error_map=error_map)
+            raise HttpResponseError(response=response)
+
+        deserialized = self._deserialize("[SandboxUploadResponse]", pipeline_response.http_response)
+
+        if cls:
+            return cls(pipeline_response, deserialized, {})  # type: ignore
+
+        return deserialized  # type: ignore
+
     @distributed_trace_async
     async def get_sandbox_file(self, *, pfn: str, **kwargs: Any) -> _models.SandboxDownloadResponse:
         """Get Sandbox File.
@@ -1579,6 +1691,9 @@ class JobsOperations:
 
         The ``data`` parameter and return value are mappings keyed by job ID.
 
+        The heartbeat time and data may be written asynchronously, see
+        ``JobsSettings.heartbeat_buffer_seconds``.
+
         :param body: Required.
         :type body: dict[str, ~_generated.models.HeartbeatData]
         :keyword content_type: Body Parameter content-type. Content type parameter for JSON body.
@@ -1603,6 +1718,9 @@ class JobsOperations:
 
         The ``data`` parameter and return value are mappings keyed by job ID.
 
+        The heartbeat time and data may be written asynchronously, see
+        ``JobsSettings.heartbeat_buffer_seconds``.
+
         :param body: Required.
         :type body: IO[bytes]
         :keyword content_type: Body Parameter content-type. Content type parameter for binary body.
@@ -1627,6 +1745,9 @@ class JobsOperations:
 
         The ``data`` parameter and return value are mappings keyed by job ID.
 
+        The heartbeat time and data may be written asynchronously, see
+        ``JobsSettings.heartbeat_buffer_seconds``.
+
         :param body: Is either a {str: HeartbeatData} type or a IO[bytes] type. Required.
         :type body: dict[str, ~_generated.models.HeartbeatData] or IO[bytes]
         :return: list of JobCommand
@@ -1833,6 +1954,8 @@ class JobsOperations:
         *,
         page: int = 1,
         per_page: int = 100,
+        cursor: Optional[str] = None,
+        count: Union[str, _models.SearchCountMode] = "exact",
         content_type: str = "application/json",
         **kwargs: Any
     ) -> List[Dict[str, Any]]:
@@ -1840,6 +1963,19 @@ class JobsOperations:
 
         Retrieve information about jobs.
 
+        By default the results are paginated using ``page`` and ``per_page``.
+        Deep pages are expensive to compute, so when iterating over many results
+        cursor pagination should be used instead: pass an empty ``cursor`` to get
+        the first page, and then the value of the ``Next-Cursor`` response header
+        to get the following ones. In this mode ``page`` is ignored and no total
+        count is reported.
+
+        Counting all the matching jobs is costly for broad searches. With
+        ``count=none`` the total is not computed, and with ``count=estimate`` it is
+        taken from the table statistics or from a recent count of the same search.
+        The total in the ``Content-Range`` header is then ``*`` or prefixed by ``~``,
+        respectively, unless the end of the results was reached.
+
         **TODO: Add more docs**.
 
         :param body: Default value is None.
@@ -1848,6 +1984,10 @@ class JobsOperations:
         :paramtype page: int
         :keyword per_page: Default value is 100.
         :paramtype per_page: int
+        :keyword cursor: Default value is None.
+        :paramtype cursor: str
+        :keyword count: Known values are: "exact", "estimate", and "none". Default value is "exact".
+        :paramtype count: str or ~_generated.models.SearchCountMode
         :keyword content_type: Body Parameter content-type. Content type parameter for JSON body.
          Default value is "application/json".
         :paramtype content_type: str
@@ -1863,6 +2003,8 @@ class JobsOperations:
         *,
         page: int = 1,
         per_page: int = 100,
+        cursor: Optional[str] = None,
+        count: Union[str, _models.SearchCountMode] = "exact",
         content_type: str = "application/json",
         **kwargs: Any
     ) -> List[Dict[str, Any]]:
@@ -1870,6 +2012,19 @@ class JobsOperations:
 
         Retrieve information about jobs.
 
+        By default the results are paginated using ``page`` and ``per_page``.
+        Deep pages are expensive to compute, so when iterating over many results
+        cursor pagination should be used instead: pass an empty ``cursor`` to get
+        the first page, and then the value of the ``Next-Cursor`` response header
+        to get the following ones. In this mode ``page`` is ignored and no total
+        count is reported.
+
+        Counting all the matching jobs is costly for broad searches. With
+        ``count=none`` the total is not computed, and with ``count=estimate`` it is
+        taken from the table statistics or from a recent count of the same search.
+        The total in the ``Content-Range`` header is then ``*`` or prefixed by ``~``,
+        respectively, unless the end of the results was reached.
+
         **TODO: Add more docs**.
 
         :param body: Default value is None.
@@ -1878,6 +2033,10 @@ class JobsOperations:
         :paramtype page: int
         :keyword per_page: Default value is 100.
         :paramtype per_page: int
+        :keyword cursor: Default value is None.
+        :paramtype cursor: str
+        :keyword count: Known values are: "exact", "estimate", and "none". Default value is "exact".
+        :paramtype count: str or ~_generated.models.SearchCountMode
         :keyword content_type: Body Parameter content-type. Content type parameter for binary body.
          Default value is "application/json".
         :paramtype content_type: str
@@ -1893,12 +2052,27 @@ class JobsOperations:
         *,
         page: int = 1,
         per_page: int = 100,
+        cursor: Optional[str] = None,
+        count: Union[str, _models.SearchCountMode] = "exact",
         **kwargs: Any
     ) -> List[Dict[str, Any]]:
         """Search.
 
         Retrieve information about jobs.
 
+        By default the results are paginated using ``page`` and ``per_page``.
+        Deep pages are expensive to compute, so when iterating over many results
+        cursor pagination should be used instead: pass an empty ``cursor`` to get
+        the first page, and then the value of the ``Next-Cursor`` response header
+        to get the following ones. In this mode ``page`` is ignored and no total
+        count is reported.
+
+        Counting all the matching jobs is costly for broad searches. With
+        ``count=none`` the total is not computed, and with ``count=estimate`` it is
+        taken from the table statistics or from a recent count of the same search.
+        The total in the ``Content-Range`` header is then ``*`` or prefixed by ``~``,
+        respectively, unless the end of the results was reached.
+
         **TODO: Add more docs**.
 
         :param body: Is either a JobSearchParams type or a IO[bytes] type. Default value is None.
@@ -1907,6 +2081,10 @@ class JobsOperations:
         :paramtype page: int
         :keyword per_page: Default value is 100.
         :paramtype per_page: int
+        :keyword cursor: Default value is None.
+        :paramtype cursor: str
+        :keyword count: Known values are: "exact", "estimate", and "none". Default value is "exact".
+        :paramtype count: str or ~_generated.models.SearchCountMode
         :return: list of dict mapping str to any
         :rtype: list[dict[str, any]]
         :raises ~azure.core.exceptions.HttpResponseError:
@@ -1939,6 +2117,8 @@ class JobsOperations:
         _request = build_jobs_search_request(
             page=page,
             per_page=per_page,
+            cursor=cursor,
+            count=count,
             content_type=content_type,
             json=_json,
             content=_content,
@@ -1959,6 +2139,9 @@ class JobsOperations:
             raise HttpResponseError(response=response)
 
         response_headers = {}
+        if response.status_code == 200:
+            response_headers["Next-Cursor"] = self._deserialize("str", response.headers.get("Next-Cursor"))
+
         if response.status_code == 206:
             response_headers["Content-Range"] = self._deserialize("str", response.headers.get("Content-Range"))
 
@@ -1969,6 +2152,158 @@ class JobsOperations:
 
         return deserialized  # type: ignore
 
+    @overload
+    async def export_search(
+        self,
+        body: Optional[_models.JobSearchParams] = None,
+        *,
+        format: Union[str, _models.SearchExportFormat] = "ndjson",
+        content_type: str = "application/json",
+        **kwargs: Any
+    ) -> AsyncIterator[bytes]:
+        """Export Search.
+
+        Export information about all the matching jobs.
+
+        Unlike ``search``, the results are not paginated: they are read from the
+        database and sent progressively, so that arbitrarily large numbers of jobs
+        can be retrieved without holding them in memory.
+
+        With ``format=ndjson`` each job is sent as a JSON object on its own line.
+        With ``format=arrow`` the jobs are sent as an Apache Arrow IPC stream,
+        which requires ``pyarrow`` to be installed on the server.
+
+        :param body: Default value is None.
+        :type body: ~_generated.models.JobSearchParams
+        :keyword format: Known values are: "ndjson" and "arrow". Default value is "ndjson".
+        :paramtype format: str or ~_generated.models.SearchExportFormat
+        :keyword content_type: Body Parameter content-type. Content type parameter for JSON body.
+         Default value is "application/json".
+        :paramtype content_type: str
+        :return: AsyncIterator[bytes]
+        :rtype: AsyncIterator[bytes]
+        :raises ~azure.core.exceptions.HttpResponseError:
+        """
+
+    @overload
+    async def export_search(
+        self,
+        body: Optional[IO[bytes]] = None,
+        *,
+        format: Union[str, _models.SearchExportFormat] = "ndjson",
+        content_type: str = "application/json",
+        **kwargs: Any
+    ) -> AsyncIterator[bytes]:
+        """Export Search.
+
+        Export information about all the matching jobs.
+
+        Unlike ``search``, the results are not paginated: they are read from the
+        database and sent progressively, so that arbitrarily large numbers of jobs
+        can be retrieved without holding them in memory.
+
+        With ``format=ndjson`` each job is sent as a JSON object on its own line.
+        With ``format=arrow`` the jobs are sent as an Apache Arrow IPC stream,
+        which requires ``pyarrow`` to be installed on the server.
+
+        :param body: Default value is None.
+        :type body: IO[bytes]
+        :keyword format: Known values are: "ndjson" and "arrow". Default value is "ndjson".
+        :paramtype format: str or ~_generated.models.SearchExportFormat
+        :keyword content_type: Body Parameter content-type. Content type parameter for binary body.
+         Default value is "application/json".
+        :paramtype content_type: str
+        :return: AsyncIterator[bytes]
+        :rtype: AsyncIterator[bytes]
+        :raises ~azure.core.exceptions.HttpResponseError:
+        """
+
+    @distributed_trace_async
+    async def export_search(
+        self,
+        body: Optional[Union[_models.JobSearchParams, IO[bytes]]] = None,
+        *,
+        format: Union[str, _models.SearchExportFormat] = "ndjson",
+        **kwargs: Any
+    ) -> AsyncIterator[bytes]:
+        """Export Search.
+
+        Export information about all the matching jobs.
+
+        Unlike ``search``, the results are not paginated: they are read from the
+        database and sent progressively, so that arbitrarily large numbers of jobs
+        can be retrieved without holding them in memory.
+
+        With ``format=ndjson`` each job is sent as a JSON object on its own line.
+        With ``format=arrow`` the jobs are sent as an Apache Arrow IPC stream,
+        which requires ``pyarrow`` to be installed on the server.
+
+        :param body: Is either a JobSearchParams type or a IO[bytes] type. Default value is None.
+        :type body: ~_generated.models.JobSearchParams or IO[bytes]
+        :keyword format: Known values are: "ndjson" and "arrow". Default value is "ndjson".
+        :paramtype format: str or ~_generated.models.SearchExportFormat
+        :return: AsyncIterator[bytes]
+        :rtype: AsyncIterator[bytes]
+        :raises ~azure.core.exceptions.HttpResponseError:
+        """
+        error_map: MutableMapping = {
+            401: ClientAuthenticationError,
+            404: ResourceNotFoundError,
+            409: ResourceExistsError,
+            304: ResourceNotModifiedError,
+        }
+        error_map.update(kwargs.pop("error_map", {}) or {})
+
+        _headers = case_insensitive_dict(kwargs.pop("headers", {}) or {})
+        _params = kwargs.pop("params", {}) or {}
+
+        content_type: Optional[str] = kwargs.pop("content_type", _headers.pop("Content-Type", None))
+        cls: ClsType[AsyncIterator[bytes]] = kwargs.pop("cls", None)
+
+        content_type = content_type or "application/json"
+        _json = None
+        _content = None
+        if isinstance(body, (IOBase, bytes)):
+            _content = body
+        else:
+            if body is not None:
+                _json = self._serialize.body(body, "JobSearchParams")
+            else:
+                _json = None
+
+        _request = build_jobs_export_search_request(
+            format=format,
+            content_type=content_type,
+            json=_json,
+            content=_content,
+            headers=_headers,
+            params=_params,
+        )
+        _request.url = self._client.format_url(_request.url)
+
+        _decompress = kwargs.pop("decompress", True)
+        _stream = True
+        pipeline_response: PipelineResponse = await self._client._pipeline.run(  # pylint: disable=protected-access
+            _request, stream=_stream, **kwargs
+        )
+
+        response = pipeline_response.http_response
+
+        if response.status_code not in [200]:
+            try:
+                await response.read()  # Load the body in memory and close the socket
+            except (StreamConsumedError, StreamClosedError):
+                pass
+            map_error(status_code=response.status_code, response=response, error_map=error_map)
+            raise HttpResponseError(response=response)
+
+        deserialized = response.iter_bytes() if _decompress else response.iter_raw()
+
+        if cls:
+            return cls(pipeline_response, deserialized, {})  # type: ignore
+
+        return deserialized  # type: ignore
+
     @overload
     async def summary(
         self, body: _models.JobSummaryParams, *, content_type: str = "application/json", **kwargs: Any
@@ -2072,6 +2407,9 @@ class JobsOperations:
 
         Submit a list of jobs in JDL format.
 
+        The number of jobs which can be submitted at once, including the ones
+        generated from a parametric JDL, is limited by the service settings.
+
         :param body: Required.
         :type body: list[str]
         :keyword content_type: Body Parameter content-type. Content type parameter for JSON body.
@@ -2090,6 +2428,9 @@ class JobsOperations:
 
         Submit a list of jobs in JDL format.
 
+        The number of jobs which can be submitted at once, including the ones
+        generated from a parametric JDL, is limited by the service settings.
+
         :param body: Required.
         :type body: IO[bytes]
         :keyword content_type: Body Parameter content-type. Content type parameter for binary body.
@@ -2106,6 +2447,9 @@ class JobsOperations:
 
         Submit a list of jobs in JDL format.
 
+        The number of jobs which can be submitted at once, including the ones
+        generated from a parametric JDL, is limited by the service settings.
+
         :param body: Is either a [str] type or a IO[bytes] type. Required.
         :type body: list[str] or IO[bytes]
         :return: list of InsertedJob